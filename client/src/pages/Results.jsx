@@ -1,4 +1,4 @@
-import { useState, useEffect, useMemo } from "react";
+import { useState, useEffect, useMemo, useCallback } from "react";
 import { useLocation } from "react-router-dom";
 import HotelCard from "../components/HotelCard";
 import { FiMapPin } from "react-icons/fi";
@@ -19,28 +19,42 @@ const HotelCardSkeleton = () => (
   </div>
 );
 
+const API_URL = "http://127.0.0.1:8000/api/hotels/?view=card&limit=50";
+
 export default function Results() {
   const query = useQuery();
   const location = query.get("location") || "";
   const [hotels, setHotels] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [isLoading, setIsLoading] = useState(true);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [error, setError] = useState(null);
+  const [loadMoreError, setLoadMoreError] = useState(null);
+
+  // the listing is cursor-paginated: one page per request, the next one on demand
+  const fetchPage = useCallback(async (cursor, signal) => {
+    const url = cursor
+      ? `${API_URL}&cursor=${encodeURIComponent(cursor)}`
+      : API_URL;
+    const response = await fetch(url, { signal });
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    const data = await response.json();
+    return { data, cursor: response.headers.get("X-Next-Cursor") };
+  }, []);
 
   useEffect(() => {
+    const controller = new AbortController();
     const fetchHotels = async () => {
       setIsLoading(true);
       setError(null);
-
-      const API_URL = "http://127.0.0.1:8000/api/hotels/";
-
       try {
-        const response = await fetch(API_URL);
-        if (!response.ok) {
-          throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        const data = await response.json();
-        setHotels(data);
+        const page = await fetchPage(null, controller.signal);
+        setHotels(page.data);
+        setNextCursor(page.cursor);
       } catch (e) {
+        if (e.name === "AbortError") return;
         console.error("Fetching hotels failed:", e);
         setError(e.message || "Failed to fetch hotel data.");
         setHotels([]);
@@ -50,7 +64,25 @@ export default function Results() {
     };
 
     fetchHotels();
-  }, []);
+    return () => controller.abort();
+  }, [fetchPage]);
+
+  const loadMore = async () => {
+    if (!nextCursor || isLoadingMore) return;
+    setIsLoadingMore(true);
+    setLoadMoreError(null);
+    try {
+      const page = await fetchPage(nextCursor);
+      setHotels((prev) => prev.concat(page.data));
+      setNextCursor(page.cursor);
+    } catch (e) {
+      // keep the hotels already shown; the button retries
+      console.error("Fetching more hotels failed:", e);
+      setLoadMoreError(e.message || "Failed to fetch more hotels.");
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
 
   const filtered = useMemo(() => {
     if (!location) return hotels;
@@ -101,11 +133,31 @@ export default function Results() {
                 No hotels found
               </h3>
               <p className="text-stone-500">
-                Try adjusting your search or filters.
+                {nextCursor
+                  ? "No matches among the hotels loaded so far."
+                  : "Try adjusting your search or filters."}
               </p>
             </div>
           )}
         </div>
+
+        {!isLoading && !error && nextCursor && (
+          <div className="mt-10 flex flex-col items-center gap-3">
+            <button
+              type="button"
+              onClick={loadMore}
+              disabled={isLoadingMore}
+              className="px-8 py-3 bg-emerald-800 hover:bg-emerald-900 text-white rounded-xl font-bold shadow-lg shadow-emerald-900/20 transition-all disabled:opacity-60"
+            >
+              {isLoadingMore ? "Loading…" : "Load more hotels"}
+            </button>
+            {loadMoreError && (
+              <p className="text-sm text-red-600">
+                Could not load more hotels: {loadMoreError}
+              </p>
+            )}
+          </div>
+        )}
       </div>
     </div>
   );
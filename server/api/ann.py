@@ -0,0 +1,118 @@
+"""
+Nearest-neighbour engines over the exported embedding matrix.
+
+`ExactIndex` scores every vector (one matrix-vector product). `IVFIndex` is an
+inverted-file index: vectors are bucketed by their closest k-means centroid and
+a query only scores the `nprobe` buckets whose centroids match it best, so the
+work per query is roughly `nprobe / nlist` of a full scan.
+"""
+import numpy as np
+
+
+def top_k(scores, k):
+    """
+    Indices of the `k` largest scores, best first. Uses argpartition so only
+    the winners are sorted.
+    """
+    n = len(scores)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        winners = np.argpartition(-scores, k - 1)[:k]
+    else:
+        winners = np.arange(n)
+    return winners[np.argsort(-scores[winners], kind="stable")]
+
+
+class ExactIndex:
+    name = "exact"
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+
+    def search(self, query, k):
+        """Return `(rows, scores)` of the `k` best vectors."""
+        scores = self.matrix @ query
+        rows = top_k(scores, k)
+        return rows, scores[rows]
+
+
+def assign(matrix, centroids, chunk_size=65536):
+    """Closest centroid (by inner product) for every row of `matrix`."""
+    labels = np.empty(len(matrix), dtype=np.int32)
+    for start in range(0, len(matrix), chunk_size):
+        block = np.asarray(matrix[start:start + chunk_size])
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def train_centroids(matrix, nlist, iterations=20, sample_size=100_000, seed=0):
+    """
+    Spherical k-means on a random sample of `matrix`. Returns `nlist`
+    L2-normalised centroids (fewer if the matrix has fewer rows).
+    """
+    rng = np.random.default_rng(seed)
+    n = len(matrix)
+    nlist = max(1, min(nlist, n))
+    if n > sample_size:
+        sample = np.asarray(matrix[np.sort(rng.choice(n, sample_size, replace=False))])
+    else:
+        sample = np.asarray(matrix)
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        labels = assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        empty = np.bincount(labels, minlength=nlist) == 0
+        # re-seed empty lists so every centroid stays useful
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+    return centroids
+
+
+class IVFIndex:
+    name = "ivf"
+
+    def __init__(self, matrix, centroids, offsets, rows, nprobe=8):
+        self.matrix = matrix
+        self.centroids = centroids
+        self.offsets = offsets      # list i owns rows[offsets[i]:offsets[i + 1]]
+        self.rows = rows
+        self.nprobe = nprobe
+
+    @classmethod
+    def build(cls, matrix, centroids, nprobe=8):
+        labels = assign(matrix, centroids)
+        rows = np.argsort(labels, kind="stable").astype(np.int64)
+        counts = np.bincount(labels, minlength=len(centroids))
+        offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        return cls(matrix, centroids, offsets, rows, nprobe=nprobe)
+
+    def save(self, path):
+        with open(path, "wb") as fh:
+            np.savez(fh, centroids=self.centroids, offsets=self.offsets, rows=self.rows)
+
+    @classmethod
+    def load(cls, path, matrix, nprobe=8):
+        data = np.load(path)
+        return cls(matrix, data["centroids"], data["offsets"], data["rows"], nprobe=nprobe)
+
+    def search(self, query, k, nprobe=None):
+        """Return `(rows, scores)` of the best `k` vectors among the probed lists."""
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        lists = top_k(self.centroids @ query, nprobe)
+        candidates = np.concatenate(
+            [self.rows[self.offsets[i]:self.offsets[i + 1]] for i in lists]
+        )
+        candidates.sort()  # sequential reads from the memory-mapped matrix
+        scores = self.matrix[candidates] @ query
+        best = top_k(scores, k)
+        return candidates[best], scores[best]
+
+
+def default_nlist(n):
+    """Rule of thumb: about 4 * sqrt(N) lists."""
+    return max(1, int(4 * np.sqrt(n)))
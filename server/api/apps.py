@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+
+        from .search import ensure_search_index
+
+        def ensure_index(using, **kwargs):
+            ensure_search_index(using)
+
+        post_migrate.connect(ensure_index, sender=self, dispatch_uid="api.ensure_search_index")
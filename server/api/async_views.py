@@ -0,0 +1,98 @@
+"""
+Async variants of the hotel endpoints, for serving under ASGI
+(`uvicorn config.asgi:application`).
+
+Database work uses the async ORM; encoding, vector search and scoring run
+on the bounded inference pool, so a slow model call never holds the event
+loop. When the pool is saturated the request is refused with 429 and a
+Retry-After header instead of queueing without bound.
+"""
+import json
+import queue
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework.settings import api_settings
+
+from . import ranking
+from .caching import result_cache
+from .catalogue import acatalogue_version
+from .instrumentation import stage
+from .inference import InferenceBusy, get_inference_executor
+from .serializer import hotel_plan
+
+
+def render(data, status=200):
+    """Same bytes as the DRF views: rendered with the configured renderer."""
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    return HttpResponse(renderer.render(data), status=status, content_type=renderer.media_type)
+
+
+async def rank(req, limit, offset):
+    """Async composition of the stages in `ranking.rank`."""
+    with stage("recommend.candidates"):
+        hotels, narrowed = ranking.candidate_queryset(req)
+        candidate_ids = post_filter = None
+        if narrowed:
+            ids = hotels.values_list("id", flat=True)
+            if not req["geo"]:
+                ids = ids[:ranking.exact_candidate_limit() + 1]
+            candidate_ids = [pk async for pk in ids]
+            if not candidate_ids:
+                return []
+            candidate_ids, post_filter = ranking.split_candidates(req, hotels, candidate_ids)
+        elif not req["geo"] and not await hotels.aexists():
+            return []
+
+    executor = get_inference_executor()
+    if req["geo"]:
+        # the index may reload from the database: off the event loop
+        candidate_ids = await executor.run(ranking.near_candidates, req, candidate_ids)
+        if not candidate_ids:
+            return []
+    semantic = await executor.run(ranking.semantic_matches, req, candidate_ids, limit, offset, post_filter)
+    if not semantic:
+        return []
+    with stage("recommend.features"):
+        features = {row["id"]: row async for row in ranking.feature_queryset(semantic)}
+    return await executor.run(ranking.rerank, semantic, features, req["filters"], limit, offset)
+
+
+@csrf_exempt
+@require_POST
+async def recommend(request):
+    """
+    POST /api/async/hotels/recommend/
+    Same request and response as /api/hotels/recommend/.
+    """
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return render({"detail": "JSON parse error."}, status=400)
+    if not isinstance(data, dict):
+        return render({"detail": "Expected a JSON object."}, status=400)
+
+    try:
+        req = ranking.parse_request(data)
+    except ValueError as exc:
+        return render({"detail": str(exc)}, status=400)
+    limit, offset = ranking.page_params(request.GET, data)
+
+    with stage("recommend.cache"):
+        cache_key = ranking.cache_key(req, limit, offset, await acatalogue_version())
+        ranked = result_cache().get(cache_key)
+    if ranked is None:
+        try:
+            ranked = await rank(req, limit, offset)
+        except (InferenceBusy, queue.Full):
+            response = render({"detail": "Recommendation service is busy, retry shortly."}, status=429)
+            response["Retry-After"] = str(getattr(settings, "ASYNC_RETRY_AFTER", 1))
+            return response
+        result_cache().set(cache_key, ranked)
+
+    plan = hotel_plan()
+    with stage("recommend.fetch"):
+        by_id = {row["id"]: row async for row in ranking.winners_queryset(ranked, plan)}
+    return render(ranking.build_results(ranked, by_id, plan))
@@ -0,0 +1,146 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+from django.conf import settings
+
+from .providers import get_provider
+
+logger = logging.getLogger(__name__)
+
+# upper bounds (inclusive) of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class BatchingEncoder:
+    """
+    Coalesces concurrent single-text encodes into micro-batches.
+
+    Callers get a Future from `submit`. A worker thread takes the first
+    waiting text, then keeps collecting until it has `max_batch_size` texts
+    or `max_wait_ms` has passed, and encodes them in one provider call.
+    """
+
+    def __init__(self, provider, max_batch_size=32, max_wait_ms=5.0, max_queue=0):
+        self.provider = provider
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stats = {
+            "batches": 0,
+            "items": 0,
+            "errors": 0,
+            "inference_seconds": 0.0,
+            "max_inference_seconds": 0.0,
+            "queue_wait_seconds": 0.0,
+            "batch_sizes": dict.fromkeys(BATCH_SIZE_BUCKETS + ("inf",), 0),
+        }
+
+    def _ensure_worker(self):
+        # threads don't survive fork(), so a pre-forked worker starts its own
+        if self._thread is None or self._pid != os.getpid():
+            with self._lock:
+                if self._thread is None or self._pid != os.getpid():
+                    self._pid = os.getpid()
+                    self._thread = threading.Thread(
+                        target=self._run, name="embedding-batcher", daemon=True
+                    )
+                    self._thread.start()
+
+    def submit(self, text):
+        """Queue `text`; the Future resolves to its float32 vector.
+        Raises `queue.Full` when the queue is bounded and full."""
+        self._ensure_worker()
+        future = Future()
+        self.queue.put_nowait((text, future, time.perf_counter()))
+        return future
+
+    def encode(self, texts, timeout=None):
+        futures = [self.submit(text) for text in texts]
+        return np.vstack([f.result(timeout=timeout) for f in futures])
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    batch.append(self.queue.get(timeout=remaining))
+                else:
+                    batch.append(self.queue.get_nowait())  # drain what is already waiting
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            try:
+                vectors = self.provider.encode([text for text, _, _ in batch])
+            except Exception as exc:
+                logger.exception("Batched embedding failed (%d texts)", len(batch))
+                for _, future, _ in batch:
+                    future.set_exception(exc)
+                with self._lock:
+                    self._stats["errors"] += 1
+                continue
+            elapsed = time.perf_counter() - started
+            for (_, future, _), vector in zip(batch, vectors):
+                future.set_result(vector)
+            self._record(batch, started, elapsed)
+
+    def _record(self, batch, started, elapsed):
+        size = len(batch)
+        bucket = next((b for b in BATCH_SIZE_BUCKETS if size <= b), "inf")
+        with self._lock:
+            stats = self._stats
+            stats["batches"] += 1
+            stats["items"] += size
+            stats["inference_seconds"] += elapsed
+            stats["max_inference_seconds"] = max(stats["max_inference_seconds"], elapsed)
+            stats["queue_wait_seconds"] += sum(started - queued for _, _, queued in batch)
+            stats["batch_sizes"][bucket] += 1
+
+    def stats(self):
+        """Snapshot of queue depth, batch sizes and inference timings."""
+        with self._lock:
+            stats = dict(self._stats, batch_sizes=dict(self._stats["batch_sizes"]))
+        batches = stats["batches"] or 1
+        items = stats["items"] or 1
+        stats.update(
+            queue_depth=self.queue.qsize(),
+            max_batch_size=self.max_batch_size,
+            max_wait_ms=self.max_wait * 1000,
+            avg_batch_size=stats["items"] / batches,
+            avg_inference_ms=stats["inference_seconds"] * 1000 / batches,
+            avg_queue_wait_ms=stats["queue_wait_seconds"] * 1000 / items,
+        )
+        return stats
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    """Process-wide BatchingEncoder over the configured provider."""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = BatchingEncoder(
+                    get_provider(),
+                    max_batch_size=getattr(settings, "EMBEDDING_MAX_BATCH_SIZE", 32),
+                    max_wait_ms=getattr(settings, "EMBEDDING_MAX_WAIT_MS", 5),
+                    max_queue=getattr(settings, "EMBEDDING_MAX_QUEUE", 0),
+                )
+    return _batcher
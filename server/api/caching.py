@@ -0,0 +1,141 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+
+_MISSING = object()
+
+
+class MemoryCache:
+    """Thread-safe in-process cache with LRU eviction and an optional TTL."""
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires = entry
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DjangoCache:
+    """Same interface on top of a Django cache alias (shared across workers
+    with redis/memcached/file backends)."""
+
+    def __init__(self, alias="default", ttl=None, prefix="api"):
+        self.alias = alias
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, key):
+        return f"{self.prefix}:{hashlib.sha1(key.encode('utf-8')).hexdigest()}"
+
+    def get(self, key, default=None):
+        return caches[self.alias].get(self._key(key), default)
+
+    def set(self, key, value):
+        caches[self.alias].set(self._key(key), value, self.ttl)
+
+    def clear(self):
+        pass  # entries are keyed by catalogue version and simply expire
+
+
+def _config():
+    config = {
+        "BACKEND": "memory",
+        "ALIAS": "default",
+        "EMBEDDINGS_MAXSIZE": 4096,
+        "RESULTS_MAXSIZE": 2048,
+        "RESULTS_TTL": 300,
+    }
+    config.update(getattr(settings, "RECOMMEND_CACHE", {}))
+    return config
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def _get_cache(name, maxsize, ttl):
+    if name not in _caches:
+        with _caches_lock:
+            if name not in _caches:
+                config = _config()
+                if config["BACKEND"] == "django":
+                    _caches[name] = DjangoCache(config["ALIAS"], ttl=ttl, prefix=f"recommend:{name}")
+                else:
+                    _caches[name] = MemoryCache(config[maxsize], ttl=ttl)
+    return _caches[name]
+
+
+def embedding_cache():
+    """LRU of query prompt -> vector. Not tied to the catalogue, never invalidated."""
+    return _get_cache("embeddings", "EMBEDDINGS_MAXSIZE", None)
+
+
+def result_cache():
+    """TTL cache of normalized recommend request -> ranked [(hotel_id, score)]."""
+    return _get_cache("results", "RESULTS_MAXSIZE", _config()["RESULTS_TTL"])
+
+
+def clear_local_caches():
+    """Free this process's result entries after an upsert; other workers
+    stop hitting theirs because the catalogue version in the key moved on."""
+    if "results" in _caches:
+        _caches["results"].clear()
+
+
+def get_query_embedding(prompt, compute):
+    """Cached `compute(prompt)`; vectors are stored as float32 bytes."""
+    model = getattr(settings, "EMBEDDING_MODEL", "")
+    backend = getattr(settings, "EMBEDDING_BACKEND", "torch")
+    key = f"{model}|{backend}|{prompt}"
+    cache = embedding_cache()
+    cached = cache.get(key)
+    if cached is not None:
+        return np.frombuffer(cached, dtype=np.float32)
+    vector = np.asarray(compute(prompt), dtype=np.float32)
+    cache.set(key, vector.tobytes())
+    return vector
+
+
+def recommend_cache_key(params, limit, offset, version):
+    """Stable key for a recommend request: order/case/whitespace of the form
+    inputs don't matter, the catalogue version does."""
+    normalized = {
+        key: sorted({str(v).strip().lower() for v in value}) if isinstance(value, (list, tuple))
+        else str(value).strip().lower()
+        for key, value in params.items()
+    }
+    normalized.update(limit=limit, offset=offset, version=version)
+    return json.dumps(normalized, sort_keys=True)
@@ -0,0 +1,153 @@
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F
+from django.utils import timezone
+
+from .caching import clear_local_caches
+from .embedding_queue import enqueue_embeddings
+from .embeddings import embedding_queue_enabled, refresh_embeddings
+from .instrumentation import stage
+from .labels import sync_hotel_labels
+from .models import CatalogueState
+from .similar import build_similar_hotels, similar_enabled, update_similar_hotels
+from .vector_store import export_vector_store
+
+logger = logging.getLogger(__name__)
+
+
+def catalogue_version():
+    """Current catalogue version (0 before the first upsert)."""
+    return CatalogueState.objects.filter(pk=1).values_list("version", flat=True).first() or 0
+
+
+async def acatalogue_version():
+    return await CatalogueState.objects.filter(pk=1).values_list("version", flat=True).afirst() or 0
+
+
+def catalogue_state():
+    """`(version, updated_at)`; `(0, None)` before the first upsert."""
+    row = CatalogueState.objects.filter(pk=1).values_list("version", "updated_at").first()
+    return row or (0, None)
+
+
+def bump_catalogue_version():
+    updated = CatalogueState.objects.filter(pk=1).update(
+        version=F("version") + 1, updated_at=timezone.now()
+    )
+    if not updated:
+        CatalogueState.objects.get_or_create(pk=1, defaults={"version": 1})
+
+
+def hotels_changed(hotel_ids, publish=True):
+    """
+    Call after hotels were inserted or updated (HotelViewSet.create,
+    import_hotel_csv). Brings labels and embeddings up to date and
+    invalidates caches. Returns the number of hotels that had to be
+    re-embedded, or with EMBEDDING_QUEUE the number queued for the embedding
+    worker.
+
+    Publishing the new vectors (`publish_changes`) costs time linear in the
+    catalogue, so it is never done here: the embedding worker does it with
+    EMBEDDING_QUEUE, otherwise the background `publisher()`. `publish=False`
+    leaves it to the caller (import_hotel_csv, once at the end).
+    """
+    with stage("catalogue.labels"):
+        sync_hotel_labels(hotel_ids)
+    with stage("catalogue.embeddings"):
+        if embedding_queue_enabled():
+            encoded = enqueue_embeddings(hotel_ids)
+        else:
+            encoded = refresh_embeddings(hotel_ids, export=False)
+            # price / city edits change the similar-hotel lists even when no vector did
+            if publish and (encoded or similar_enabled()):
+                publisher().add(hotel_ids, export=encoded > 0)
+    with stage("catalogue.invalidate"):
+        bump_catalogue_version()
+        clear_local_caches()
+    return encoded
+
+
+def publish_changes(hotel_ids=None, export=True):
+    """
+    Make processed changes visible: export the vector store (with `export`),
+    update the similar-hotel lists of `hotel_ids` (rebuild all of them when
+    None) while SIMILAR_HOTELS is on, and invalidate caches computed on the
+    old vectors. Returns `(vectors exported, similar lists written)`, None
+    for a step that did not run.
+    """
+    exported = updated = None
+    if export:
+        with stage("catalogue.export"):
+            exported = export_vector_store()
+    if similar_enabled():
+        with stage("catalogue.similar"):
+            updated = build_similar_hotels() if hotel_ids is None else update_similar_hotels(hotel_ids)
+    with stage("catalogue.invalidate"):
+        bump_catalogue_version()
+        clear_local_caches()
+    return exported, updated
+
+
+class Publisher:
+    """
+    Collects hotels changed by synchronous writes and publishes them from a
+    timer thread VECTOR_STORE_EXPORT_DELAY seconds after the first one, so a
+    burst of writes costs one export and no request waits for it. `flush()`
+    publishes at once; it also runs at interpreter exit.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = set()
+        self._export = False
+        self._timer = None
+
+    def add(self, hotel_ids, export=True):
+        with self._lock:
+            self._ids.update(hotel_ids)
+            self._export = self._export or export
+            if self._timer is None:
+                self._timer = threading.Timer(getattr(settings, "VECTOR_STORE_EXPORT_DELAY", 5), self._run)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def pending(self):
+        with self._lock:
+            return len(self._ids)
+
+    def flush(self):
+        """Publish everything collected so far. Returns what `publish_changes` did, or None."""
+        with self._lock:
+            hotel_ids, export, timer = self._ids, self._export, self._timer
+            self._ids, self._export, self._timer = set(), False, None
+        if timer is not None:
+            timer.cancel()
+        if not hotel_ids and not export:
+            return None
+        return publish_changes(hotel_ids, export=export)
+
+    def _run(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Publishing changed hotels failed; run `manage.py build_embeddings` to export them.")
+        finally:
+            connections.close_all()  # this thread's connections only
+
+
+_publisher = None
+_publisher_lock = threading.Lock()
+
+
+def publisher():
+    global _publisher
+    if _publisher is None:
+        with _publisher_lock:
+            if _publisher is None:
+                _publisher = Publisher()
+                atexit.register(_publisher.flush)
+    return _publisher
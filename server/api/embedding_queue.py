@@ -0,0 +1,151 @@
+"""
+Database-backed queue of hotels to re-embed (EMBEDDING_QUEUE).
+
+Upserts call `enqueue_embeddings`, which costs one bulk write instead of a
+model call per hotel; `manage.py embedding_worker` claims jobs in large
+batches, encodes them and re-exports the vector store. Claims are leases
+(EMBEDDING_QUEUE_LEASE seconds), so several workers can share the queue
+and jobs of a crashed worker are picked up again once the lease expires.
+A hotel changed while its job is being processed stays queued.
+"""
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Min, Q
+from django.utils import timezone
+
+from .embeddings import encode, hotel_document, save_embeddings, stale_hotels
+from .models import EmbeddingJob, EmbeddingQueueState
+
+ID_CHUNK_SIZE = 500  # keep `id__in` lists under SQLite's variable limit
+RATE_SMOOTHING = 0.3
+
+
+def _chunks(seq, size):
+    for start in range(0, len(seq), size):
+        yield seq[start:start + size]
+
+
+def enqueue_embeddings(hotel_ids):
+    """Queue `hotel_ids` for re-embedding; returns how many ids were given."""
+    hotel_ids = list(dict.fromkeys(hotel_ids))
+    now = timezone.now()
+    for chunk in _chunks(hotel_ids, ID_CHUNK_SIZE):
+        EmbeddingJob.objects.bulk_create(
+            [EmbeddingJob(hotel_id=pk, enqueued_at=now, requested_at=now) for pk in chunk],
+            update_conflicts=True,
+            unique_fields=["hotel"],
+            update_fields=["requested_at"],
+        )
+    return len(hotel_ids)
+
+
+def _available(now):
+    return Q(leased_until__isnull=True) | Q(leased_until__lt=now)
+
+
+def claim_jobs(limit, lease=None):
+    """
+    Lease up to `limit` of the oldest available jobs. Returns
+    `(owner, hotel_ids, claimed_at)`; `hotel_ids` is empty when nothing is due.
+    """
+    lease = lease or getattr(settings, "EMBEDDING_QUEUE_LEASE", 600)
+    owner = uuid.uuid4().hex
+    now = timezone.now()
+    candidates = list(
+        EmbeddingJob.objects.filter(_available(now))
+        .order_by("enqueued_at").values_list("hotel_id", flat=True)[:limit]
+    )
+    for chunk in _chunks(candidates, ID_CHUNK_SIZE):
+        # re-checking availability makes a job go to exactly one of two racing workers
+        EmbeddingJob.objects.filter(_available(now), hotel_id__in=chunk).update(
+            lease_owner=owner, leased_until=now + timedelta(seconds=lease), attempts=F("attempts") + 1,
+        )
+    hotel_ids = list(EmbeddingJob.objects.filter(lease_owner=owner).values_list("hotel_id", flat=True))
+    return owner, hotel_ids, now
+
+
+def complete_jobs(owner, claimed_at, elapsed):
+    """Remove the finished jobs of a claim and record the batch's throughput."""
+    jobs = EmbeddingJob.objects.filter(lease_owner=owner)
+    done = jobs.filter(requested_at__lte=claimed_at).delete()[0]
+    # changed again while being encoded: back in the queue
+    jobs.update(lease_owner="", leased_until=None)
+
+    if done:
+        rate = done / elapsed if elapsed > 0 else 0.0
+        state, _ = EmbeddingQueueState.objects.get_or_create(pk=1)
+        state.processed += done
+        state.rate = rate if not state.rate else (1 - RATE_SMOOTHING) * state.rate + RATE_SMOOTHING * rate
+        state.last_batch_at = timezone.now()
+        state.save()
+    return done
+
+
+def release_jobs(owner):
+    """Give a claim back after a failure, so the jobs are retried."""
+    EmbeddingJob.objects.filter(lease_owner=owner).update(lease_owner="", leased_until=None)
+
+
+def process_jobs(hotel_ids, encode_texts=encode):
+    """
+    Re-embed the hotels of a claim whose content actually changed.
+    `encode_texts(texts)` returns their vectors in order (the worker passes
+    one that fans out over a process pool). Returns the number encoded.
+    """
+    stale = stale_hotels(hotel_ids)
+    if stale:
+        save_embeddings(stale, encode_texts([hotel_document(h) for h, _ in stale]))
+    return len(stale)
+
+
+def queue_status():
+    """Pending and leased job counts, the age of the oldest job, and throughput."""
+    now = timezone.now()
+    pending = EmbeddingJob.objects.count()
+    leased = EmbeddingJob.objects.filter(leased_until__gte=now).count()
+    oldest = EmbeddingJob.objects.aggregate(oldest=Min("enqueued_at"))["oldest"]
+    state = EmbeddingQueueState.objects.filter(pk=1).first()
+    rate = state.rate if state else 0.0
+    return {
+        "pending": pending,
+        "leased": leased,
+        "lag_seconds": round((now - oldest).total_seconds(), 1) if oldest else 0.0,
+        "processed": state.processed if state else 0,
+        "rate_per_second": round(rate, 1),
+        "last_batch_at": state.last_batch_at.isoformat() if state and state.last_batch_at else None,
+        "eta_seconds": round(pending / rate, 1) if pending and rate else None,
+    }
+
+
+def run_batch(batch_size, encode_texts=encode):
+    """
+    Claim, process and complete one batch of jobs. Returns `(hotel_ids,
+    encoded, done, elapsed)`, or None when no job is due. A failure gives
+    the claim back before re-raising.
+    """
+    owner, hotel_ids, claimed_at = claim_jobs(batch_size)
+    if not hotel_ids:
+        return None
+    start = time.perf_counter()
+    try:
+        encoded = process_jobs(hotel_ids, encode_texts)
+    except BaseException:
+        release_jobs(owner)
+        raise
+    elapsed = time.perf_counter() - start
+    return hotel_ids, encoded, complete_jobs(owner, claimed_at, elapsed), elapsed
+
+
+def drain_queue(batch_size=None, encode_texts=encode):
+    """Process every queued job in this process. Returns `(processed, encoded)`."""
+    batch_size = batch_size or getattr(settings, "EMBEDDING_QUEUE_BATCH_SIZE", 5000)
+    processed = encoded = 0
+    while True:
+        batch = run_batch(batch_size, encode_texts)
+        if batch is None:
+            return processed, encoded
+        processed += batch[2]
+        encoded += batch[1]
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import logging
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .batching import get_batcher
+from .models import EmbeddingJob, Hotel, HotelEmbedding
+from .providers import get_provider
+from .vector_store import export_vector_store, store
+
+# fields needed to build the embedded text (and its hash)
+EMBED_FIELDS = ("id", "name", "city", "description", "amenities", "ideal_for")
+ENCODE_BATCH_SIZE = 256
+ID_CHUNK_SIZE = 500  # keep `id__in` lists under SQLite's variable limit
+CHECK_INTERVAL = 60  # seconds between the health warnings of one process
+
+logger = logging.getLogger(__name__)
+_checked_at = {}
+
+
+def hotel_document(h):
+    """Text that represents a hotel for semantic matching."""
+    desc = f"{h.name} is a {h.city} hotel. {h.description}. "
+    desc += f"It has {' '.join(h.amenities)}. "
+    desc += f"Good for {' '.join(h.ideal_for)}."
+    return desc
+
+
+def content_hash(h):
+    payload = json.dumps(
+        [h.name, h.city, h.description, h.amenities, h.ideal_for],
+        ensure_ascii=False, sort_keys=True,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def encode(texts):
+    """Encode a list of texts into L2-normalised float32 vectors."""
+    vectors = []
+    for batch in _chunks(list(texts), ENCODE_BATCH_SIZE):
+        vectors.append(get_provider().encode(batch))
+    if not vectors:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.vstack(vectors)
+
+
+def encode_query(text):
+    """
+    Encode one query. With EMBEDDING_BATCHING on, concurrent queries share
+    a micro-batch instead of each paying for a separate model call.
+    """
+    if getattr(settings, "EMBEDDING_BATCHING", True):
+        return get_batcher().submit(text).result()
+    return encode([text])[0]
+
+
+def _chunks(seq, size):
+    for start in range(0, len(seq), size):
+        yield seq[start:start + size]
+
+
+def stale_hotels(hotel_ids=None, force=False):
+    """
+    `[(hotel, content_hash)]` for hotels with no embedding yet or whose
+    content hash changed (all of them with `force`), optionally restricted
+    to `hotel_ids`. Hotels carry only EMBED_FIELDS.
+    """
+    if hotel_ids is None:
+        scopes = [(Hotel.objects.all(), HotelEmbedding.objects.all())]
+    else:
+        hotel_ids = list(dict.fromkeys(hotel_ids))
+        scopes = [
+            (Hotel.objects.filter(id__in=chunk), HotelEmbedding.objects.filter(hotel_id__in=chunk))
+            for chunk in _chunks(hotel_ids, ID_CHUNK_SIZE)
+        ]
+
+    stale = []
+    for hotels, embeddings in scopes:
+        known = dict(embeddings.values_list("hotel_id", "content_hash"))
+        for h in hotels.only(*EMBED_FIELDS).iterator():
+            digest = content_hash(h)
+            if force or known.get(h.id) != digest:
+                stale.append((h, digest))
+    return stale
+
+
+def save_embeddings(stale, vectors):
+    """Store `vectors` for the `(hotel, content_hash)` pairs of `stale_hotels`."""
+    rows = [
+        HotelEmbedding(hotel_id=h.id, content_hash=digest, vector=vec.tobytes())
+        for (h, digest), vec in zip(stale, vectors)
+    ]
+    HotelEmbedding.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["hotel"],
+        update_fields=["content_hash", "vector", "updated_at"],
+    )
+
+
+def refresh_embeddings(hotel_ids=None, force=False, export=True):
+    """
+    Encode hotels that have no embedding yet or whose content hash changed,
+    then re-export the serving vector store if anything was encoded (unless
+    `export` is false: the caller publishes later). Restrict to `hotel_ids`
+    when given. Returns the number of hotels encoded.
+    """
+    stale = stale_hotels(hotel_ids, force)
+    for batch in _chunks(stale, ENCODE_BATCH_SIZE):
+        save_embeddings(batch, encode([hotel_document(h) for h, _ in batch]))
+    if stale and export:
+        export_vector_store()
+    return len(stale)
+
+
+def embedding_queue_enabled():
+    return getattr(settings, "EMBEDDING_QUEUE", False)
+
+
+def _due(check):
+    """Whether `check` should run now: at most once per CHECK_INTERVAL per process."""
+    now = time.monotonic()
+    last = _checked_at.get(check)
+    if last is not None and now - last < CHECK_INTERVAL:
+        return False
+    _checked_at[check] = now
+    return True
+
+
+def warn_if_queue_unattended():
+    """
+    With EMBEDDING_QUEUE, log a warning (checked at most once a minute per
+    process) when jobs have waited longer than EMBEDDING_QUEUE_STALL_WARNING
+    seconds and none is leased: no `embedding_worker` seems to be running,
+    so those hotels are missing from recommendations.
+    """
+    if not _due("queue"):
+        return
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, "EMBEDDING_QUEUE_STALL_WARNING", 300))
+    stalled = EmbeddingJob.objects.filter(enqueued_at__lt=cutoff).count()
+    if stalled and not EmbeddingJob.objects.filter(leased_until__gte=timezone.now()).exists():
+        logger.warning(
+            "%d hotels have waited over %ss for re-embedding and no embedding_worker holds a job; "
+            "they are left out of recommendations until `manage.py embedding_worker` runs.",
+            stalled, getattr(settings, "EMBEDDING_QUEUE_STALL_WARNING", 300),
+        )
+
+
+def warn_if_store_behind():
+    """
+    Log a warning (checked at most once a minute per process) when the
+    vector store holds fewer hotels than the database. Those hotels are
+    left out of recommendations until the next export: by the background
+    export or `embedding_worker` after a write, or `manage.py
+    build_embeddings` for hotels inserted some other way (e.g. the admin).
+    """
+    if not _due("store"):
+        return
+    exported, hotels = len(store), Hotel.objects.count()
+    if exported < hotels:
+        logger.warning(
+            "The vector store holds %d of %d hotels; the rest are left out of recommendations "
+            "until it is exported again (run `manage.py build_embeddings` if this persists).",
+            exported, hotels,
+        )
+
+
+def search_hotels(query, limit, offset=0, candidate_ids=None, text=None, lexical_weight=0.0):
+    """
+    Rank hotels against an encoded query using the memory-mapped vector store.
+    With `text` and a positive `lexical_weight` the ranking is hybrid: BM25
+    shortlists, the dense query re-scores the shortlist.
+    The store is served as last exported: nothing is encoded or exported
+    here, hotels not in it yet are left out (see `warn_if_store_behind`).
+    """
+    if embedding_queue_enabled():
+        warn_if_queue_unattended()
+    warn_if_store_behind()
+    if text and lexical_weight > 0:
+        return store.hybrid_search(
+            query, text, limit, offset=offset, candidate_ids=candidate_ids,
+            lexical_weight=lexical_weight,
+            shortlist=getattr(settings, "HYBRID_SHORTLIST", 1000),
+        )
+    return store.search(query, limit, offset=offset, candidate_ids=candidate_ids)
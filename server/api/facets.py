@@ -0,0 +1,82 @@
+"""
+Filter-sidebar counts for a (possibly filtered) set of hotels.
+
+Everything is aggregated in the database: one query for the price and rating
+buckets, one GROUP BY for cities and one over the label tables for amenities.
+"""
+from django.conf import settings
+from django.db.models import Count, Q
+
+from .models import HotelLabel, Label
+
+DEFAULT_PRICE_BUCKETS = (1000, 2500, 5000, 10000)
+DEFAULT_RATING_BUCKETS = (3.0, 3.5, 4.0, 4.5)
+
+
+def _ranges(bounds):
+    """(1000, 2500) -> [(None, 1000), (1000, 2500), (2500, None)]"""
+    bounds = sorted(bounds)
+    return list(zip([None] + bounds, bounds + [None]))
+
+
+def _bucket_q(field, low, high):
+    q = Q(**{f"{field}__isnull": False})
+    if low is not None:
+        q &= Q(**{f"{field}__gte": low})
+    if high is not None:
+        q &= Q(**{f"{field}__lt": high})
+    return q
+
+
+def _range_facets(aggregates, prefix, ranges):
+    return {
+        "buckets": [
+            {"min": low, "max": high, "count": aggregates[f"{prefix}_{i}"]}
+            for i, (low, high) in enumerate(ranges)
+        ],
+        "unknown": aggregates[f"{prefix}_unknown"],
+    }
+
+
+def compute_facets(hotels, city_limit=None, amenity_limit=None):
+    """
+    Counts per city, price bucket, rating bucket and amenity for the hotels
+    in the `hotels` queryset. Buckets are half-open `[min, max)`; hotels
+    without a price or rating are counted under `unknown`.
+    """
+    city_limit = city_limit or getattr(settings, "FACET_CITY_LIMIT", 50)
+    amenity_limit = amenity_limit or getattr(settings, "FACET_AMENITY_LIMIT", 50)
+    price_ranges = _ranges(getattr(settings, "FACET_PRICE_BUCKETS", DEFAULT_PRICE_BUCKETS))
+    rating_ranges = _ranges(getattr(settings, "FACET_RATING_BUCKETS", DEFAULT_RATING_BUCKETS))
+
+    buckets = {"total": Count("id")}
+    for i, (low, high) in enumerate(price_ranges):
+        buckets[f"price_{i}"] = Count("id", filter=_bucket_q("price_per_night", low, high))
+    for i, (low, high) in enumerate(rating_ranges):
+        buckets[f"rating_{i}"] = Count("id", filter=_bucket_q("rating", low, high))
+    buckets["price_unknown"] = Count("id", filter=Q(price_per_night__isnull=True))
+    buckets["rating_unknown"] = Count("id", filter=Q(rating__isnull=True))
+    aggregates = hotels.aggregate(**buckets)
+
+    cities = (
+        hotels.exclude(city="")
+        .values("city")
+        .annotate(count=Count("id"))
+        .order_by("-count", "city")[:city_limit]
+    )
+    amenities = (
+        HotelLabel.objects.filter(label__kind=Label.AMENITY, hotel__in=hotels.values("id"))
+        .values("label__key", "label__name")
+        .annotate(count=Count("hotel_id"))
+        .order_by("-count", "label__key")[:amenity_limit]
+    )
+    return {
+        "total": aggregates["total"],
+        "city": [{"value": row["city"], "count": row["count"]} for row in cities],
+        "price": _range_facets(aggregates, "price", price_ranges),
+        "rating": _range_facets(aggregates, "rating", rating_ranges),
+        "amenity": [
+            {"key": row["label__key"], "name": row["label__name"], "count": row["count"]}
+            for row in amenities
+        ],
+    }
@@ -0,0 +1,136 @@
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+
+from .labels import hotels_with_label, normalize_label, sdg_number
+from .models import Label
+
+DEFAULT_RULE_WEIGHTS = {
+    "ai": 50,          # multiplies the cosine similarity
+    "amenities": 20,   # times the share of requested amenities the hotel has
+    "sdg": 10,         # hotel supports the requested SDG
+    "rating": 5,       # scaled from rating 3.0 (0) to 5.0 (full weight)
+    "budget": 5,       # price known and inside the requested range
+}
+
+
+def rule_weights():
+    weights = dict(DEFAULT_RULE_WEIGHTS)
+    weights.update(getattr(settings, "RECOMMEND_RULE_WEIGHTS", {}))
+    return weights
+
+
+def _to_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def _to_number(value, cast):
+    if value in (None, ""):
+        return None
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_filters(data):
+    """
+    Structured filters from a recommend body. Budget and `minRating` are hard
+    filters; amenities and SDG only add to the rule score unless
+    `requireAmenities` / `requireSdg` make them hard as well.
+    """
+    amenities = data.get("amenities") or []
+    if isinstance(amenities, str):
+        amenities = [amenities]
+    return {
+        "min_budget": _to_number(data.get("minBudget"), int),
+        "max_budget": _to_number(data.get("maxBudget"), int),
+        "min_rating": _to_number(data.get("minRating"), float),
+        "amenities": [a for a in (normalize_label(a) for a in amenities) if a],
+        "sdg": sdg_number(data.get("sdg", "")),
+        "require_amenities": _to_bool(data.get("requireAmenities", False)),
+        "require_sdg": _to_bool(data.get("requireSdg", False)),
+    }
+
+
+def apply_hard_filters(qs, filters):
+    """
+    Narrow `qs` in the database. Returns `(qs, narrowed)` where `narrowed`
+    tells whether any filter was applied (callers can then skip
+    materialising a candidate list for the unfiltered catalogue).
+    """
+    narrowed = False
+    if filters["min_budget"] is not None and filters["min_budget"] > 0:
+        # hotels without a price are kept: unknown is not out of budget
+        qs = qs.filter(Q(price_per_night__gte=filters["min_budget"]) | Q(price_per_night__isnull=True))
+        narrowed = True
+    if filters["max_budget"] is not None:
+        qs = qs.filter(Q(price_per_night__lte=filters["max_budget"]) | Q(price_per_night__isnull=True))
+        narrowed = True
+    if filters["min_rating"] is not None:
+        qs = qs.filter(rating__gte=filters["min_rating"])
+        narrowed = True
+    if filters["require_amenities"]:
+        # one indexed semi-join per amenity against the label tables
+        for amenity in filters["amenities"]:
+            qs = qs.filter(id__in=hotels_with_label(Label.AMENITY, amenity, substring=True))
+            narrowed = True
+    if filters["require_sdg"] and filters["sdg"]:
+        qs = qs.filter(id__in=hotels_with_label(Label.SDG, filters["sdg"]))
+        narrowed = True
+    return qs, narrowed
+
+
+def combine_scores(ai_scores, hotels, filters, weights=None):
+    """
+    Final scores for `hotels` (dicts with price_per_night, rating, amenities,
+    sdg_tags), aligned with `ai_scores`. Per-hotel features are gathered into
+    arrays once and combined in a single vectorized pass.
+    Returns `(final, rule, reasons)`.
+    """
+    weights = weights or rule_weights()
+    n = len(hotels)
+    wanted = filters["amenities"]
+    amenity_hits = np.zeros(n)
+    sdg_hit = np.zeros(n, dtype=bool)
+    ratings = np.full(n, np.nan)
+    prices = np.full(n, np.nan)
+    for i, h in enumerate(hotels):
+        if wanted:
+            labels = [normalize_label(a) for a in h["amenities"] or []]
+            amenity_hits[i] = sum(any(w in label for label in labels) for w in wanted)
+        if filters["sdg"]:
+            sdg_hit[i] = filters["sdg"] in {sdg_number(t) for t in h["sdg_tags"] or []}
+        if h["rating"] is not None:
+            ratings[i] = h["rating"]
+        if h["price_per_night"] is not None:
+            prices[i] = h["price_per_night"]
+
+    amenity_share = amenity_hits / len(wanted) if wanted else amenity_hits
+    rating_part = np.clip((np.nan_to_num(ratings, nan=3.0) - 3.0) / 2.0, 0.0, 1.0)
+    low = filters["min_budget"] if filters["min_budget"] is not None else -np.inf
+    high = filters["max_budget"] if filters["max_budget"] is not None else np.inf
+    with np.errstate(invalid="ignore"):
+        in_budget = (prices >= low) & (prices <= high)
+
+    rule = (
+        weights["amenities"] * amenity_share
+        + weights["sdg"] * sdg_hit
+        + weights["rating"] * rating_part
+        + weights["budget"] * in_budget
+    )
+    final = weights["ai"] * np.asarray(ai_scores, dtype=np.float64) + rule
+
+    reasons = []
+    for i in range(n):
+        parts = []
+        if wanted and amenity_hits[i]:
+            parts.append(f"Has {int(amenity_hits[i])} of {len(wanted)} requested amenities.")
+        if sdg_hit[i]:
+            parts.append(f"Supports SDG {filters['sdg']}.")
+        if ratings[i] >= 4.5:
+            parts.append(f"Highly rated ({ratings[i]:g}).")
+        reasons.append(parts)
+    return final, rule, reasons
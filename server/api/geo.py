@@ -0,0 +1,191 @@
+"""
+In-process spatial index over hotel coordinates, behind the `near` /
+`radius` / `nearest` parameters of the hotel list and recommend.
+
+Hotels are bucketed into a latitude/longitude grid of GEO_CELL_DEGREES and
+kept sorted by cell, so a query finds the cells overlapping its bounding box
+with a few `searchsorted` calls and measures great-circle distances only
+for the hotels in them. A k-nearest search widens its box until the k-th
+hit is provably inside it. Like the random-hotel pool, the index is
+reloaded when the catalogue version moves (every upsert and import) or
+after GEO_INDEX_TTL seconds.
+"""
+import math
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from .catalogue import catalogue_version
+from .models import Hotel
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def parse_point(value):
+    """`(lat, lng)` from "lat,lng", `[lat, lng]` or `{"lat": .., "lng": ..}`; ValueError if invalid."""
+    if isinstance(value, dict):
+        value = (value.get("lat", value.get("latitude")), value.get("lng", value.get("lon", value.get("longitude"))))
+    elif isinstance(value, str):
+        value = value.split(",")
+    try:
+        lat, lng = (float(v) for v in value)
+    except (TypeError, ValueError):
+        raise ValueError("`near` must be \"lat,lng\".")
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError("`near` is outside the valid latitude/longitude range.")
+    return lat, lng
+
+
+def _positive(value, cast):
+    try:
+        value = cast(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+def parse_geo(data):
+    """
+    `{"lat", "lng", "radius", "nearest"}` from request parameters, or None
+    without `near`. `radius` is in km; `nearest` caps the result at the k
+    closest hotels. With neither, GEO_DEFAULT_RADIUS_KM applies.
+    """
+    near = data.get("near")
+    if near in (None, "", [], {}):
+        return None
+    lat, lng = parse_point(near)
+    radius = _positive(data.get("radius"), float)
+    nearest = _positive(data.get("nearest"), int)
+    if nearest is not None:
+        nearest = min(nearest, getattr(settings, "GEO_MAX_NEAREST", 1000))
+    if radius is None and nearest is None:
+        radius = getattr(settings, "GEO_DEFAULT_RADIUS_KM", 5.0)
+    return {"lat": lat, "lng": lng, "radius": radius, "nearest": nearest}
+
+
+def geo_key(geo):
+    """Stable text form of parsed geo parameters, for cache keys."""
+    if not geo:
+        return ""
+    return f"{geo['lat']:.6f},{geo['lng']:.6f},{geo['radius']},{geo['nearest']}"
+
+
+def haversine_km(lat, lng, lats, lngs):
+    """Great-circle distance from one point to arrays of points (all in radians)."""
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lngs - lng) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GeoIndex:
+    def __init__(self, cell_degrees=0.05, ttl=300):
+        self.cell = cell_degrees
+        self.n_lat = math.ceil(180 / cell_degrees)
+        self.n_lng = math.ceil(360 / cell_degrees)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._version = None
+        self._loaded_at = 0.0
+        # (ids, lat radians, lng radians, sorted cell keys) swapped as one tuple
+        self._data = ([], np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.int64))
+
+    def _cell_rows(self, lat):
+        return np.clip(np.floor((np.asarray(lat) + 90) / self.cell), 0, self.n_lat - 1).astype(np.int64)
+
+    def _cell_cols(self, lng):
+        return (np.floor((np.asarray(lng) + 180) / self.cell).astype(np.int64)) % self.n_lng
+
+    def data(self, force=False):
+        version = catalogue_version()
+        stale = force or version != self._version or time.monotonic() - self._loaded_at > self.ttl
+        if stale:
+            with self._lock:
+                rows = Hotel.objects.filter(latitude__isnull=False, longitude__isnull=False)
+                rows = list(rows.values_list("id", "latitude", "longitude").iterator(chunk_size=10000))
+                lat = np.array([r[1] for r in rows], dtype=np.float64)
+                lng = np.array([r[2] for r in rows], dtype=np.float64)
+                keys = self._cell_rows(lat) * self.n_lng + self._cell_cols(lng)
+                order = np.argsort(keys, kind="stable")
+                self._data = (
+                    [rows[i][0] for i in order], np.radians(lat[order]), np.radians(lng[order]), keys[order]
+                )
+                self._version, self._loaded_at = version, time.monotonic()
+        return self._data
+
+    def __len__(self):
+        return len(self.data()[0])
+
+    def _box(self, keys, lat, lng, radius):
+        """Positions of the hotels in the grid cells covering `radius` km around the point."""
+        dlat = radius / KM_PER_DEGREE
+        lo, hi = lat - dlat, lat + dlat
+        if lo <= -90 or hi >= 90:
+            dlng = 180.0
+        else:
+            dlng = min(180.0, dlat / max(math.cos(math.radians(max(abs(lo), abs(hi)))), 1e-12))
+        if dlng >= 180 and dlat >= 90:
+            return np.arange(len(keys))
+        if dlng >= 180:
+            spans = [(0, self.n_lng - 1)]
+        else:
+            first, last = (int(c) for c in self._cell_cols([lng - dlng, lng + dlng]))
+            spans = [(first, last)] if first <= last else [(first, self.n_lng - 1), (0, last)]
+        cell_rows = np.arange(self._cell_rows(lo), self._cell_rows(hi) + 1)
+        starts = np.concatenate([cell_rows * self.n_lng + a for a, _ in spans])
+        ends = np.concatenate([cell_rows * self.n_lng + b for _, b in spans])
+        starts = np.searchsorted(keys, starts, side="left")
+        ends = np.searchsorted(keys, ends, side="right")
+        if not len(starts):
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([np.arange(s, e) for s, e in zip(starts, ends) if e > s] or [np.zeros(0, dtype=np.int64)])
+
+    def query(self, lat, lng, radius=None, nearest=None, allowed=None):
+        """
+        `[(hotel_id, distance_km)]`, closest first: every hotel within
+        `radius` km, cut to the `nearest` closest when given. With `allowed`
+        (a set of ids) only those hotels count, also toward `nearest`.
+        """
+        ids, lats, lngs, keys = self.data()
+        if not ids:
+            return []
+        qlat, qlng = math.radians(lat), math.radians(lng)
+        limit = radius if radius is not None else math.pi * EARTH_RADIUS_KM
+        # a k-nearest search starts with one cell and doubles until the k-th hit is inside the box
+        search = limit if nearest is None else min(limit, self.cell * KM_PER_DEGREE)
+        while True:
+            positions = self._box(keys, lat, lng, search)
+            distances = haversine_km(qlat, qlng, lats[positions], lngs[positions])
+            inside = distances <= search
+            if allowed is not None:
+                inside &= np.fromiter((ids[p] in allowed for p in positions), dtype=bool, count=len(positions))
+            if nearest is None or search >= limit or np.count_nonzero(inside) >= nearest:
+                break
+            search = min(limit, search * 2)
+        positions, distances = positions[inside], distances[inside]
+        order = np.lexsort((positions, distances))
+        if nearest is not None:
+            order = order[:nearest]
+        return [(ids[p], float(d)) for p, d in zip(positions[order], distances[order])]
+
+
+_index = None
+
+
+def geo_index():
+    global _index
+    if _index is None:
+        _index = GeoIndex(
+            cell_degrees=getattr(settings, "GEO_CELL_DEGREES", 0.05),
+            ttl=getattr(settings, "GEO_INDEX_TTL", 300),
+        )
+    return _index
+
+
+def near_hotels(geo, candidate_ids=None):
+    """`[(hotel_id, km)]` matching parsed geo parameters, closest first, optionally within `candidate_ids`."""
+    return geo_index().query(
+        geo["lat"], geo["lng"], radius=geo["radius"], nearest=geo["nearest"],
+        allowed=set(candidate_ids) if candidate_ids is not None else None,
+    )
@@ -0,0 +1,76 @@
+"""
+Conditional GETs for the hotel endpoints.
+
+Single hotels are validated by their `updated_at`; collections by the
+catalogue version, which every upsert bumps. Views check the request's
+validators before touching the hotel rows, so a 304 costs one small query
+and no serialization.
+"""
+import hashlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+DEFAULT_CACHE_CONTROL = {
+    "list": "public, max-age=30",
+    "retrieve": "public, max-age=300",
+    "random": "public, max-age=30",
+    "facets": "public, max-age=60",
+    "suggest": "public, max-age=300",
+    "similar": "public, max-age=300",
+}
+
+
+def weak_etag(*parts):
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(request, etag):
+    """Weak comparison of `etag` against the request's If-None-Match."""
+    header = request.headers.get("If-None-Match", "")
+    if header.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in {e.removeprefix("W/") for e in parse_etags(header)}
+
+
+def not_modified(request, etag=None, last_modified=None):
+    """
+    True when the client's copy is still current. If-None-Match takes
+    precedence; If-Modified-Since is only used when it is absent.
+    """
+    if request.headers.get("If-None-Match"):
+        return etag is not None and etag_matches(request, etag)
+    since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+    if since is not None and last_modified is not None:
+        return int(last_modified.timestamp()) <= since
+    return False
+
+
+def cache_control(action):
+    return getattr(settings, "HOTEL_CACHE_CONTROL", DEFAULT_CACHE_CONTROL).get(action)
+
+
+def set_validators(response, action, etag=None, last_modified=None):
+    """Add ETag / Last-Modified / Cache-Control to `response` and return it."""
+    if etag:
+        response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    control = cache_control(action)
+    if control:
+        response["Cache-Control"] = control
+    # JSON and the browsable API share URLs
+    patch_vary_headers(response, ["Accept"])
+    return response
+
+
+def conditional(request, action, etag=None, last_modified=None):
+    """A 304 response when the client's copy is current, otherwise None."""
+    if request.method in ("GET", "HEAD") and not_modified(request, etag, last_modified):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        return set_validators(response, action, etag, last_modified)
+    return None
@@ -0,0 +1,90 @@
+"""
+Bounded thread pool for the CPU-bound part of a recommendation (query
+encoding, vector search, rule scoring), used by the async views so the event
+loop never waits on the model.
+
+Admission is bounded: once `max_pending` tasks are queued or running,
+`submit` raises `InferenceBusy` instead of letting latency grow without
+limit, and the view answers 429 with Retry-After.
+"""
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+
+class InferenceBusy(Exception):
+    pass
+
+
+class BoundedExecutor:
+    def __init__(self, max_workers=4, max_pending=32):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(self.max_workers, max_pending)
+        self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="inference")
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._rejected = 0
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise InferenceBusy()
+        with self._lock:
+            self._pending += 1
+        try:
+            # copy the caller's context so stage timings land on its request
+            future = self._pool.submit(contextvars.copy_context().run, self._call, fn, args)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    @staticmethod
+    def _call(fn, args):
+        # pool threads outlive requests, so they manage their own connections
+        close_old_connections()
+        try:
+            return fn(*args)
+        finally:
+            close_old_connections()
+
+    async def run(self, fn, *args):
+        """Await `fn(*args)` on the pool. Raises `InferenceBusy` when full."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "rejected": self._rejected,
+            }
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_inference_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = BoundedExecutor(
+                    max_workers=getattr(settings, "ASYNC_INFERENCE_WORKERS", 4),
+                    max_pending=getattr(settings, "ASYNC_INFERENCE_MAX_PENDING", 32),
+                )
+    return _executor
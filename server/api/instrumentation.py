@@ -0,0 +1,254 @@
+"""
+Hot-path instrumentation: per-stage timers, Server-Timing headers, one
+structured log line per request, Prometheus histograms and counters and an
+opt-in per-request cProfile.
+
+Code marks a phase with `with stage("recommend.encode"):`. The duration is
+always observed in the `stayfinder_stage_seconds` histogram (served at
+/api/metrics/); inside a request handled by `TimingMiddleware`, or a
+`collect()` block, it is also added to that request's Server-Timing header
+and log line. Histograms live in the process: with several workers each one
+reports its own.
+"""
+import bisect
+import contextvars
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name -> seconds of the stages run in the current request (None outside one)
+_timings = contextvars.ContextVar("stage_timings", default=None)
+
+
+class Histogram:
+    """Prometheus histogram with a fixed label set, safe across threads."""
+
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [count per bucket (last is +Inf), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][slot] += 1
+            series[1] += value
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((values, list(counts), total) for values, (counts, total) in self._series.items())
+        for values, counts, total in series:
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (None,), counts):
+                cumulative += count
+                le = "+Inf" if bound is None else f"{bound:g}"
+                lines.append(f'{self.name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return "\n".join(lines)
+
+
+class Counter:
+    """Prometheus counter with a fixed label set, safe across threads."""
+
+    def __init__(self, name, documentation, labels):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+            lines.append(f"{self.name}{{{labels}}} {value}" if labels else f"{self.name} {value}")
+        return "\n".join(lines)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_histograms = None
+_histograms_lock = threading.Lock()
+
+
+def histograms():
+    """`(request_seconds, stage_seconds)`, created with METRICS_BUCKETS on first use."""
+    global _histograms
+    if _histograms is None:
+        with _histograms_lock:
+            if _histograms is None:
+                buckets = getattr(settings, "METRICS_BUCKETS", DEFAULT_BUCKETS)
+                _histograms = (
+                    Histogram("stayfinder_request_seconds", "HTTP request latency.",
+                              ("view", "method", "status"), buckets),
+                    Histogram("stayfinder_stage_seconds", "Time spent in one stage of a request or job.",
+                              ("stage",), buckets),
+                )
+    return _histograms
+
+
+_counters = {}
+
+
+def counter(name, documentation, labels=()):
+    """The process-wide counter `name`, registered on first use."""
+    with _histograms_lock:
+        if name not in _counters:
+            _counters[name] = Counter(name, documentation, labels)
+        return _counters[name]
+
+
+def render_metrics():
+    """This process's histograms and counters in the Prometheus text exposition format."""
+    metrics = list(histograms()) + [_counters[name] for name in sorted(_counters)]
+    return "\n".join(m.expose() for m in metrics) + "\n"
+
+
+def record(name, seconds):
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+    histograms()[1].observe(seconds, name)
+
+
+@contextmanager
+def stage(name):
+    """Time the block as stage `name` (repeated stages add up)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+@contextmanager
+def collect():
+    """Gather the stages run inside the block into the yielded dict (name -> seconds)."""
+    timings = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def server_timing(timings, total):
+    entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+def profile_requested(request):
+    """True when the request carries PROFILE_HEADER set to PROFILE_TOKEN (off while unset)."""
+    token = getattr(settings, "PROFILE_TOKEN", None)
+    value = request.headers.get(getattr(settings, "PROFILE_HEADER", "X-Profile"))
+    return bool(token and value) and constant_time_compare(value, token)
+
+
+def save_profile(profiler, request):
+    """Write the profile to PROFILE_DIR, log its top functions, return the file name."""
+    directory = getattr(settings, "PROFILE_DIR", None) or os.path.join(tempfile.gettempdir(), "stayfinder-profiles")
+    os.makedirs(directory, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.prof"
+    profiler.dump_stats(os.path.join(directory, name))
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(
+        getattr(settings, "PROFILE_TOP", 30)
+    )
+    logger.info("Profile of %s %s saved as %s\n%s", request.method, request.path, name, out.getvalue())
+    return name
+
+
+class TimingMiddleware:
+    """
+    Times every request: adds a Server-Timing header (stages + total)
+    while SERVER_TIMING is on, observes stayfinder_request_seconds and logs one JSON line to
+    `api.instrumentation`. Requests sending `X-Profile: <PROFILE_TOKEN>`
+    are run under cProfile (sync views only: under ASGI the event loop
+    interleaves other requests); the dump's name comes back in X-Profile-Id.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        profiler = cProfile.Profile() if profile_requested(request) else None
+        with collect() as timings:
+            start = time.perf_counter()
+            if profiler is None:
+                response = self.get_response(request)
+            else:
+                response = profiler.runcall(self.get_response, request)
+            self.finish(request, response, timings, time.perf_counter() - start)
+        if profiler is not None:
+            response["X-Profile-Id"] = save_profile(profiler, request)
+        return response
+
+    async def __acall__(self, request):
+        with collect() as timings:
+            start = time.perf_counter()
+            response = await self.get_response(request)
+            self.finish(request, response, timings, time.perf_counter() - start)
+        return response
+
+    def finish(self, request, response, timings, total):
+        match = getattr(request, "resolver_match", None)
+        # unmatched paths share one label so scanners can't blow up the series count
+        view = (match.view_name or match._func_path) if match else "unmatched"
+        histograms()[0].observe(total, view, request.method, str(response.status_code))
+        if getattr(settings, "SERVER_TIMING", False):
+            response["Server-Timing"] = server_timing(timings, total)
+        if getattr(settings, "REQUEST_TIMING_LOG", True):
+            logger.info(json.dumps({
+                "view": view,
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "total_ms": round(total * 1000, 2),
+                "stages_ms": {name: round(s * 1000, 2) for name, s in timings.items()},
+            }))
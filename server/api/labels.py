@@ -0,0 +1,96 @@
+import re
+
+from django.db import transaction
+
+from .models import Hotel, HotelLabel, Label
+
+ID_CHUNK_SIZE = 500  # keep `id__in` lists under SQLite's variable limit
+
+# Label kind -> Hotel JSON list it is derived from
+SOURCE_FIELDS = {
+    Label.AMENITY: "amenities",
+    Label.TAG: "tags",
+    Label.IDEAL_FOR: "ideal_for",
+    Label.SDG: "sdg_tags",
+}
+
+
+def normalize_label(value):
+    """'Free Wi-Fi' -> 'freewifi', so 'Wifi' matches it as a substring."""
+    return re.sub(r"[^a-z0-9]", "", str(value).lower())
+
+
+def sdg_number(value):
+    digits = re.sub(r"[^0-9]", "", str(value))
+    return digits or None
+
+
+def label_key(kind, value):
+    if kind == Label.SDG:
+        return sdg_number(value)
+    return normalize_label(value)[:200] or None
+
+
+def _ensure_labels(wanted):
+    """`{(kind, key): name}` -> `{(kind, key): label_id}`, creating new labels."""
+    if not wanted:
+        return {}
+    Label.objects.bulk_create(
+        [Label(kind=kind, key=key, name=name) for (kind, key), name in wanted.items()],
+        ignore_conflicts=True,
+    )
+    ids = {}
+    for kind in {kind for kind, _ in wanted}:
+        keys = [key for k, key in wanted if k == kind]
+        for start in range(0, len(keys), ID_CHUNK_SIZE):
+            for pk, key in Label.objects.filter(kind=kind, key__in=keys[start:start + ID_CHUNK_SIZE]).values_list("id", "key"):
+                ids[(kind, key)] = pk
+    return ids
+
+
+def sync_hotel_labels(hotel_ids=None):
+    """
+    Rebuild the HotelLabel links of `hotel_ids` (all hotels when None) from
+    their amenities / tags / ideal_for / sdg_tags lists.
+    Returns the number of links written.
+    """
+    if hotel_ids is None:
+        hotel_ids = list(Hotel.objects.values_list("id", flat=True).iterator())
+    else:
+        hotel_ids = list(dict.fromkeys(hotel_ids))
+
+    written = 0
+    for start in range(0, len(hotel_ids), ID_CHUNK_SIZE):
+        chunk = hotel_ids[start:start + ID_CHUNK_SIZE]
+        wanted = {}
+        links = set()
+        rows = Hotel.objects.filter(id__in=chunk).values_list("id", *SOURCE_FIELDS.values())
+        for pk, *lists in rows:
+            for kind, values in zip(SOURCE_FIELDS, lists):
+                for value in values or []:
+                    if isinstance(value, (dict, list)):
+                        continue
+                    key = label_key(kind, value)
+                    if key:
+                        wanted.setdefault((kind, key), str(value).strip()[:200])
+                        links.add((pk, kind, key))
+
+        with transaction.atomic():
+            label_ids = _ensure_labels(wanted)
+            HotelLabel.objects.filter(hotel_id__in=chunk).delete()
+            HotelLabel.objects.bulk_create(
+                [HotelLabel(hotel_id=pk, label_id=label_ids[(kind, key)]) for pk, kind, key in links],
+                batch_size=2000,
+            )
+        written += len(links)
+    return written
+
+
+def hotels_with_label(kind, key, substring=False):
+    """
+    Subquery of hotel ids linked to a label, read through the (label, hotel)
+    index. With `substring`, any label whose key contains `key` matches
+    ("wifi" finds "freewifi" and "wifi").
+    """
+    lookup = {"label__key__contains": key} if substring else {"label__key": key}
+    return HotelLabel.objects.filter(label__kind=kind, **lookup).values("hotel_id")
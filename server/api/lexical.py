@@ -0,0 +1,97 @@
+"""
+BM25 index over hotel text, used as the cheap first stage of hybrid ranking.
+
+The index is an inverted file in NumPy arrays: postings sorted by term, each
+carrying its document row and its precomputed BM25 weight, so scoring a
+query is one vectorized scatter-add per query term. Rows follow the vector
+store's id order, which lets the dense stage score a lexical shortlist by
+row number directly.
+"""
+import re
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or the this to with".split()
+)
+# fields that make up a hotel's lexical document (name and city carry exact terms)
+TEXT_FIELDS = ("name", "city", "amenities", "tags", "ideal_for", "description")
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(str(text).lower()) if t not in STOPWORDS]
+
+
+def hotel_text(row):
+    """Lexical document for a `.values(*TEXT_FIELDS)` row."""
+    parts = [row["name"], row["city"], row["description"]]
+    for field in ("amenities", "tags", "ideal_for"):
+        parts.extend(str(v) for v in row[field] or [] if not isinstance(v, (dict, list)))
+    return " ".join(p for p in parts if p)
+
+
+class LexicalIndex:
+    def __init__(self, terms, offsets, rows, weights, n_docs):
+        self.terms = terms          # term -> position in offsets
+        self.offsets = offsets      # term i owns postings offsets[i]:offsets[i + 1]
+        self.rows = rows
+        self.weights = weights
+        self.n_docs = n_docs
+
+    @classmethod
+    def build(cls, documents, n_docs, k1=1.2, b=0.75):
+        """
+        `documents` yields `(row, text)` for rows in `range(n_docs)`.
+        Rows that never appear get an empty document.
+        """
+        vocab = {}
+        term_ids, doc_rows, tfs = [], [], []
+        lengths = np.zeros(n_docs, dtype=np.float32)
+        for row, text in documents:
+            counts = {}
+            for token in tokenize(text):
+                term = vocab.setdefault(token, len(vocab))
+                counts[term] = counts.get(term, 0) + 1
+            lengths[row] = sum(counts.values())
+            term_ids.extend(counts)
+            doc_rows.extend([row] * len(counts))
+            tfs.extend(counts.values())
+
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        doc_rows = np.asarray(doc_rows, dtype=np.int64)
+        tfs = np.asarray(tfs, dtype=np.float32)
+        order = np.argsort(term_ids, kind="stable")
+        term_ids, doc_rows, tfs = term_ids[order], doc_rows[order], tfs[order]
+
+        df = np.bincount(term_ids, minlength=len(vocab)).astype(np.float32)
+        offsets = np.concatenate(([0], np.cumsum(df))).astype(np.int64)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        avgdl = float(lengths.mean()) if n_docs and lengths.any() else 1.0
+        norm = k1 * (1 - b + b * lengths[doc_rows] / avgdl)
+        weights = (idf[term_ids] * tfs * (k1 + 1) / (tfs + norm)).astype(np.float32)
+        return cls(vocab, offsets, doc_rows.astype(np.int32), weights, n_docs)
+
+    def save(self, path):
+        terms = np.array(sorted(self.terms, key=self.terms.get), dtype=str)
+        with open(path, "wb") as fh:
+            np.savez(fh, terms=terms, offsets=self.offsets, rows=self.rows,
+                     weights=self.weights, n_docs=np.int64(self.n_docs))
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        terms = {term: i for i, term in enumerate(data["terms"].tolist())}
+        return cls(terms, data["offsets"], data["rows"], data["weights"], int(data["n_docs"]))
+
+    def scores(self, text):
+        """BM25 score of every row for the query `text` (zeros when nothing matches)."""
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for token in set(tokenize(text)):
+            term = self.terms.get(token)
+            if term is None:
+                continue
+            start, end = self.offsets[term], self.offsets[term + 1]
+            # a term has at most one posting per row, so plain fancy-index add is safe
+            scores[self.rows[start:end]] += self.weights[start:end]
+        return scores
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from api.vector_store import train_ann_index
+
+
+class Command(BaseCommand):
+    help = "Train (or retrain) the IVF approximate-search index over the exported hotel vectors."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--nlist", type=int, default=None,
+            help="Number of inverted lists (default: about 4 * sqrt(N))"
+        )
+        parser.add_argument(
+            "--iterations", type=int, default=20,
+            help="k-means iterations (default: 20)"
+        )
+        parser.add_argument(
+            "--sample-size", type=int, default=100_000,
+            help="Vectors sampled for k-means training (default: 100000)"
+        )
+
+    def handle(self, *args, **options):
+        nlist = train_ann_index(
+            nlist=options["nlist"],
+            iterations=options["iterations"],
+            sample_size=options["sample_size"],
+        )
+        if not nlist:
+            self.stdout.write(self.style.WARNING("No vectors to index. Run build_embeddings first."))
+            return
+        self.stdout.write(self.style.SUCCESS(f"IVF index built with {nlist} lists."))
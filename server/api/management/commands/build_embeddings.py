@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.embeddings import refresh_embeddings
+
+
+class Command(BaseCommand):
+    help = "Compute and store embeddings for hotels whose content changed (or all with --force)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force", action="store_true",
+            help="Re-encode every hotel even if its content hash is unchanged"
+        )
+
+    def handle(self, *args, **options):
+        encoded = refresh_embeddings(force=options["force"])
+        self.stdout.write(self.style.SUCCESS(f"Embeddings up to date. Re-encoded: {encoded}"))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.similar import build_similar_hotels, similar_k
+
+
+class Command(BaseCommand):
+    help = "Recompute every hotel's precomputed similar-hotels list from the exported vectors."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--block-size", type=int, default=None,
+            help="Hotels scored per block (default: from SIMILAR_HOTELS_BLOCK_ELEMENTS)"
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = build_similar_hotels(block_size=options["block_size"])
+        if not count:
+            self.stdout.write(self.style.WARNING("No vectors exported yet. Run build_embeddings first."))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Top {similar_k()} similar hotels computed for {count} hotels in {time.perf_counter() - start:.1f}s."
+        ))
@@ -0,0 +1,125 @@
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.catalogue import publish_changes
+from api.embedding_queue import queue_status, run_batch
+from api.embeddings import ENCODE_BATCH_SIZE, encode
+from api.providers import get_provider
+
+
+def init_encoder():
+    # no-op after fork; sets Django up in spawned / forkserver children
+    django.setup()
+    get_provider().warm_up()
+
+
+class PoolEncoder:
+    """`encode` fanned out over worker processes, one contiguous slice each."""
+
+    def __init__(self, pool, workers):
+        self.pool = pool
+        self.workers = workers
+
+    def __call__(self, texts):
+        size = max(ENCODE_BATCH_SIZE, -(-len(texts) // self.workers))
+        parts = [texts[i:i + size] for i in range(0, len(texts), size)]
+        return np.vstack(list(self.pool.map(encode, parts)))
+
+
+class Command(BaseCommand):
+    help = (
+        "Drain the re-embedding queue (EMBEDDING_QUEUE): encode queued hotels in batches "
+        "and re-export the vector store. Runs until stopped unless --once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=None,
+            help="Jobs claimed at a time (default: EMBEDDING_QUEUE_BATCH_SIZE)"
+        )
+        parser.add_argument(
+            "--workers", type=int, default=1,
+            help="Processes that run the model; 1 = in-process (default: 1)"
+        )
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Exit when the queue is empty instead of polling"
+        )
+        parser.add_argument(
+            "--poll-interval", type=float, default=5,
+            help="Seconds to wait when the queue is empty (default: 5)"
+        )
+        parser.add_argument(
+            "--export-interval", type=float, default=60,
+            help="Publish processed jobs (vector store export, similar-hotel lists) at most this "
+                 "often while the queue is busy; always once it runs empty (default: 60)"
+        )
+        parser.add_argument(
+            "--status", action="store_true",
+            help="Print pending jobs, lag and throughput as JSON and exit"
+        )
+
+    def handle(self, *args, **options):
+        if options["status"]:
+            self.stdout.write(json.dumps(queue_status(), indent=2))
+            return
+
+        batch_size = options["batch_size"] or getattr(settings, "EMBEDDING_QUEUE_BATCH_SIZE", 5000)
+        workers = max(1, options["workers"])
+        if workers == 1:
+            self._run(encode, batch_size, options)
+            return
+        # forked children must not share the parent's database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_encoder) as pool:
+            self._run(PoolEncoder(pool, workers), batch_size, options)
+
+    def _run(self, encode_texts, batch_size, options):
+        # jobs processed since the last refresh, and whether any was re-encoded
+        changed, dirty = [], False
+        last_refresh = time.monotonic()
+        try:
+            while True:
+                batch = run_batch(batch_size, encode_texts)
+                if batch is None:
+                    if changed:
+                        self._refresh(changed, dirty)
+                        changed, dirty, last_refresh = [], False, time.monotonic()
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+                    continue
+
+                hotel_ids, encoded, done, elapsed = batch
+                changed.extend(hotel_ids)
+                dirty = dirty or encoded > 0
+
+                status = queue_status()
+                self.stdout.write(
+                    f"{done} jobs ({encoded} re-encoded) in {elapsed:.1f}s "
+                    f"({done / elapsed if elapsed else 0:.0f}/s); "
+                    f"pending={status['pending']} lag={status['lag_seconds']}s"
+                )
+                if time.monotonic() - last_refresh >= options["export_interval"]:
+                    self._refresh(changed, dirty)
+                    changed, dirty, last_refresh = [], False, time.monotonic()
+        except KeyboardInterrupt:
+            if changed:
+                self._refresh(changed, dirty)
+
+    def _refresh(self, changed, dirty):
+        """Publish processed jobs: export new vectors, update similar-hotel lists, invalidate caches."""
+        start = time.perf_counter()
+        exported, updated = publish_changes(changed, export=dirty)
+        if exported is not None:
+            self.stdout.write(self.style.SUCCESS(f"Vector store exported: {exported} vectors"))
+        if updated is not None:
+            self.stdout.write(f"Similar-hotel lists updated: {updated}")
+        self.stdout.write(f"Published in {time.perf_counter() - start:.1f}s")
@@ -1,8 +1,15 @@
 import csv
+import itertools
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from django.core.management.base import BaseCommand
 from django.utils.text import slugify
 from api.models import Hotel
+from api.catalogue import hotels_changed, publish_changes
+from api.embeddings import embedding_queue_enabled
+from api.instrumentation import collect, stage
+from api.upsert import upsert_hotels
 
 def to_float(v):
     try:
@@ -16,19 +23,128 @@ def to_int(v):
     except Exception:
         return None
 
-def make_unique_id(base):
+def to_coordinate(v, bound):
+    v = to_float(v)
+    return v if v is not None and -bound <= v <= bound else None
+
+def make_unique_id(base, taken):
     """
-    If base exists as a PK, append -1, -2... until unique.
+    If base is already taken, append -1, -2... until unique. `taken` is the
+    in-memory set of ids (existing + assigned in this run) and is updated.
     """
     candidate = base
     i = 1
-    while Hotel.objects.filter(id=candidate).exists():
+    while candidate in taken:
         candidate = f"{base}-{i}"
         i += 1
+    taken.add(candidate)
     return candidate
 
+def normalize_row(row):
+    """
+    Map one CSV row to hotel fields. Returns `(base_id, name, fields)` or None
+    if the row has no name. Pure function so it can run in worker processes;
+    the id and the id-seeded images are filled in by the caller.
+    """
+    # Normalize input keys for robust matching (strip spaces)
+    clean = {k.strip(): (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k}
+
+    # Map CSV columns to model fields (change keys if your CSV uses different names)
+    name = clean.get("Hotel_Name") or clean.get("Hotel name") or clean.get("HotelName") or clean.get("name")
+    if not name:
+        return None
+
+    city = clean.get("City") or ""
+    rating = to_float(clean.get("Hotel_Rating") or clean.get("Rating") or None)
+    price = to_int(clean.get("Hotel_Price") or clean.get("Price") or None)
+
+    # Gather Feature_1..Feature_9 columns into amenities/tags
+    amenities = []
+    tags = []
+    for i in range(1, 10):
+        k = f"Feature_{i}"
+        v = clean.get(k)
+        if not v:
+            # also try lowercase-ish variants
+            v = clean.get(k.lower())
+        if v:
+            # split by common separators if needed (comma/semicolon) — keep simple by trimming
+            parts = [p.strip() for p in v.split(",")] if "," in v else [v.strip()]
+            for part in parts:
+                if part and part not in amenities:
+                    amenities.append(part)
+                    # heuristics: small feature words could be tags too
+                    if len(part) <= 15:
+                        tags.append(part.lower())
+
+    # generate base id (slug)
+    base = slugify(f"{name}-{city}")[:60]  # keep length reasonable
+
+    # populate rooms: minimal single room if not available via CSV
+    rooms = [
+        {
+            "type": "Standard",
+            "occupancy": 2,
+            "size_sqm": 25,
+            "price": price or 0,
+        }
+    ]
+
+    # policies default
+    policies = {
+        "check_in": "14:00",
+        "check_out": "12:00",
+        "cancellation": "Free upto 48h",
+    }
+
+    description = (
+        clean.get("Description")
+        or f"{name} in {city}. Rated {rating if rating else 'N/A'} — great choice for travellers."
+    )
+    why_ai_picked = f"Automatically generated: good rating and central location in {city}."
+
+    sustainability = {"certifications": [], "energy_source": "grid", "water_conservation": False}
+
+    fields = {
+        "name": name,
+        "city": city,
+        "address": clean.get("Address", "") or "",
+        "phone": clean.get("Phone", "") or "",
+        "email": clean.get("Email", "") or "",
+        "price_per_night": price,
+        "rating": rating,
+        "rooms": rooms,
+        "policies": policies,
+        "amenities": amenities,
+        "ideal_for": [],     # CSV doesn't have; left blank
+        "distance_from_center_km": to_float(clean.get("Distance_km", None)),
+        "tags": tags,
+        "description": description,
+        "why_ai_picked": why_ai_picked,
+        "sdg_tags": [],
+        "nearby": [],
+        "sustainability": sustainability,
+    }
+    # only CSVs that carry coordinates overwrite them (e.g. ones set through the API)
+    lat = to_coordinate(clean.get("Latitude") or clean.get("Lat"), 90)
+    lng = to_coordinate(clean.get("Longitude") or clean.get("Lng") or clean.get("Lon"), 180)
+    if lat is not None and lng is not None:
+        fields["latitude"], fields["longitude"] = lat, lng
+    return base, name, fields
+
+def normalize_batch(rows):
+    return [normalize_row(row) for row in rows]
+
+def batched(iterable, size):
+    it = iter(iterable)
+    while True:
+        batch = list(itertools.islice(it, size))
+        if not batch:
+            return
+        yield batch
+
 class Command(BaseCommand):
-    help = "Import hotels from a CSV file and upsert into Hotel model."
+    help = "Import hotels from a CSV file and upsert into Hotel model (streaming, batched)."
 
     def add_arguments(self, parser):
         parser.add_argument("path", type=str, help="Path to CSV file")
@@ -40,11 +156,37 @@ class Command(BaseCommand):
             "--seed-by", type=str, default="id",
             help="How to seed placeholder images: 'id' or 'name' (default 'id')"
         )
+        parser.add_argument(
+            "--batch-size", type=int, default=2000,
+            help="Rows per transaction / per worker task (default: 2000)"
+        )
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count() or 1,
+            help="Processes used to normalize rows; 1 = in-process (default: CPU count)"
+        )
+        parser.add_argument(
+            "--start-row", type=int, default=0,
+            help="Skip this many data rows, e.g. to resume an interrupted import (default: 0)"
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Read, normalize and assign ids without writing; reports throughput"
+        )
 
     def handle(self, *args, **options):
+        with collect() as timings:
+            self._import(options)
+        if timings:
+            self.stdout.write("Stages: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()))
+
+    def _import(self, options):
         path = options["path"]
         images_per = options["images"]
         seed_by = options["seed_by"]
+        batch_size = max(1, options["batch_size"])
+        workers = max(1, options["workers"])
+        start_row = max(0, options["start_row"])
+        dry_run = options["dry_run"]
 
         if not os.path.exists(path):
             self.stdout.write(self.style.ERROR(f"File not found: {path}"))
@@ -53,113 +195,99 @@ class Command(BaseCommand):
         created = 0
         updated = 0
         skipped = 0
+        encoded = 0
+
+        # every id already in the table; slug collisions are resolved against
+        # this set instead of one `.exists()` query per attempted suffix
+        taken = set(Hotel.objects.values_list("id", flat=True).iterator())
 
+        started = time.perf_counter()
+        row_no = start_row
         with open(path, newline="", encoding="utf-8") as csvfile:
             reader = csv.DictReader(csvfile)
-            # normalize header keys: strip & upper/lower convert spaces to underscores optional
-            rows = list(reader)
-
-        for row in rows:
-            # Normalize input keys for robust matching (strip spaces)
-            clean = {k.strip(): (v.strip() if isinstance(v, str) else v) for k, v in row.items()}
-
-            # Map CSV columns to model fields (change keys if your CSV uses different names)
-            name = clean.get("Hotel_Name") or clean.get("Hotel name") or clean.get("HotelName") or clean.get("name")
-            if not name:
-                self.stdout.write(self.style.WARNING("Skipping row w/o Hotel_Name"))
-                skipped += 1
-                continue
-
-            city = clean.get("City") or ""
-            rating = to_float(clean.get("Hotel_Rating") or clean.get("Rating") or None)
-            price = to_int(clean.get("Hotel_Price") or clean.get("Price") or None)
-
-            # Gather Feature_1..Feature_9 columns into amenities/tags
-            amenities = []
-            tags = []
-            for i in range(1, 10):
-                k = f"Feature_{i}"
-                v = clean.get(k)
-                if not v:
-                    # also try lowercase-ish variants
-                    v = clean.get(k.lower())
-                if v:
-                    # split by common separators if needed (comma/semicolon) — keep simple by trimming
-                    parts = [p.strip() for p in v.split(",")] if "," in v else [v.strip()]
-                    for part in parts:
-                        if part and part not in amenities:
-                            amenities.append(part)
-                            # heuristics: small feature words could be tags too
-                            if len(part) <= 15:
-                                tags.append(part.lower())
-
-            # generate base id (slug)
-            base = slugify(f"{name}-{city}")[:60]  # keep length reasonable
-            pk = make_unique_id(base)
-
-            # create images using picsum.photos with stable seed
-            seed = pk if seed_by == "id" else slugify(name)
-            images = [f"https://picsum.photos/seed/{seed}-{n}/1200/800" for n in range(1, images_per + 1)]
-            images_alt = [f"{name} — image {n}" for n in range(1, images_per + 1)]
-            blur = f"https://picsum.photos/seed/{seed}/20/13"
-
-            # populate rooms: minimal single room if not available via CSV
-            rooms = [
-                {
-                    "type": "Standard",
-                    "occupancy": 2,
-                    "size_sqm": 25,
-                    "price": price or 0,
-                }
-            ]
-
-            # policies default
-            policies = {
-                "check_in": "14:00",
-                "check_out": "12:00",
-                "cancellation": "Free upto 48h",
-            }
-
-            description = (
-                clean.get("Description")
-                or f"{name} in {city}. Rated {rating if rating else 'N/A'} — great choice for travellers."
-            )
-            why_ai_picked = f"Automatically generated: good rating and central location in {city}."
-
-            sustainability = {"certifications": [], "energy_source": "grid", "water_conservation": False}
-
-            # prepare upsert defaults
-            defaults = {
-                "name": name,
-                "city": city,
-                "address": clean.get("Address", "") or "",
-                "phone": clean.get("Phone", "") or "",
-                "email": clean.get("Email", "") or "",
-                "price_per_night": price,
-                "rating": rating,
-                "images": images,
-                "images_alt": images_alt,
-                "blurPlaceholder": blur,
-                "rooms": rooms,
-                "policies": policies,
-                "amenities": amenities,
-                "ideal_for": [],     # CSV doesn't have; left blank
-                "distance_from_center_km": to_float(clean.get("Distance_km", None)),
-                "tags": tags,
-                "description": description,
-                "why_ai_picked": why_ai_picked,
-                "sdg_tags": [],
-                "nearby": [],
-                "sustainability": sustainability,
-            }
-
-            # upsert
-            obj, created_flag = Hotel.objects.update_or_create(id=pk, defaults=defaults)
-            if created_flag:
-                created += 1
-            else:
-                updated += 1
+            rows = itertools.islice(reader, start_row, None)
+            batches = self._normalized_batches(rows, batch_size, workers)
+            while True:
+                with stage("import.normalize"):
+                    batch = next(batches, None)
+                    if batch is None:
+                        break
+                items = []
+                for normalized in batch:
+                    if normalized is None:
+                        self.stdout.write(self.style.WARNING("Skipping row w/o Hotel_Name"))
+                        skipped += 1
+                        continue
+                    base, name, fields = normalized
+                    pk = make_unique_id(base, taken)
+
+                    # create images using picsum.photos with stable seed
+                    seed = pk if seed_by == "id" else slugify(name)
+                    fields["images"] = [f"https://picsum.photos/seed/{seed}-{n}/1200/800" for n in range(1, images_per + 1)]
+                    fields["images_alt"] = [f"{name} — image {n}" for n in range(1, images_per + 1)]
+                    fields["blurPlaceholder"] = f"https://picsum.photos/seed/{seed}/20/13"
+                    items.append({"id": pk, **fields})
+
+                if not dry_run and items:
+                    # one transaction per batch: a crash loses at most this batch
+                    with stage("import.upsert"):
+                        results = upsert_hotels(items, chunk_size=batch_size)
+                    for result in results:
+                        if result["created"]:
+                            created += 1
+                        else:
+                            updated += 1
+                    # before the resume row is printed: a committed batch is never left
+                    # unencoded (or unqueued); the store is published once, at the end
+                    encoded += hotels_changed([result["id"] for result in results], publish=False)
+                elif dry_run:
+                    created += len(items)
+
+                row_no += len(batch)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"Rows {start_row}-{row_no} done ({(row_no - start_row) / elapsed:.0f} rows/s); "
+                    f"resume with --start-row {row_no}"
+                )
+
+        elapsed = time.perf_counter() - started
+        rate = (row_no - start_row) / elapsed if elapsed else 0
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(
+                f"Dry run finished in {elapsed:.1f}s ({rate:.0f} rows/s). "
+                f"Would write: {created}, Skipped: {skipped}"
+            ))
+            return
+
+        if embedding_queue_enabled():
+            embedded = f"Queued for re-embedding: {encoded} (run `manage.py embedding_worker`)"
+        else:
+            embedded = f"Re-embedded: {encoded}"
+            # one export (and similar-hotel rebuild) for the whole import, also
+            # covering batches committed by an interrupted earlier run
+            with stage("import.publish"):
+                publish_changes()
 
         self.stdout.write(self.style.SUCCESS(
-            f"Import finished. Created: {created}, Updated: {updated}, Skipped: {skipped}"
+            f"Import finished in {elapsed:.1f}s ({rate:.0f} rows/s). "
+            f"Created: {created}, Updated: {updated}, Skipped: {skipped}, {embedded}"
         ))
+
+    def _normalized_batches(self, rows, batch_size, workers):
+        """
+        Yield normalized batches in file order. With several workers, at most
+        `2 * workers` batches are in flight so memory stays bounded.
+        """
+        if workers == 1:
+            for batch in batched(rows, batch_size):
+                yield normalize_batch(batch)
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = []
+            for batch in batched(rows, batch_size):
+                pending.append(pool.submit(normalize_batch, batch))
+                if len(pending) >= 2 * workers:
+                    yield pending.pop(0).result()
+            for future in pending:
+                yield future.result()
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.labels import sync_hotel_labels
+
+
+class Command(BaseCommand):
+    help = "Rebuild the normalized amenity / tag / ideal_for / SDG label links for every hotel."
+
+    def handle(self, *args, **options):
+        written = sync_hotel_labels()
+        self.stdout.write(self.style.SUCCESS(f"Label links rebuilt: {written}."))
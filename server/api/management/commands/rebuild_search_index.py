@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from api.search import ensure_search_index, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Recreate any missing part of the hotel full-text index and re-index every hotel."
+
+    def handle(self, *args, **options):
+        created = ensure_search_index()
+        if not created:
+            rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
@@ -0,0 +1,86 @@
+import threading
+import time
+from multiprocessing.connection import Listener
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.batching import BatchingEncoder
+from api.providers import local_provider, parse_address, server_authkey
+
+
+class Command(BaseCommand):
+    help = (
+        "Load the embedding model once and serve encode requests to web workers "
+        "(point EMBEDDING_SERVER at this address)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--address", type=str, default=None,
+            help="host:port or socket path to listen on (default: EMBEDDING_SERVER or 127.0.0.1:6100)"
+        )
+        parser.add_argument(
+            "--stats-interval", type=float, default=60,
+            help="Seconds between batching stats lines, 0 to disable (default: 60)"
+        )
+
+    def handle(self, *args, **options):
+        address = parse_address(
+            options["address"] or getattr(settings, "EMBEDDING_SERVER", None) or "127.0.0.1:6100"
+        )
+        # same model and backend as an in-process provider would use
+        provider = local_provider()
+        provider.warm_up()
+        # single-text requests from all workers are coalesced here
+        batcher = BatchingEncoder(
+            provider,
+            max_batch_size=getattr(settings, "EMBEDDING_MAX_BATCH_SIZE", 32),
+            max_wait_ms=getattr(settings, "EMBEDDING_MAX_WAIT_MS", 5),
+        )
+        if options["stats_interval"] > 0:
+            threading.Thread(
+                target=self._report, args=(batcher, options["stats_interval"]), daemon=True
+            ).start()
+
+        listener = Listener(address, authkey=server_authkey())
+        self.stdout.write(self.style.SUCCESS(f"Embedding server listening on {listener.address}"))
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as exc:  # failed handshake / bad authkey
+                    self.stdout.write(self.style.WARNING(f"Rejected connection: {exc}"))
+                    continue
+                threading.Thread(target=self._serve, args=(conn, provider, batcher), daemon=True).start()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            listener.close()
+
+    def _report(self, batcher, interval):
+        while True:
+            time.sleep(interval)
+            stats = batcher.stats()
+            self.stdout.write(
+                f"queue_depth={stats['queue_depth']} batches={stats['batches']} "
+                f"avg_batch_size={stats['avg_batch_size']:.1f} "
+                f"avg_inference_ms={stats['avg_inference_ms']:.1f} "
+                f"avg_queue_wait_ms={stats['avg_queue_wait_ms']:.1f}"
+            )
+
+    def _serve(self, conn, provider, batcher):
+        with conn:
+            while True:
+                try:
+                    texts = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if len(texts) == 1:
+                        vectors = batcher.encode(texts)
+                    else:
+                        vectors = provider.encode(texts)  # bulk requests are batched already
+                    conn.send(("ok", vectors))
+                except Exception as exc:
+                    conn.send(("error", str(exc)))
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_hotel_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['price_per_night'], name='hotel_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['rating'], name='hotel_rating_idx'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+from django.db import migrations
+
+# SQLite: an external-content FTS5 table over api_hotel, kept in sync by
+# triggers so every write path (bulk upserts, CSV import, admin) updates it.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE hotel_search USING fts5(
+        name, city, address, tags,
+        content='api_hotel', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3 4'
+    )
+    """,
+    """
+    CREATE TRIGGER hotel_search_ai AFTER INSERT ON api_hotel BEGIN
+        INSERT INTO hotel_search(rowid, name, city, address, tags)
+        VALUES (new.rowid, new.name, new.city, new.address, new.tags);
+    END
+    """,
+    """
+    CREATE TRIGGER hotel_search_ad AFTER DELETE ON api_hotel BEGIN
+        INSERT INTO hotel_search(hotel_search, rowid, name, city, address, tags)
+        VALUES ('delete', old.rowid, old.name, old.city, old.address, old.tags);
+    END
+    """,
+    """
+    CREATE TRIGGER hotel_search_au AFTER UPDATE ON api_hotel BEGIN
+        INSERT INTO hotel_search(hotel_search, rowid, name, city, address, tags)
+        VALUES ('delete', old.rowid, old.name, old.city, old.address, old.tags);
+        INSERT INTO hotel_search(rowid, name, city, address, tags)
+        VALUES (new.rowid, new.name, new.city, new.address, new.tags);
+    END
+    """,
+    "INSERT INTO hotel_search(hotel_search) VALUES ('rebuild')",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS hotel_search_au",
+    "DROP TRIGGER IF EXISTS hotel_search_ad",
+    "DROP TRIGGER IF EXISTS hotel_search_ai",
+    "DROP TABLE IF EXISTS hotel_search",
+]
+
+# Postgres: trigram GIN indexes that serve the UPPER(col) LIKE '%..%' queries
+# Django generates for icontains / istartswith.
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    'CREATE INDEX IF NOT EXISTS hotel_name_trgm ON api_hotel USING gin (UPPER("name"::text) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS hotel_city_trgm ON api_hotel USING gin (UPPER("city"::text) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS hotel_address_trgm ON api_hotel USING gin (UPPER("address"::text) gin_trgm_ops)',
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS hotel_address_trgm",
+    "DROP INDEX IF EXISTS hotel_city_trgm",
+    "DROP INDEX IF EXISTS hotel_name_trgm",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for sql in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_hotel_price_rating_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({"sqlite": SQLITE_FORWARD, "postgresql": POSTGRES_FORWARD}),
+            _run({"sqlite": SQLITE_BACKWARD, "postgresql": POSTGRES_BACKWARD}),
+        ),
+    ]
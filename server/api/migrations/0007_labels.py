@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_hotel_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Label',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('amenity', 'Amenity'), ('tag', 'Tag'), ('ideal_for', 'Ideal for'), ('sdg', 'SDG')], max_length=20)),
+                ('key', models.CharField(max_length=200)),
+                ('name', models.CharField(max_length=200)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'key'), name='label_kind_key_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HotelLabel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hotel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='label_links', to='api.hotel')),
+                ('label', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hotel_links', to='api.label')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('label', 'hotel'), name='hotellabel_label_hotel_uniq')],
+            },
+        ),
+    ]
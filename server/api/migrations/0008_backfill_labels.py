@@ -0,0 +1,59 @@
+import re
+
+from django.db import migrations
+
+CHUNK_SIZE = 500
+
+# frozen copy of api.labels at the time of this migration
+SOURCE_FIELDS = {
+    "amenity": "amenities",
+    "tag": "tags",
+    "ideal_for": "ideal_for",
+    "sdg": "sdg_tags",
+}
+
+
+def label_key(kind, value):
+    if kind == "sdg":
+        return re.sub(r"[^0-9]", "", str(value)) or None
+    return re.sub(r"[^a-z0-9]", "", str(value).lower())[:200] or None
+
+
+def backfill(apps, schema_editor):
+    Hotel = apps.get_model("api", "Hotel")
+    Label = apps.get_model("api", "Label")
+    HotelLabel = apps.get_model("api", "HotelLabel")
+
+    label_ids = {}
+    ids = list(Hotel.objects.values_list("id", flat=True))
+    for start in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[start:start + CHUNK_SIZE]
+        links = set()
+        for pk, *lists in Hotel.objects.filter(id__in=chunk).values_list("id", *SOURCE_FIELDS.values()):
+            for kind, values in zip(SOURCE_FIELDS, lists):
+                for value in values or []:
+                    if isinstance(value, (dict, list)):
+                        continue
+                    key = label_key(kind, value)
+                    if not key:
+                        continue
+                    if (kind, key) not in label_ids:
+                        label_ids[(kind, key)] = Label.objects.get_or_create(
+                            kind=kind, key=key, defaults={"name": str(value).strip()[:200]}
+                        )[0].pk
+                    links.add((pk, label_ids[(kind, key)]))
+        HotelLabel.objects.bulk_create(
+            [HotelLabel(hotel_id=pk, label_id=label_id) for pk, label_id in links],
+            batch_size=2000, ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_labels'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_backfill_labels'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmbeddingJob',
+            fields=[
+                ('hotel', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='embedding_job', serialize=False, to='api.hotel')),
+                ('enqueued_at', models.DateTimeField(db_index=True)),
+                ('requested_at', models.DateTimeField()),
+                ('lease_owner', models.CharField(blank=True, db_index=True, max_length=32)),
+                ('leased_until', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EmbeddingQueueState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('processed', models.PositiveBigIntegerField(default=0)),
+                ('rate', models.FloatField(default=0.0)),
+                ('last_batch_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
 class Hotel(models.Model):
@@ -20,6 +21,13 @@ class Hotel(models.Model):
     amenities = models.JSONField(default=list, blank=True)
     ideal_for = models.JSONField(default=list, blank=True)
     distance_from_center_km = models.FloatField(null=True, blank=True)
+    # WGS84 degrees; searched through the in-process index in api.geo
+    latitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
     tags = models.JSONField(default=list, blank=True)
     description = models.TextField(blank=True)
     why_ai_picked = models.TextField(blank=True)
@@ -30,5 +38,135 @@ class Hotel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # keyset pagination of the listing: ORDER BY created_at DESC, id DESC
+            models.Index(fields=["-created_at", "-id"], name="hotel_created_id_idx"),
+            # range pre-filters of recommend
+            models.Index(fields=["price_per_night"], name="hotel_price_idx"),
+            models.Index(fields=["rating"], name="hotel_rating_idx"),
+        ]
+
     def __str__(self):
         return f"{self.id} — {self.name}"
+
+
+class HotelEmbedding(models.Model):
+    """
+    Cached sentence embedding for a hotel. `content_hash` is taken over the
+    fields that go into the embedded text so we only re-encode on change.
+    """
+    hotel = models.OneToOneField(
+        Hotel, on_delete=models.CASCADE, primary_key=True, related_name="embedding"
+    )
+    content_hash = models.CharField(max_length=40)
+    vector = models.BinaryField()                               # float32, L2-normalised
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"embedding for {self.hotel_id}"
+
+
+class EmbeddingJob(models.Model):
+    """
+    A hotel whose embedding has to be recomputed, queued by upserts and
+    drained by `manage.py embedding_worker`. One row per hotel: enqueuing it
+    again only moves `requested_at`, so repeated changes cost one encode.
+    A worker owns a row while `leased_until` is in the future.
+    """
+    hotel = models.OneToOneField(
+        Hotel, on_delete=models.CASCADE, primary_key=True, related_name="embedding_job"
+    )
+    enqueued_at = models.DateTimeField(db_index=True)          # oldest unprocessed change
+    requested_at = models.DateTimeField()                      # latest change
+    lease_owner = models.CharField(max_length=32, blank=True, db_index=True)
+    leased_until = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"embedding job for {self.hotel_id}"
+
+
+class EmbeddingQueueState(models.Model):
+    """Single row (pk=1) with the embedding workers' progress, for status reports."""
+    processed = models.PositiveBigIntegerField(default=0)
+    rate = models.FloatField(default=0.0)                       # hotels/s, smoothed over batches
+    last_batch_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.processed} embedding jobs processed"
+
+
+class CatalogueState(models.Model):
+    """
+    Single row (pk=1) whose `version` is bumped whenever hotels are upserted.
+    Caches key on it, so every worker sees an invalidation at once.
+    """
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"catalogue v{self.version}"
+
+
+class Label(models.Model):
+    """
+    One entry of the amenity / tag / ideal_for / SDG vocabulary. `key` is the
+    normalized form used for matching ("Free Wi-Fi" -> "freewifi", "SDG 13" -> "13").
+    """
+    AMENITY = "amenity"
+    TAG = "tag"
+    IDEAL_FOR = "ideal_for"
+    SDG = "sdg"
+    KIND_CHOICES = [
+        (AMENITY, "Amenity"),
+        (TAG, "Tag"),
+        (IDEAL_FOR, "Ideal for"),
+        (SDG, "SDG"),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    key = models.CharField(max_length=200)
+    name = models.CharField(max_length=200)                   # display form, as first seen
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "key"], name="label_kind_key_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}: {self.name}"
+
+
+class HotelLabel(models.Model):
+    """
+    Hotel <-> Label link, derived from the hotel's JSON lists. The
+    (label, hotel) constraint doubles as the inverted index label -> hotels.
+    """
+    hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, related_name="label_links")
+    label = models.ForeignKey(Label, on_delete=models.CASCADE, related_name="hotel_links")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["label", "hotel"], name="hotellabel_label_hotel_uniq"),
+        ]
+
+
+class SimilarHotel(models.Model):
+    """
+    One entry of a hotel's precomputed "similar hotels" list (api.similar);
+    rank 0 is the closest. The (hotel, rank) constraint is the lookup index.
+    """
+    # covered by the (hotel, rank) constraint, no separate index
+    hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, related_name="similar_links", db_index=False)
+    similar = models.ForeignKey(Hotel, on_delete=models.CASCADE, related_name="similar_to")
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["hotel", "rank"], name="similarhotel_hotel_rank_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.hotel_id} ~ {self.similar_id} (#{self.rank})"
@@ -0,0 +1,51 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(hotel):
+    """
+    Opaque cursor pointing just after `hotel` (an instance or a `.values()`
+    row) in (created_at, id) DESC order.
+    """
+    if isinstance(hotel, dict):
+        created_at, pk = hotel["created_at"], hotel["id"]
+    else:
+        created_at, pk = hotel.created_at, hotel.id
+    raw = json.dumps([created_at.isoformat(), pk], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, pk = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        created_at = parse_datetime(created_at)
+    except (ValueError, TypeError, UnicodeError):
+        raise InvalidCursor(cursor)
+    if created_at is None or not isinstance(pk, str):
+        raise InvalidCursor(cursor)
+    return created_at, pk
+
+
+def keyset_page(qs, cursor, limit):
+    """
+    One page of `qs` ordered by (created_at, id) DESC, starting after
+    `cursor`. Uses a seek predicate instead of OFFSET, so deep pages cost the
+    same as the first one. Returns `(rows, next_cursor or None)`.
+    """
+    qs = qs.order_by("-created_at", "-id")
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    rows = list(qs[:limit + 1])
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
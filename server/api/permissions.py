@@ -0,0 +1,21 @@
+from django.conf import settings
+from rest_framework.permissions import BasePermission
+
+
+def operations_allowed(request):
+    """
+    Whether `request` may read the operational endpoints: staff users, and
+    clients whose address is in OPERATIONS_ALLOWED_IPS (REMOTE_ADDR, so
+    behind a proxy list the proxy only if it filters those paths itself).
+    """
+    user = getattr(request, "user", None)
+    if user is not None and user.is_staff:
+        return True
+    return request.META.get("REMOTE_ADDR") in getattr(settings, "OPERATIONS_ALLOWED_IPS", ())
+
+
+class OperationsAccess(BasePermission):
+    """DRF permission for the operational endpoints (see `operations_allowed`)."""
+
+    def has_permission(self, request, view):
+        return operations_allowed(request)
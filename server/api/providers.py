@@ -0,0 +1,173 @@
+import logging
+import threading
+import time
+from multiprocessing.connection import Client
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingProvider:
+    """Turns a list of texts into L2-normalised float32 vectors."""
+
+    def encode(self, texts):
+        raise NotImplementedError
+
+    def warm_up(self):
+        self.encode(["warm up"])
+
+
+BACKENDS = ("torch", "torch-int8", "onnx")
+
+
+class SentenceTransformerProvider(EmbeddingProvider):
+    """
+    Runs the model in this process. The model (and torch) is only imported
+    on first use, so management commands that never encode stay fast.
+
+    `backend` selects the CPU inference path: "torch" (the plain model),
+    "torch-int8" (Linear layers dynamically quantized to int8) or "onnx"
+    (ONNX Runtime; `onnx_file` picks a specific export such as
+    "onnx/model_qint8_avx512.onnx").
+    """
+
+    def __init__(self, model_name, batch_size=256, backend="torch", onnx_file=None):
+        if backend not in BACKENDS:
+            raise ImproperlyConfigured(
+                f"EMBEDDING_BACKEND must be one of {', '.join(BACKENDS)}, not {backend!r}"
+            )
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.backend = backend
+        self.onnx_file = onnx_file
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    start = time.perf_counter()
+                    logger.info("Loading embedding model %s (%s)...", self.model_name, self.backend)
+                    self._model = self._load()
+                    logger.info("Embedding model loaded in %.1fs.", time.perf_counter() - start)
+        return self._model
+
+    def _load(self):
+        from sentence_transformers import SentenceTransformer
+        if self.backend == "onnx":
+            kwargs = {"model_kwargs": {"file_name": self.onnx_file}} if self.onnx_file else {}
+            return SentenceTransformer(self.model_name, backend="onnx", **kwargs)
+        model = SentenceTransformer(self.model_name, device="cpu")
+        if self.backend == "torch-int8":
+            import torch
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model
+
+    def encode(self, texts):
+        vectors = self.model.encode(
+            list(texts),
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class RemoteProvider(EmbeddingProvider):
+    """
+    Client for `manage.py serve_embeddings`: one model process shared by
+    every web worker. Each thread keeps its own connection.
+    """
+
+    def __init__(self, address, authkey):
+        self.address = address
+        self.authkey = authkey
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(self.address, authkey=self.authkey)
+            self._local.conn = conn
+        return conn
+
+    def encode(self, texts):
+        texts = list(texts)
+        for attempt in range(2):
+            try:
+                conn = self._connection()
+                conn.send(texts)
+                state, payload = conn.recv()
+                break
+            except (EOFError, OSError):
+                # server restarted; reconnect once before giving up
+                self._local.conn = None
+                if attempt:
+                    raise
+        if state != "ok":
+            raise RuntimeError(f"Embedding server error: {payload}")
+        return payload
+
+    def warm_up(self):
+        try:
+            super().warm_up()
+        except OSError as exc:
+            logger.warning("Embedding server %s not reachable yet: %s", self.address, exc)
+
+
+def parse_address(value):
+    """"host:port" -> (host, port); anything else is used as a socket path."""
+    host, sep, port = value.rpartition(":")
+    if sep and port.isdigit():
+        return (host or "127.0.0.1", int(port))
+    return value
+
+
+def server_authkey():
+    return getattr(settings, "EMBEDDING_SERVER_AUTHKEY", settings.SECRET_KEY).encode("utf-8")
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def local_provider():
+    """
+    A `SentenceTransformerProvider` for EMBEDDING_MODEL / EMBEDDING_BACKEND /
+    EMBEDDING_ONNX_FILE; also what `manage.py serve_embeddings` runs, so
+    workers behind EMBEDDING_SERVER get the configured backend.
+    """
+    return SentenceTransformerProvider(
+        getattr(settings, "EMBEDDING_MODEL", "all-MiniLM-L6-v2"),
+        backend=getattr(settings, "EMBEDDING_BACKEND", "torch"),
+        onnx_file=getattr(settings, "EMBEDDING_ONNX_FILE", None),
+    )
+
+
+def get_provider():
+    """
+    The process-wide provider: `RemoteProvider` when EMBEDDING_SERVER is set,
+    otherwise an in-process `SentenceTransformerProvider`.
+    """
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                server = getattr(settings, "EMBEDDING_SERVER", None)
+                if server:
+                    _provider = RemoteProvider(parse_address(server), server_authkey())
+                else:
+                    _provider = local_provider()
+    return _provider
+
+
+def warm_up():
+    """Load the model (or connect to the model server) ahead of the first request."""
+    start = time.perf_counter()
+    get_provider().warm_up()
+    logger.info("Embedding provider warm-up took %.1fs.", time.perf_counter() - start)
@@ -0,0 +1,76 @@
+"""
+Compact storage for the exported embedding matrix.
+
+VECTOR_STORE_DTYPE picks how vectors are kept on disk (and in the page
+cache): "float32" (exact), "float16" (half the memory), or "int8" (a quarter,
+with one float32 scale per vector). Search code keeps working with float32:
+`QuantizedMatrix` dequantizes rows as they are read.
+"""
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+STORE_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+
+def store_dtype():
+    name = getattr(settings, "VECTOR_STORE_DTYPE", "float32")
+    if name not in STORE_DTYPES:
+        raise ImproperlyConfigured(
+            f"VECTOR_STORE_DTYPE must be one of {', '.join(STORE_DTYPES)}, not {name!r}"
+        )
+    return name
+
+
+def quantize(vectors, dtype):
+    """`(data, scales)` for float32 `vectors`; `scales` is None unless int8."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=-1) / 127.0
+        scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+        data = np.round(vectors / scales[..., None]).astype(np.int8)
+        return data, scales
+    return vectors.astype(STORE_DTYPES[dtype]), None
+
+
+class QuantizedMatrix:
+    """
+    Read-only float32 view over a float16 / int8 matrix (usually memory
+    mapped). Indexing returns dequantized float32 rows; `matrix @ x` is
+    computed block by block, so no full float32 copy is ever made.
+    """
+
+    dtype = np.dtype(np.float32)
+
+    def __init__(self, data, scales=None, block_size=65536):
+        self.data = data
+        self.scales = scales
+        self.block_size = block_size
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, key):
+        block = np.asarray(self.data[key], dtype=np.float32)
+        if self.scales is not None:
+            block *= np.asarray(self.scales[key], dtype=np.float32)[..., None]
+        return block
+
+    def __array__(self, dtype=None, copy=None):
+        return self[:] if dtype is None else self[:].astype(dtype)
+
+    def __matmul__(self, other):
+        other = np.asarray(other, dtype=np.float32)
+        out = np.empty((len(self),) + other.shape[1:], dtype=np.float32)
+        for start in range(0, len(self), self.block_size):
+            end = start + self.block_size
+            part = np.asarray(self.data[start:end], dtype=np.float32) @ other
+            if self.scales is not None:
+                scale = self.scales[start:end]
+                part *= scale if part.ndim == 1 else scale[:, None]
+            out[start:start + len(part)] = part
+        return out
@@ -0,0 +1,251 @@
+"""
+Stages of a recommendation request, shared by `HotelViewSet.recommend` and
+the async view in `async_views`:
+
+    parse_request -> candidate_queryset -> near_candidates -> semantic_matches -> rerank -> build_results
+
+Each is timed as a `recommend.*` stage (see api.instrumentation).
+
+The database stages take or return querysets, so the async view can run
+them with the async ORM while the sync view simply iterates them.
+"""
+import numpy as np
+from django.conf import settings
+
+from .caching import get_query_embedding, recommend_cache_key
+from .embeddings import encode_query, search_hotels
+from .instrumentation import stage
+from .filters import apply_hard_filters, combine_scores, parse_filters, rule_weights
+from .geo import geo_key, near_hotels, parse_geo
+from .models import Hotel
+from .search import filter_location
+
+FEATURE_FIELDS = ("id", "price_per_night", "rating", "amenities", "sdg_tags")
+ID_CHUNK_SIZE = 500  # keep `id__in` lists under SQLite's variable limit
+
+
+def lexical_weight(value):
+    """`lexicalWeight` from a request, clamped to [0, 1]; settings default."""
+    default = getattr(settings, "HYBRID_LEXICAL_WEIGHT", 0.3)
+    try:
+        weight = float(default if value in (None, "") else value)
+    except (TypeError, ValueError):
+        weight = default
+    return max(0.0, min(1.0, weight))
+
+
+def parse_request(data):
+    """The ranking inputs of a request body; ValueError for a malformed `near`."""
+    return {
+        "trip_type": data.get("tripType", ""),
+        "amenities": data.get("amenities", []),
+        "location_pref": data.get("locationPref", "").strip().lower(),
+        "sdg": data.get("sdg", ""),
+        "filters": parse_filters(data),
+        "lexical_weight": lexical_weight(data.get("lexicalWeight")),
+        "geo": parse_geo(data),
+    }
+
+
+def page_params(params, data):
+    """`(limit, offset)` from the query string, falling back to the body."""
+    default = getattr(settings, "RECOMMEND_DEFAULT_LIMIT", 20)
+    max_limit = getattr(settings, "RECOMMEND_MAX_LIMIT", 100)
+    try:
+        limit = int(params.get("limit", data.get("limit", default)))
+    except (TypeError, ValueError):
+        limit = default
+    try:
+        offset = int(params.get("offset", data.get("offset", 0)))
+    except (TypeError, ValueError):
+        offset = 0
+    return max(1, min(max_limit, limit)), max(offset, 0)
+
+
+def cache_key(req, limit, offset, version):
+    return recommend_cache_key(
+        {
+            "tripType": req["trip_type"],
+            "amenities": req["amenities"],
+            "locationPref": req["location_pref"],
+            "sdg": req["sdg"],
+            "lexicalWeight": req["lexical_weight"],
+            "near": geo_key(req["geo"]),
+            **req["filters"],
+        },
+        limit, offset, version,
+    )
+
+
+def candidate_queryset(req):
+    """
+    Hotels passing the location and hard filters, and whether anything
+    narrowed them (if not, the semantic search runs over the whole store).
+    """
+    hotels = Hotel.objects.all()
+    narrowed = False
+    if req["location_pref"]:
+        # indexed full-text / prefix match instead of a leading-wildcard LIKE
+        hotels = filter_location(hotels, req["location_pref"])
+        narrowed = True
+    hotels, filtered = apply_hard_filters(hotels, req["filters"])
+    return hotels, narrowed or filtered
+
+
+def exact_candidate_limit():
+    return getattr(settings, "RECOMMEND_EXACT_MAX_CANDIDATES", 20000)
+
+
+def split_candidates(req, hotels, candidate_ids):
+    """
+    `(candidate_ids, post_filter)` for the search. Up to
+    RECOMMEND_EXACT_MAX_CANDIDATES candidates (`candidate_ids` holds at
+    most one more) are scored exactly; beyond that the whole store is
+    searched, through the ANN index, and `post_filter` (the candidate
+    queryset) drops the matches that fail the filters. A `near` search
+    always keeps the exact candidates: `nearest` must count only them.
+    """
+    if len(candidate_ids) > exact_candidate_limit() and not req["geo"]:
+        return None, hotels
+    return candidate_ids, None
+
+
+def allowed_ids(hotels, ids):
+    """The subset of `ids` in the `hotels` queryset."""
+    allowed = set()
+    for start in range(0, len(ids), ID_CHUNK_SIZE):
+        allowed.update(hotels.filter(id__in=ids[start:start + ID_CHUNK_SIZE]).values_list("id", flat=True))
+    return allowed
+
+
+def near_candidates(req, candidate_ids):
+    """
+    `candidate_ids` cut to the hotels around the request's `near` point (all
+    of them when `candidate_ids` is None), or unchanged without one. The
+    spatial index narrows the set before any vector is scored.
+    """
+    if not req["geo"]:
+        return candidate_ids
+    with stage("recommend.geo"):
+        return [pk for pk, _ in near_hotels(req["geo"], candidate_ids)]
+
+
+def user_prompt(req):
+    prompt = f"I want a {req['trip_type']} trip. "
+    prompt += f"Amenities: {' '.join(req['amenities'])}. "
+    if req["sdg"]:
+        prompt += f"I care about SDG {req['sdg']}. "
+    return prompt
+
+
+def lexical_query(req):
+    """The words a hotel's own text should contain: trip type and amenities."""
+    return " ".join([req["trip_type"], *map(str, req["amenities"])])
+
+
+def semantic_matches(req, candidate_ids, limit, offset, post_filter=None):
+    """
+    Encode the query and return the best `[(hotel_id, score)]`, at least
+    RECOMMEND_RERANK_DEPTH deep: the cosine, or the hybrid BM25 + cosine
+    score when the request's lexical weight is positive. This is the
+    CPU-bound stage. With `post_filter` (see `split_candidates`) the
+    unrestricted search fetches RECOMMEND_POST_FILTER_FACTOR times the depth,
+    and again that much deeper while too few matches pass the filters.
+    """
+    # hotel vectors come from the memory-mapped store; only the query is encoded
+    with stage("recommend.encode"):
+        query_embedding = get_query_embedding(user_prompt(req), encode_query)
+    depth = max(offset + limit, getattr(settings, "RECOMMEND_RERANK_DEPTH", 200))
+    with stage("recommend.search"):
+        if post_filter is None:
+            return search_hotels(
+                query_embedding, depth, candidate_ids=candidate_ids,
+                text=lexical_query(req), lexical_weight=req["lexical_weight"],
+            )
+        factor = max(2, getattr(settings, "RECOMMEND_POST_FILTER_FACTOR", 4))
+        fetch = depth * factor
+        while True:
+            found = search_hotels(
+                query_embedding, fetch, text=lexical_query(req), lexical_weight=req["lexical_weight"],
+            )
+            allowed = allowed_ids(post_filter, [pk for pk, _ in found])
+            matches = [(pk, score) for pk, score in found if pk in allowed]
+            # fewer than asked for: the whole store was searched
+            if len(matches) >= depth or len(found) < fetch:
+                return matches[:depth]
+            fetch *= factor
+
+
+def feature_queryset(semantic):
+    return Hotel.objects.filter(id__in=[pk for pk, _ in semantic]).values(*FEATURE_FIELDS)
+
+
+def rerank(semantic, features, filters, limit, offset):
+    """
+    Re-rank the semantic matches with the rule score. `features` maps hotel
+    id -> feature row. Returns `[(hotel_id, cosine, rule_score, rule_reasons)]`
+    for one page.
+    """
+    with stage("recommend.rerank"):
+        semantic = [(pk, score) for pk, score in semantic if pk in features]
+        final, rule, reasons = combine_scores(
+            [score for _, score in semantic], [features[pk] for pk, _ in semantic], filters
+        )
+        order = np.argsort(-final, kind="stable")[offset:offset + limit]
+        return [(semantic[i][0], semantic[i][1], float(rule[i]), reasons[i]) for i in order]
+
+
+def rank(req, limit, offset):
+    """Synchronous composition of the ranking stages."""
+    with stage("recommend.candidates"):
+        hotels, narrowed = candidate_queryset(req)
+        candidate_ids = post_filter = None
+        if narrowed:
+            ids = hotels.values_list("id", flat=True)
+            if not req["geo"]:
+                ids = ids[:exact_candidate_limit() + 1]
+            candidate_ids = list(ids)
+            if not candidate_ids:
+                return []
+            candidate_ids, post_filter = split_candidates(req, hotels, candidate_ids)
+        elif not req["geo"] and not hotels.exists():
+            return []
+
+    if req["geo"]:
+        candidate_ids = near_candidates(req, candidate_ids)
+        if not candidate_ids:
+            return []
+    semantic = semantic_matches(req, candidate_ids, limit, offset, post_filter)
+    if not semantic:
+        return []
+    with stage("recommend.features"):
+        features = {row["id"]: row for row in feature_queryset(semantic)}
+    return rerank(semantic, features, req["filters"], limit, offset)
+
+
+def winners_queryset(ranked, plan):
+    return Hotel.objects.filter(id__in=[pk for pk, _, _, _ in ranked]).values(*plan.columns)
+
+
+def build_results(ranked, rows_by_id, plan):
+    """The response body: serialized hotels with their score and reasons."""
+    ai_weight = rule_weights()["ai"]
+    ranked = [entry for entry in ranked if entry[0] in rows_by_id]
+    with stage("recommend.serialize"):
+        hotels = plan.serialize_many([rows_by_id[pk] for pk, _, _, _ in ranked])
+    results = []
+    for (pk, ai_score_raw, rule_score, rule_reasons), hotel in zip(ranked, hotels):
+        reasons = []
+        if ai_score_raw > 0.45:
+            reasons.append("AI Confidence: High semantic match with your preferences.")
+        elif ai_score_raw > 0.25:
+            reasons.append("AI Confidence: Moderate match.")
+        reasons.extend(rule_reasons)
+
+        results.append({
+            "hotel": hotel,
+            "score": round(ai_score_raw * ai_weight + rule_score),
+            "reasonParts": reasons,
+            "reasonText": " ".join(reasons),
+        })
+    return results
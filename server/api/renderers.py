@@ -0,0 +1,40 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .instrumentation import stage
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+
+# int dict keys (e.g. batch-size histograms) are written as strings, like json
+# does; datetimes go through DRF's encoder (millisecond precision, "Z")
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson. Output is the same compact UTF-8 as DRF's
+    default settings (including its escaping of U+2028/U+2029) for strings,
+    ints, bools, None, lists and dicts (int keys become strings, as with
+    json), and for dates and times, which are handed to DRF's encoder rather
+    than orjson's own format. Floats are the same values but may be written
+    differently at extreme magnitudes (orjson `0.00001`, json `1e-05`).
+    Falls back to the stdlib renderer when orjson is not installed or an
+    indented response is requested.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with stage("render"):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=JSONEncoder().default, option=ORJSON_OPTIONS)
+        # same as JSONRenderer: keep the output valid JavaScript
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
@@ -0,0 +1,62 @@
+import random
+import threading
+import time
+
+from django.conf import settings
+
+from .catalogue import catalogue_version
+from .models import Hotel
+
+
+class HotelIdPool:
+    """
+    In-process list of every hotel id, used to draw random hotels in
+    O(count) instead of `ORDER BY RANDOM()` over the whole table.
+
+    The pool is reloaded when the catalogue version changes (upserts) or
+    after `ttl` seconds (catches deletes and admin edits).
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._ids = []
+        self._version = None
+        self._loaded_at = 0.0
+
+    def ids(self, force=False):
+        version = catalogue_version()
+        stale = force or version != self._version or time.monotonic() - self._loaded_at > self.ttl
+        if stale:
+            with self._lock:
+                # ordered so a seed maps to the same hotels in every process
+                ids = list(
+                    Hotel.objects.order_by("id").values_list("id", flat=True).iterator(chunk_size=10000)
+                )
+                self._ids, self._version, self._loaded_at = ids, version, time.monotonic()
+        return self._ids
+
+    def sample(self, count, seed=None):
+        """
+        Up to `count` distinct random hotels, in sampled order. The same
+        `seed` gives the same hotels for an unchanged catalogue.
+        """
+        rng = random.Random(seed) if seed is not None else random
+        for attempt in range(2):
+            ids = self.ids(force=bool(attempt))
+            picked = rng.sample(ids, min(count, len(ids)))
+            by_id = Hotel.objects.in_bulk(picked)
+            if len(by_id) == len(picked):
+                break
+            # some picked hotels were deleted since the pool was loaded
+        return [by_id[pk] for pk in picked if pk in by_id]
+
+
+_pool = None
+
+
+def hotel_id_pool():
+    global _pool
+    if _pool is None:
+        _pool = HotelIdPool(ttl=getattr(settings, "RANDOM_POOL_TTL", 300))
+    return _pool
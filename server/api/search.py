@@ -0,0 +1,156 @@
+import re
+
+from django.db import connection, connections
+from django.db.models import Count, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Hotel
+
+# columns a location search looks at
+LOCATION_COLUMNS = ("name", "city", "address", "tags")
+
+# Same objects migration 0006 creates. SQLite drops a table's triggers when
+# Django remakes the table during a later migration, so `ensure_search_index`
+# re-creates anything missing after every migrate.
+SQLITE_SCHEMA = {
+    "hotel_search": """
+        CREATE VIRTUAL TABLE hotel_search USING fts5(
+            name, city, address, tags,
+            content='api_hotel', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3 4'
+        )
+    """,
+    "hotel_search_ai": """
+        CREATE TRIGGER hotel_search_ai AFTER INSERT ON api_hotel BEGIN
+            INSERT INTO hotel_search(rowid, name, city, address, tags)
+            VALUES (new.rowid, new.name, new.city, new.address, new.tags);
+        END
+    """,
+    "hotel_search_ad": """
+        CREATE TRIGGER hotel_search_ad AFTER DELETE ON api_hotel BEGIN
+            INSERT INTO hotel_search(hotel_search, rowid, name, city, address, tags)
+            VALUES ('delete', old.rowid, old.name, old.city, old.address, old.tags);
+        END
+    """,
+    "hotel_search_au": """
+        CREATE TRIGGER hotel_search_au AFTER UPDATE ON api_hotel BEGIN
+            INSERT INTO hotel_search(hotel_search, rowid, name, city, address, tags)
+            VALUES ('delete', old.rowid, old.name, old.city, old.address, old.tags);
+            INSERT INTO hotel_search(rowid, name, city, address, tags)
+            VALUES (new.rowid, new.name, new.city, new.address, new.tags);
+        END
+    """,
+}
+
+
+def uses_fts():
+    return connection.vendor == "sqlite"
+
+
+def fts_query(text, columns=LOCATION_COLUMNS):
+    """
+    FTS5 MATCH expression: every word of `text` must prefix-match a token in
+    one of `columns`. Returns None when `text` has no searchable words.
+    """
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        return None
+    terms = " ".join(f'"{word}"*' for word in words)
+    return f"{{{' '.join(columns)}}} : ({terms})"
+
+
+def filter_location(qs, text):
+    """
+    Restrict `qs` to hotels matching `text` by name, city, address or tags.
+    Uses the FTS5 index on SQLite (as a subquery, so no id list is built in
+    Python); elsewhere falls back to icontains, which the trigram indexes
+    of migration 0006 serve on Postgres.
+    """
+    if uses_fts():
+        match = fts_query(text)
+        if match is None:
+            return qs.none()
+        return qs.filter(
+            id__in=RawSQL(
+                "SELECT h.id FROM api_hotel h JOIN hotel_search s ON s.rowid = h.rowid "
+                "WHERE hotel_search MATCH %s",
+                [match],
+            )
+        )
+    return qs.filter(
+        Q(city__icontains=text) | Q(name__icontains=text) | Q(address__icontains=text)
+    )
+
+
+def suggest(text, limit=8):
+    """
+    Typeahead for city / hotel names: `{"cities": [{"city", "count"}],
+    "hotels": [{"id", "name", "city"}]}`, best matches first.
+    """
+    text = text.strip()
+    if not text:
+        return {"cities": [], "hotels": []}
+
+    if uses_fts():
+        cities_match = fts_query(text, ("city",))
+        hotels_match = fts_query(text, ("name",))
+        if cities_match is None:
+            return {"cities": [], "hotels": []}
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT h.city, COUNT(*) AS n FROM hotel_search s "
+                "JOIN api_hotel h ON h.rowid = s.rowid "
+                "WHERE hotel_search MATCH %s GROUP BY h.city ORDER BY n DESC, h.city LIMIT %s",
+                [cities_match, limit],
+            )
+            cities = [{"city": city, "count": n} for city, n in cursor.fetchall()]
+            cursor.execute(
+                "SELECT h.id, h.name, h.city FROM hotel_search s "
+                "JOIN api_hotel h ON h.rowid = s.rowid "
+                "WHERE hotel_search MATCH %s ORDER BY s.rank LIMIT %s",
+                [hotels_match, limit],
+            )
+            hotels = [{"id": pk, "name": name, "city": city} for pk, name, city in cursor.fetchall()]
+        return {"cities": cities, "hotels": hotels}
+
+    cities = (
+        Hotel.objects.filter(city__istartswith=text)
+        .values("city").annotate(count=Count("id")).order_by("-count", "city")[:limit]
+    )
+    hotels = Hotel.objects.filter(name__icontains=text).values("id", "name", "city")[:limit]
+    return {"cities": list(cities), "hotels": list(hotels)}
+
+
+def rebuild_search_index(using=None):
+    """
+    Re-index every hotel. Needed after restoring a dump or a VACUUM, which
+    may renumber the api_hotel rowids the FTS index points at.
+    """
+    conn = connections[using] if using else connection
+    if conn.vendor == "sqlite":
+        with conn.cursor() as cursor:
+            cursor.execute("INSERT INTO hotel_search(hotel_search) VALUES ('rebuild')")
+
+
+def ensure_search_index(using=None):
+    """
+    Create whatever part of the SQLite search index is missing and re-index
+    if anything was. Returns the names that were created.
+    """
+    conn = connections[using] if using else connection
+    if conn.vendor != "sqlite":
+        return []
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name IN (%s)" % ", ".join(["%s"] * len(SQLITE_SCHEMA)),
+            list(SQLITE_SCHEMA),
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        if "api_hotel" not in conn.introspection.table_names(cursor):
+            return []
+        created = [name for name in SQLITE_SCHEMA if name not in existing]
+        for name in created:
+            cursor.execute(SQLITE_SCHEMA[name])
+    if created:
+        rebuild_search_index(using)
+    return created
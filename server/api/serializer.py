@@ -1,7 +1,129 @@
-from rest_framework import serializers
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 from .models import Hotel
 
 class HotelSerializer(serializers.ModelSerializer):
     class Meta:
         model = Hotel
         fields = "__all__"
+
+
+class HotelUpsertSerializer(HotelSerializer):
+    # existing ids are allowed (they are updated), so no UniqueValidator
+    # and no per-item SELECT during validation
+    id = serializers.CharField(max_length=64)
+
+
+# what a listing card needs (see client HotelCard)
+CARD_FIELDS = (
+    "id", "name", "city", "price_per_night", "rating", "description",
+    "distance_from_center_km", "latitude", "longitude", "images", "images_alt", "blurPlaceholder",
+)
+
+
+class HotelFieldsSerializer(HotelSerializer):
+    """HotelSerializer restricted to the `fields` given at construction."""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+def _identity(value):
+    return value
+
+
+# DRF field class -> equivalent converter for the values the database returns.
+# Anything not listed falls back to the field's own `to_representation`.
+_FAST_CONVERTERS = {
+    serializers.CharField: str,
+    serializers.EmailField: str,
+    serializers.IntegerField: int,
+    serializers.FloatField: float,
+    serializers.JSONField: _identity,
+}
+
+
+def _iso_datetime(field):
+    """
+    DateTimeField.to_representation for ISO 8601 output, with the target
+    timezone resolved once per batch instead of once per value.
+    """
+    tz = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    if tz is None:
+        return field.to_representation
+
+    def convert(value):
+        if value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+    return convert
+
+
+class SerializationPlan:
+    """
+    Precompiled `serializer.data` for rows fetched with `.values()`.
+
+    The plan is built once from the serializer's own fields, in the same
+    order, as `(key, column, converter)` steps, so the result is the same
+    dict DRF would build but without per-field dispatch or model
+    instances. Use `plan.columns` for the `.values()` call.
+    """
+
+    def __init__(self, serializer):
+        self.steps = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            convert = _FAST_CONVERTERS.get(type(field))
+            if type(field) is serializers.DateTimeField and _is_iso(field):
+                convert = field  # bound per batch, see _bind
+            elif convert is None or getattr(field, "binary", False):
+                convert = field.to_representation
+            self.steps.append((name, field.source, convert))
+        self.columns = tuple(dict.fromkeys(source for _, source, _ in self.steps))
+
+    def _bind(self):
+        return [
+            (name, source, _iso_datetime(convert) if isinstance(convert, serializers.Field) else convert)
+            for name, source, convert in self.steps
+        ]
+
+    def serialize(self, row, steps=None):
+        out = {}
+        for name, source, convert in steps or self._bind():
+            value = row[source]
+            out[name] = None if value is None else convert(value)
+        return out
+
+    def serialize_many(self, rows):
+        steps = self._bind()
+        return [self.serialize(row, steps) for row in rows]
+
+    def serialize_instance(self, obj):
+        # a fully loaded instance keeps its column values in __dict__
+        return self.serialize(obj.__dict__)
+
+
+def _is_iso(field):
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    return isinstance(output_format, str) and output_format.lower() == ISO_8601
+
+
+_plans = {}
+MAX_PLANS = 256  # `fields=` comes from the query string
+
+
+def hotel_plan(fields=None):
+    """Cached plan equivalent to `HotelFieldsSerializer(fields=fields)`."""
+    key = frozenset(fields) if fields is not None else None
+    plan = _plans.get(key)
+    if plan is None:
+        if len(_plans) >= MAX_PLANS:
+            _plans.clear()
+        plan = _plans[key] = SerializationPlan(HotelFieldsSerializer(fields=fields))
+    return plan
@@ -0,0 +1,218 @@
+"""
+Per-city (optionally per city and price band) shards of the vector store,
+so a city-scoped recommendation scores only that city's vectors and BM25
+postings instead of gathering rows from the whole store.
+
+Every export writes `shards-<gen>.npz`: the shard keys and the shard of
+each store row. A shard's vectors and postings are copied out of the
+memory-mapped store the first time a query needs it and kept in a
+least-recently-used set bounded by VECTOR_SHARD_MAX_RESIDENT shards and
+VECTOR_SHARD_MEMORY_BUDGET bytes. Lookups, loads and evictions are
+counted in /api/metrics/ (`stayfinder_shard_*`, load time as the
+`shards.load` stage).
+
+Shards only change where a row is read from, never its score: BM25
+weights are sliced from the global index, and a hotel whose city or price
+changed since the export is still found, in its old shard.
+"""
+import bisect
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+from .instrumentation import counter, stage
+from .lexical import LexicalIndex
+from .models import Hotel
+from .quantization import QuantizedMatrix
+
+
+def shards_enabled():
+    return getattr(settings, "VECTOR_SHARDS", False)
+
+
+def shard_key(city, price):
+    """`city`, or `city|band` when VECTOR_SHARD_PRICE_BANDS is set (band "-" for no price)."""
+    city = (city or "").strip().lower()
+    bands = getattr(settings, "VECTOR_SHARD_PRICE_BANDS", ())
+    if not bands:
+        return city
+    band = bisect.bisect_right(sorted(bands), price) if price is not None else "-"
+    return f"{city}|{band}"
+
+
+def build_shard_map(ids):
+    """`(keys, row_shard)` for store rows `ids`: shard names and each row's shard number."""
+    rows_by_id = {hotel_id: row for row, hotel_id in enumerate(ids)}
+    codes = {}
+    row_shard = np.zeros(len(ids), dtype=np.int32)
+    hotels = Hotel.objects.values_list("id", "city", "price_per_night")
+    for pk, city, price in hotels.iterator(chunk_size=5000):
+        row = rows_by_id.get(pk)
+        if row is not None:
+            row_shard[row] = codes.setdefault(shard_key(city, price), len(codes))
+    keys = sorted(codes, key=codes.get)
+    return keys, row_shard
+
+
+def save_shard_map(path, keys, row_shard):
+    with open(path, "wb") as fh:
+        np.savez(fh, keys=np.array(keys, dtype=str), row_shard=row_shard)
+
+
+def slice_matrix(matrix, rows):
+    """An in-memory copy of `rows` of a (possibly quantized, memory-mapped) store matrix."""
+    if isinstance(matrix, QuantizedMatrix):
+        scales = matrix.scales[rows] if matrix.scales is not None else None
+        return QuantizedMatrix(np.ascontiguousarray(matrix.data[rows]), scales)
+    return np.ascontiguousarray(matrix[rows])
+
+
+def slice_lexical(lexical, rows):
+    """The postings of `rows` (sorted) as an index over rows 0..len(rows)-1; weights unchanged."""
+    local = np.full(lexical.n_docs, -1, dtype=np.int64)
+    local[rows] = np.arange(len(rows))
+    posting_rows = local[lexical.rows]
+    keep = posting_rows >= 0
+    kept_before = np.concatenate(([0], np.cumsum(keep)))
+    # the vocabulary is shared with the store's index: terms keep their positions
+    return LexicalIndex(
+        lexical.terms, kept_before[lexical.offsets], posting_rows[keep].astype(np.int32),
+        lexical.weights[keep], len(rows),
+    )
+
+
+def _lookups():
+    return counter("stayfinder_shard_lookups_total", "Vector-store shard lookups by result.", ("result",))
+
+
+def _evictions():
+    return counter("stayfinder_shard_evictions_total", "Vector-store shards evicted from memory.")
+
+
+def _nbytes(*arrays):
+    return sum(a.nbytes for a in arrays if a is not None)
+
+
+class Shard:
+    def __init__(self, key, rows, matrix, lexical):
+        self.key = key
+        self.rows = rows  # store rows, ascending
+        self.matrix = matrix
+        self.lexical = lexical
+        data = matrix.data if isinstance(matrix, QuantizedMatrix) else matrix
+        self.nbytes = _nbytes(rows, data, getattr(matrix, "scales", None))
+        if lexical is not None:
+            self.nbytes += _nbytes(lexical.offsets, lexical.rows, lexical.weights)
+
+    def local(self, rows):
+        """Positions in this shard of store `rows` (which must belong to it)."""
+        return np.searchsorted(self.rows, rows)
+
+
+class ShardSet:
+    """The shards of one store generation, loaded on demand."""
+
+    def __init__(self, keys, row_shard, matrix, lexical):
+        self.keys = keys
+        self.row_shard = row_shard
+        self.matrix = matrix
+        self.lexical = lexical
+        self.max_resident = max(1, getattr(settings, "VECTOR_SHARD_MAX_RESIDENT", 64))
+        self.budget = getattr(settings, "VECTOR_SHARD_MEMORY_BUDGET", 256 * 2 ** 20)
+        self.max_fanout = getattr(settings, "VECTOR_SHARD_MAX_FANOUT", 4)
+        self._resident = OrderedDict()  # shard number -> Shard, least recently used first
+        self._loading = {}  # shard number -> Event set when its load finishes
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, matrix, lexical):
+        data = np.load(path)
+        return cls(data["keys"].tolist(), data["row_shard"], matrix, lexical)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def get(self, code):
+        """
+        Shard number `code`, loading it (and evicting others) if it is not
+        resident. The load runs outside the lock, so lookups of other shards
+        never wait for it; concurrent lookups of the same shard wait for the
+        one load instead of repeating it.
+        """
+        lookups = _lookups()
+        while True:
+            with self._lock:
+                shard = self._resident.get(code)
+                if shard is not None:
+                    self._resident.move_to_end(code)
+                    lookups.inc("hit")
+                    return shard
+                loading = self._loading.get(code)
+                if loading is None:
+                    loading = self._loading[code] = threading.Event()
+                    break
+            # another thread is loading it; look again once it is done (or failed)
+            loading.wait()
+
+        lookups.inc("miss")
+        try:
+            with stage("shards.load"):
+                shard = self._load(code)
+            with self._lock:
+                self._resident[code] = shard
+                self._bytes += shard.nbytes
+                self._evict()
+        finally:
+            with self._lock:
+                del self._loading[code]
+            loading.set()
+        return shard
+
+    def _load(self, code):
+        rows = np.flatnonzero(self.row_shard == code)
+        return Shard(
+            self.keys[code], rows, slice_matrix(self.matrix, rows),
+            slice_lexical(self.lexical, rows) if self.lexical is not None else None,
+        )
+
+    def _evict(self):
+        evictions = _evictions()
+        # the shard just loaded stays, even when it alone exceeds the budget
+        while len(self._resident) > 1 and (
+            len(self._resident) > self.max_resident or self._bytes > self.budget
+        ):
+            _, shard = self._resident.popitem(last=False)
+            self._bytes -= shard.nbytes
+            evictions.inc()
+
+    def parts(self, rows):
+        """
+        `[(shard, store_rows)]` covering store `rows`, or None when they
+        span more than VECTOR_SHARD_MAX_FANOUT shards (the whole store is
+        cheaper to search than that many shard loads).
+        """
+        codes = self.row_shard[rows]
+        unique = np.unique(codes)
+        if not len(unique) or len(unique) > self.max_fanout:
+            _lookups().inc("bypass")
+            return None
+        return [(self.get(int(code)), rows[codes == code]) for code in unique]
+
+    def stats(self):
+        """Resident shards of this generation, plus this process's lookup counters."""
+        lookups = _lookups()
+        with self._lock:
+            return {
+                "shards": len(self.keys),
+                "resident": [shard.key for shard in self._resident.values()],
+                "resident_bytes": self._bytes,
+                "max_resident": self.max_resident,
+                "memory_budget": self.budget,
+                "hits": lookups.value("hit"),
+                "misses": lookups.value("miss"),
+                "bypassed": lookups.value("bypass"),
+                "evictions": _evictions().value(),
+            }
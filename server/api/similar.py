@@ -0,0 +1,202 @@
+"""
+Precomputed "similar hotels" lists, served by /api/hotels/{id}/similar/.
+
+    score(a, b) = w_embedding * cosine(a, b)
+                + w_price * 1 / (1 + |ln(price_a / price_b)|)   (0 if a price is unknown)
+                + w_city * [same city]
+
+The top SIMILAR_HOTELS_K of every hotel are stored as SimilarHotel rows.
+`build_similar_hotels` scores the whole catalogue in blocks of rows (one
+matrix product per block against the memory-mapped vector store);
+`update_similar_hotels` redoes only what a set of changed hotels can
+affect. The score is symmetric, so one block of changed rows also gives
+every other hotel's score against them.
+"""
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .models import Hotel, SimilarHotel
+from .vector_store import store
+
+DEFAULT_WEIGHTS = {"embedding": 0.7, "price": 0.15, "city": 0.15}
+ID_CHUNK_SIZE = 500  # keep `id__in` lists under SQLite's variable limit
+
+
+def similar_enabled():
+    return getattr(settings, "SIMILAR_HOTELS", False)
+
+
+def similar_k():
+    return getattr(settings, "SIMILAR_HOTELS_K", 10)
+
+
+def similar_weights():
+    weights = dict(DEFAULT_WEIGHTS)
+    weights.update(getattr(settings, "SIMILAR_HOTELS_WEIGHTS", {}))
+    return weights
+
+
+def _chunks(seq, size):
+    for start in range(0, len(seq), size):
+        yield seq[start:start + size]
+
+
+class Features:
+    """Vector-store rows plus log price and city code per row."""
+
+    def __init__(self):
+        snap = store.snapshot()
+        self.ids, self.index, self.matrix = snap[:3] if snap else ([], {}, None)
+        n = len(self.ids)
+        self.log_price = np.zeros(n, dtype=np.float32)
+        self.priced = np.zeros(n, dtype=bool)
+        # hotels without a city get a code of their own, so they never match
+        self.city = -1 - np.arange(n, dtype=np.int64)
+        codes = {}
+        rows = Hotel.objects.values_list("id", "price_per_night", "city")
+        for pk, price, city in rows.iterator(chunk_size=5000):
+            row = self.index.get(pk)
+            if row is None:
+                continue
+            if price and price > 0:
+                self.log_price[row] = np.log(price)
+                self.priced[row] = True
+            city = (city or "").strip().lower()
+            if city:
+                self.city[row] = codes.setdefault(city, len(codes))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def scores(self, rows, weights):
+        """`(len(rows), N)` float32 scores of `rows` against every hotel, self excluded."""
+        block = np.asarray(self.matrix[rows], dtype=np.float32)
+        if isinstance(self.matrix, np.ndarray):
+            scores = block @ self.matrix.T
+        else:  # QuantizedMatrix only multiplies from the left
+            scores = np.ascontiguousarray((self.matrix @ block.T).T)
+        scores *= np.float32(weights["embedding"])
+        # in place from here on: a block is SIMILAR_HOTELS_BLOCK_ELEMENTS floats
+        if weights["price"]:
+            proximity = self.log_price[rows][:, None] - self.log_price[None, :]
+            np.abs(proximity, out=proximity)
+            proximity += 1.0
+            np.reciprocal(proximity, out=proximity)
+            proximity[:, ~self.priced] = 0.0
+            proximity[~self.priced[rows]] = 0.0
+            proximity *= np.float32(weights["price"])
+            scores += proximity
+        if weights["city"]:
+            same_city = self.city[rows][:, None] == self.city[None, :]
+            np.add(scores, np.float32(weights["city"]), out=scores, where=same_city)
+        scores[np.arange(len(rows)), rows] = -np.inf
+        return scores
+
+
+def top_k(scores, k):
+    """Per row, the column indices of the `k` best scores, best first."""
+    k = min(k, scores.shape[1] - 1)
+    if k <= 0:
+        return np.zeros((len(scores), 0), dtype=np.int64)
+    best = np.argpartition(scores, -k, axis=1)[:, -k:]
+    order = np.argsort(-np.take_along_axis(scores, best, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(best, order, axis=1)
+
+
+def block_rows(n):
+    """Rows per block so one score block stays near SIMILAR_HOTELS_BLOCK_ELEMENTS floats."""
+    return max(1, getattr(settings, "SIMILAR_HOTELS_BLOCK_ELEMENTS", 2 ** 25) // max(n, 1))
+
+
+def _links(features, lists):
+    """SimilarHotel rows for `{row: [(neighbour_row, score)]}`."""
+    ids = features.ids
+    return [
+        SimilarHotel(hotel_id=ids[row], similar_id=ids[other], rank=rank, score=float(score))
+        for row, neighbours in lists.items()
+        for rank, (other, score) in enumerate(neighbours)
+    ]
+
+
+def _block_lists(features, rows, weights, k):
+    scores = features.scores(rows, weights)
+    best = top_k(scores, k)
+    return scores, {
+        int(row): [(int(j), scores[i, j]) for j in best[i]]
+        for i, row in enumerate(rows)
+    }
+
+
+def build_similar_hotels(block_size=None):
+    """Recompute every hotel's list. Returns the number of hotels covered."""
+    features = Features()
+    n, k, weights = len(features), similar_k(), similar_weights()
+    block_size = block_size or block_rows(n)
+    with transaction.atomic():
+        SimilarHotel.objects.all().delete()
+        for start in range(0, n, block_size):
+            _, lists = _block_lists(features, np.arange(start, min(n, start + block_size)), weights, k)
+            SimilarHotel.objects.bulk_create(_links(features, lists), batch_size=5000)
+    return n
+
+
+def update_similar_hotels(hotel_ids):
+    """
+    Bring the lists up to date after `hotel_ids` changed: their own lists,
+    the lists that contained them (recomputed), and the lists they now
+    enter (merged). Falls back to a full build when the lists were never
+    built or a large share of the catalogue changed. Returns the number of
+    lists rewritten.
+    """
+    features = Features()
+    n, k, weights = len(features), similar_k(), similar_weights()
+    rows = np.array(sorted({features.index[pk] for pk in hotel_ids if pk in features.index}), dtype=np.int64)
+    if not len(rows):
+        return 0
+    rebuild_fraction = getattr(settings, "SIMILAR_HOTELS_REBUILD_FRACTION", 0.2)
+    if len(rows) > rebuild_fraction * n or not SimilarHotel.objects.exists():
+        return build_similar_hotels()
+
+    changed_ids = [features.ids[row] for row in rows]
+    changed = set(rows.tolist())
+    # each hotel's current k-th best score: a changed hotel enters its list above it
+    threshold = np.full(n, -np.inf, dtype=np.float32)
+    for pk, score in SimilarHotel.objects.filter(rank=k - 1).values_list("hotel_id", "score").iterator():
+        if pk in features.index:
+            threshold[features.index[pk]] = score
+    # lists that contain a changed hotel lose (or rescore) an entry: recompute them
+    recompute = set()
+    for chunk in _chunks(changed_ids, ID_CHUNK_SIZE):
+        links = SimilarHotel.objects.filter(similar_id__in=chunk).values_list("hotel_id", flat=True)
+        recompute.update(features.index[pk] for pk in links if pk in features.index)
+    recompute -= changed
+
+    lists, entering = {}, {}
+    block_size = block_rows(n)
+    for start in range(0, len(rows), block_size):
+        block = rows[start:start + block_size]
+        scores, block_lists = _block_lists(features, block, weights, k)
+        lists.update(block_lists)
+        for i, j in zip(*np.nonzero(scores > threshold[None, :])):
+            entering.setdefault(int(j), []).append((int(block[i]), scores[i, j]))
+    recompute_rows = np.array(sorted(recompute), dtype=np.int64)
+    for start in range(0, len(recompute_rows), block_size):
+        lists.update(_block_lists(features, recompute_rows[start:start + block_size], weights, k)[1])
+
+    merge = [row for row in entering if row not in lists]
+    for chunk in _chunks(merge, ID_CHUNK_SIZE):
+        current = {row: [] for row in chunk}
+        links = SimilarHotel.objects.filter(hotel_id__in=[features.ids[row] for row in chunk])
+        for pk, other, score in links.values_list("hotel_id", "similar_id", "score"):
+            if other in features.index:
+                current[features.index[pk]].append((features.index[other], score))
+        for row, neighbours in current.items():
+            neighbours.extend(entering[row])
+            lists[row] = sorted(neighbours, key=lambda entry: -entry[1])[:k]
+
+    with transaction.atomic():
+        for chunk in _chunks([features.ids[row] for row in lists], ID_CHUNK_SIZE):
+            SimilarHotel.objects.filter(hotel_id__in=chunk).delete()
+        SimilarHotel.objects.bulk_create(_links(features, lists), batch_size=5000)
+    return len(lists)
@@ -1,3 +1,718 @@
-from django.test import TestCase
+import csv
+import io
+import os
+import queue
+import random
+import shutil
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from benchmarks.stub_embeddings import HashingProvider
+from benchmarks.synthetic import make_hotel, place
+
+from . import batching, embeddings, providers, ranking
+from .ann import top_k
+from .catalogue import bump_catalogue_version, hotels_changed, publisher
+from .embedding_queue import claim_jobs, enqueue_embeddings, queue_status, release_jobs, run_batch
+from .facets import compute_facets
+from .filters import apply_hard_filters, combine_scores, parse_filters
+from .geo import geo_index, haversine_km, near_hotels, parse_geo
+from .inference import BoundedExecutor, InferenceBusy
+from .labels import hotels_with_label, sync_hotel_labels
+from .models import EmbeddingJob, Hotel, HotelEmbedding, HotelLabel, Label, SimilarHotel
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page
+from .quantization import QuantizedMatrix, quantize
+from .search import filter_location, suggest
+from .similar import build_similar_hotels
+from .upsert import upsert_hotels
+from .vector_store import export_vector_store, store
+
+
+def hotel(pk, **fields):
+    return {"id": pk, "name": pk.title(), "city": "kochi", **fields}
+
+
+class CatalogueTestCase(TestCase):
+    """
+    Runs against a throw-away vector store, encodes synchronously with the
+    benchmarks' hashing stand-in for the model, and restores the process-wide
+    provider afterwards. `add_hotels` publishes the store at once instead of
+    leaving it to the background export.
+    """
+
+    def setUp(self):
+        directory = tempfile.mkdtemp(prefix="stayfinder-test-store-")
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        overrides = override_settings(
+            VECTOR_STORE_DIR=directory, EMBEDDING_QUEUE=False, EMBEDDING_BATCHING=False,
+            EMBEDDING_SERVER=None, SIMILAR_HOTELS=False, VECTOR_STORE_EXPORT_DELAY=3600,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        previous = providers._provider, batching._batcher
+        providers._provider, batching._batcher = HashingProvider(), None
+        self.addCleanup(setattr, providers, "_provider", previous[0])
+        self.addCleanup(setattr, batching, "_batcher", previous[1])
+
+    def add_hotels(self, items):
+        results = upsert_hotels(items)
+        hotels_changed([r["id"] for r in results])
+        publisher().flush()
+        return results
+
+
+class CursorTests(TestCase):
+    def test_round_trip(self):
+        created_at = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc)
+        cursor = encode_cursor({"created_at": created_at, "id": "kochi-grand"})
+        self.assertNotIn("=", cursor)
+        self.assertEqual(decode_cursor(cursor), (created_at, "kochi-grand"))
+
+    def test_invalid_cursor(self):
+        for cursor in ("", "not a cursor", encode_cursor({"created_at": datetime.now(dt_timezone.utc), "id": "a"})[:-3]):
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(cursor)
+
+    def test_pages_cover_every_row_in_stable_order(self):
+        upsert_hotels([hotel(f"h-{i:02d}") for i in range(25)])
+        # ties on created_at are broken by id, so pages never skip or repeat a row
+        Hotel.objects.filter(id__lt="h-10").update(created_at=datetime(2024, 1, 1, tzinfo=dt_timezone.utc))
+        Hotel.objects.filter(id__gte="h-10").update(created_at=datetime(2024, 2, 1, tzinfo=dt_timezone.utc))
+        expected = list(Hotel.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+
+        seen, cursor = [], None
+        while True:
+            rows, cursor = keyset_page(Hotel.objects.all(), cursor, 4)
+            seen.extend(h.id for h in rows)
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+
+
+class UpsertTests(TestCase):
+    def test_created_and_updated(self):
+        results = upsert_hotels([hotel("a"), hotel("b"), hotel("c")])
+        self.assertEqual([r["created"] for r in results], [True, True, True])
+
+        results = upsert_hotels([hotel("b", rating=4.0), hotel("d"), hotel("a", rating=3.5)])
+        self.assertEqual(results, [
+            {"id": "b", "created": False}, {"id": "d", "created": True}, {"id": "a", "created": False},
+        ])
+        self.assertEqual(Hotel.objects.count(), 4)
+        self.assertEqual(Hotel.objects.get(id="b").rating, 4.0)
+
+    def test_last_duplicate_wins_and_missing_fields_are_kept(self):
+        upsert_hotels([hotel("a", price_per_night=2000, rating=4.0)])
+        results = upsert_hotels([{"id": "a", "rating": 3.0}, {"id": "a", "rating": 4.5}], chunk_size=1)
+        self.assertEqual(results, [{"id": "a", "created": False}])
+        row = Hotel.objects.get(id="a")
+        self.assertEqual((row.rating, row.price_per_night, row.name), (4.5, 2000, "A"))
+
+
+class FilterTests(CatalogueTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_hotels([
+            hotel("cheap", price_per_night=1500, rating=3.2, amenities=["Free Wi-Fi"]),
+            hotel("mid", price_per_night=4000, rating=4.6, amenities=["Pool", "Free Wi-Fi"], sdg_tags=["SDG 13"]),
+            hotel("dear", price_per_night=9000, rating=4.9, amenities=["Pool", "Spa"]),
+            hotel("unpriced", rating=4.0, amenities=["Spa"]),
+        ])
+
+    def matching(self, data):
+        qs, narrowed = apply_hard_filters(Hotel.objects.all(), parse_filters(data))
+        return set(qs.values_list("id", flat=True)), narrowed
+
+    def test_no_filters(self):
+        self.assertEqual(self.matching({})[1], False)
+
+    def test_budget_keeps_unpriced_hotels(self):
+        self.assertEqual(self.matching({"minBudget": 2000, "maxBudget": 5000}), ({"mid", "unpriced"}, True))
+
+    def test_min_rating(self):
+        self.assertEqual(self.matching({"minRating": "4.5"})[0], {"mid", "dear"})
+
+    def test_required_amenities_and_sdg(self):
+        self.assertEqual(self.matching({"amenities": ["pool"], "requireAmenities": "true"})[0], {"mid", "dear"})
+        self.assertEqual(self.matching({"amenities": ["wifi"]})[0], {"cheap", "mid", "dear", "unpriced"})
+        self.assertEqual(self.matching({"sdg": "13", "requireSdg": True})[0], {"mid"})
+
+    def test_rule_score_and_reasons(self):
+        filters = parse_filters({"amenities": ["Pool", "Wi-Fi"], "sdg": "SDG 13", "maxBudget": 5000})
+        rows = Hotel.objects.order_by("id").values(*ranking.FEATURE_FIELDS)
+        features = {row["id"]: row for row in rows}
+        order = ["mid", "dear", "cheap"]
+        weights = {"ai": 50, "amenities": 20, "sdg": 10, "rating": 5, "budget": 5}
+        final, rule, reasons = combine_scores([0.5, 0.5, 0.5], [features[pk] for pk in order], filters, weights)
+
+        self.assertEqual(reasons[0], [
+            "Has 2 of 2 requested amenities.", "Supports SDG 13.", "Highly rated (4.6).",
+        ])
+        self.assertEqual(reasons[1], ["Has 1 of 2 requested amenities.", "Highly rated (4.9)."])
+        self.assertEqual(reasons[2], ["Has 1 of 2 requested amenities."])
+        np.testing.assert_allclose(rule, [20 + 10 + 5 * 0.8 + 5, 10 + 5 * 0.95, 10 + 5 * 0.1 + 5])
+        np.testing.assert_allclose(final, 25 + rule)
+
+
+class PublishTests(CatalogueTestCase):
+    def test_writes_leave_the_export_to_the_publisher(self):
+        self.add_hotels([hotel("a")])
+        upsert_hotels([hotel("b")])
+        self.assertEqual(hotels_changed(["b"]), 1)
+        # encoded, but the store is only rewritten when the publisher runs
+        self.assertEqual(store.missing(["a", "b"]), ["b"])
+        self.assertEqual(publisher().pending(), 1)
+        self.assertEqual(publisher().flush(), (2, None))
+        self.assertEqual(store.missing(["a", "b"]), [])
+        self.assertIsNone(publisher().flush())
+
+    def test_searches_serve_the_store_as_exported(self):
+        self.add_hotels([hotel("a")])
+        upsert_hotels([hotel("b")])  # e.g. from the admin: never encoded
+        query = providers.get_provider().encode(["kochi"])[0]
+        with mock.patch.dict(embeddings._checked_at, clear=True), \
+                self.assertLogs("api.embeddings", "WARNING") as logs:
+            found = embeddings.search_hotels(query, 10)
+        self.assertEqual([pk for pk, _ in found], ["a"])
+        self.assertIn("holds 1 of 2 hotels", logs.output[0])
+        self.assertEqual(store.missing(["b"]), ["b"])
+        self.assertFalse(embeddings.HotelEmbedding.objects.filter(hotel_id="b").exists())
+
+
+class GeoTests(CatalogueTestCase):
+    centre = (9.9312, 76.2673)
+
+    def setUp(self):
+        super().setUp()
+        # one hotel every 0.5 km due east of the centre, plus one without coordinates
+        items = []
+        for i in range(20):
+            lat, lng = place("kochi", 0.5 * (i + 1), np.pi / 2)
+            items.append(hotel(f"east-{i:02d}", latitude=lat, longitude=lng))
+        items.append(hotel("nowhere"))
+        self.add_hotels(items)
+        geo_index().data(force=True)
+
+    def distances(self):
+        ids = Hotel.objects.filter(latitude__isnull=False).values_list("id", "latitude", "longitude")
+        lat, lng = np.radians(self.centre)
+        return {pk: float(haversine_km(lat, lng, np.radians(a), np.radians(b))) for pk, a, b in ids}
+
+    def geo(self, **params):
+        return parse_geo({"near": f"{self.centre[0]},{self.centre[1]}", **params})
+
+    def test_radius(self):
+        found = near_hotels(self.geo(radius=3.2))
+        expected = sorted((d, pk) for pk, d in self.distances().items() if d <= 3.2)
+        self.assertEqual([pk for pk, _ in found], [pk for _, pk in expected])
+        self.assertEqual(len(found), 6)
+        for (_, km), (d, _) in zip(found, expected):
+            self.assertAlmostEqual(km, d, places=6)
+
+    def test_default_radius(self):
+        self.assertEqual(len(near_hotels(self.geo())), 10)
+
+    def test_nearest(self):
+        found = near_hotels(self.geo(nearest=3))
+        self.assertEqual([pk for pk, _ in found], ["east-00", "east-01", "east-02"])
+        found = near_hotels(self.geo(nearest=50))
+        self.assertEqual(len(found), 20)
+
+    def test_nearest_within_radius_and_candidates(self):
+        self.assertEqual(len(near_hotels(self.geo(radius=2.1, nearest=10))), 4)
+        candidates = ["east-05", "east-17", "east-11", "nowhere"]
+        found = near_hotels(self.geo(nearest=2), candidates)
+        self.assertEqual([pk for pk, _ in found], ["east-05", "east-11"])
+
+    def test_parse_geo_errors(self):
+        self.assertIsNone(parse_geo({}))
+        for near in ("nope", "91,0", "10"):
+            with self.assertRaises(ValueError):
+                parse_geo({"near": near})
+
+
+class ShardParityTests(CatalogueTestCase):
+    def setUp(self):
+        super().setUp()
+        rng = random.Random(7)
+        self.add_hotels([make_hotel(i, rng, description_words=20) for i in range(400)])
+
+    def ranked(self, body):
+        req = ranking.parse_request(body)
+        return [(pk, cosine, rule) for pk, cosine, rule, _ in ranking.rank(req, 20, 0)]
+
+    def assertSameRanking(self, sharded, flat):
+        self.assertTrue(flat)
+        self.assertEqual(len(sharded), len(flat))
+        # exact float ties may come out in either order; the scores per rank may not differ
+        for (_, cos_a, rule_a), (_, cos_b, rule_b) in zip(sharded, flat):
+            self.assertAlmostEqual(cos_a, cos_b, places=5)
+            self.assertAlmostEqual(rule_a, rule_b, places=9)
+        self.assertEqual({pk for pk, _, _ in sharded}, {pk for pk, _, _ in flat})
+
+    def test_sharded_matches_global(self):
+        bodies = [
+            {"tripType": "family", "amenities": ["Pool"], "locationPref": "kochi"},
+            {"tripType": "business", "amenities": ["Free Wi-Fi"], "locationPref": "goa", "lexicalWeight": 0},
+            {"tripType": "couples", "amenities": ["Spa"], "locationPref": "jaipur", "minRating": 3.5},
+            {"tripType": "solo", "amenities": ["Bar"], "maxBudget": 4000},  # spans every city: bypasses shards
+        ]
+        with override_settings(VECTOR_SHARDS=True):
+            export_vector_store()
+            sharded = [self.ranked(body) for body in bodies]
+            self.assertIn("kochi", store.shard_stats()["resident"])
+        with override_settings(VECTOR_SHARDS=False):
+            export_vector_store()
+            self.assertIsNone(store.shard_stats())
+            flat = [self.ranked(body) for body in bodies]
+        for a, b in zip(sharded, flat):
+            self.assertSameRanking(a, b)
+
+
+class PostFilterTests(CatalogueTestCase):
+    def setUp(self):
+        super().setUp()
+        rng = random.Random(11)
+        self.add_hotels([make_hotel(i, rng, description_words=20) for i in range(300)])
+
+    def ranked(self, body):
+        req = ranking.parse_request(body)
+        return [(pk, round(cosine, 5), rule) for pk, cosine, rule, _ in ranking.rank(req, 20, 0)]
+
+    @override_settings(RECOMMEND_RERANK_DEPTH=20)
+    def test_large_filtered_sets_post_filter_the_full_search(self):
+        bodies = [
+            {"tripType": "family", "amenities": ["Pool"], "maxBudget": 5000, "lexicalWeight": 0},
+            {"tripType": "business", "amenities": ["Free Wi-Fi"], "minRating": 4.5, "lexicalWeight": 0},
+            # hybrid: BM25 is normalised over a different pool, so only the filters are compared
+            {"tripType": "solo", "amenities": ["Spa"], "maxBudget": 3000},
+        ]
+        exact = [self.ranked(body) for body in bodies]
+        with override_settings(RECOMMEND_EXACT_MAX_CANDIDATES=10), \
+                mock.patch.object(ranking, "allowed_ids", wraps=ranking.allowed_ids) as post_filter:
+            filtered = [self.ranked(body) for body in bodies]
+        self.assertGreaterEqual(post_filter.call_count, 3)  # a selective filter fetches deeper
+        for a, b in zip(exact[:2], filtered[:2]):
+            self.assertEqual(len(a), 20)
+            self.assertEqual([cosine for _, cosine, _ in a], [cosine for _, cosine, _ in b])
+        hotels = {h["id"]: h for h in Hotel.objects.values("id", "price_per_night", "rating")}
+        self.assertTrue(all(hotels[pk]["price_per_night"] <= 5000 for pk, _, _ in filtered[0]))
+        self.assertTrue(all(hotels[pk]["rating"] >= 4.5 for pk, _, _ in filtered[1]))
+        self.assertEqual(len(filtered[2]), 20)
+        self.assertTrue(all(hotels[pk]["price_per_night"] <= 3000 for pk, _, _ in filtered[2]))
+
+    def test_near_queries_keep_exact_candidates(self):
+        req = ranking.parse_request({"near": "9.93,76.26", "maxBudget": 5000})
+        hotels, _ = ranking.candidate_queryset(req)
+        ids = list(hotels.values_list("id", flat=True))
+        with override_settings(RECOMMEND_EXACT_MAX_CANDIDATES=10):
+            self.assertEqual(ranking.split_candidates(req, hotels, ids), (ids, None))
+
+
+class QuantizationTests(TestCase):
+    """Stored int8 / float16 vectors must find (nearly) the same top 10 as float32."""
+
+    MIN_RECALL = {"float16": 0.99, "int8": 0.9}
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # clustered unit vectors, so near neighbours are close together as with real embeddings
+        centres = rng.standard_normal((40, 384))
+        docs = centres[rng.integers(0, 40, 5000)] + 0.6 * rng.standard_normal((5000, 384))
+        queries = centres[rng.integers(0, 40, 100)] + 0.6 * rng.standard_normal((100, 384))
+        self.docs = (docs / np.linalg.norm(docs, axis=1, keepdims=True)).astype(np.float32)
+        self.queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+    def recall(self, matrix, k=10):
+        hits = 0
+        for query in self.queries:
+            expected = top_k(self.docs @ query, k)
+            hits += len(np.intersect1d(expected, top_k(matrix @ query, k)))
+        return hits / (k * len(self.queries))
+
+    def test_top_k_recall(self):
+        self.assertEqual(self.recall(QuantizedMatrix(*quantize(self.docs, "float32"))), 1.0)
+        for dtype, threshold in self.MIN_RECALL.items():
+            with self.subTest(dtype=dtype):
+                self.assertGreaterEqual(self.recall(QuantizedMatrix(*quantize(self.docs, dtype))), threshold)
+
+    def test_dequantized_rows(self):
+        data, scales = quantize(self.docs[:10], "int8")
+        rows = QuantizedMatrix(data, scales)[2:5]
+        self.assertEqual(rows.dtype, np.float32)
+        np.testing.assert_allclose(rows, self.docs[2:5], atol=0.01)
+
+
+@override_settings(REQUEST_TIMING_LOG=False)
+class OperationsAccessTests(TestCase):
+    paths = ("/api/metrics/", "/api/embeddings/stats/", "/api/embeddings/queue/")
+
+    def test_anonymous_clients_are_refused(self):
+        for path in self.paths:
+            self.assertEqual(self.client.get(path).status_code, 403, path)
+
+    def test_staff_and_allowed_addresses(self):
+        with override_settings(OPERATIONS_ALLOWED_IPS=["127.0.0.1"]):
+            for path in self.paths:
+                self.assertEqual(self.client.get(path).status_code, 200, path)
+        self.client.force_login(User.objects.create_user("ops", is_staff=True))
+        for path in self.paths:
+            self.assertEqual(self.client.get(path).status_code, 200, path)
+
+    def test_server_timing_only_when_enabled(self):
+        with override_settings(SERVER_TIMING=False):
+            self.assertNotIn("Server-Timing", self.client.get("/api/hotels/"))
+        with override_settings(SERVER_TIMING=True):
+            self.assertIn("total;dur=", self.client.get("/api/hotels/")["Server-Timing"])
+
+
+@override_settings(REQUEST_TIMING_LOG=False, EMBEDDING_BATCHING=True)
+class RecommendBusyTests(TestCase):
+    def test_full_encode_queue_answers_429(self):
+        upsert_hotels([hotel("a")])
+        with mock.patch.object(embeddings, "get_batcher") as get_batcher:
+            get_batcher.return_value.submit.side_effect = queue.Full
+            response = self.client.post(
+                "/api/hotels/recommend/", {"tripType": "busy-test", "amenities": []}, content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "1")
+
+
+@override_settings(REQUEST_TIMING_LOG=False)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        upsert_hotels([hotel("a"), hotel("b")])
+        bump_catalogue_version()
+
+    def test_retrieve_validators(self):
+        response = self.client.get("/api/hotels/a/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Cache-Control"], "public, max-age=300")
+        etag, modified = response["ETag"], response["Last-Modified"]
+        self.assertTrue(etag.startswith('W/"'))
+
+        self.assertEqual(self.client.get("/api/hotels/a/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get("/api/hotels/a/", HTTP_IF_MODIFIED_SINCE=modified).status_code, 304)
+        # If-None-Match wins over a still-valid If-Modified-Since
+        stale = self.client.get("/api/hotels/a/", HTTP_IF_NONE_MATCH='W/"other"', HTTP_IF_MODIFIED_SINCE=modified)
+        self.assertEqual(stale.status_code, 200)
+
+        upsert_hotels([{"id": "a", "rating": 4.2}])
+        changed = self.client.get("/api/hotels/a/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], etag)
+
+    def test_list_is_validated_by_the_catalogue_version(self):
+        response = self.client.get("/api/hotels/?limit=1")
+        self.assertEqual(response["Cache-Control"], "public, max-age=30")
+        self.assertIn("Accept", response["Vary"])
+        etag = response["ETag"]
+        self.assertEqual(self.client.get("/api/hotels/?limit=1", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertNotEqual(self.client.get("/api/hotels/?limit=2")["ETag"], etag)
+        bump_catalogue_version()
+        self.assertEqual(self.client.get("/api/hotels/?limit=1", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_unseeded_random_is_not_cached(self):
+        response = self.client.get("/api/hotels/random/?count=1")
+        self.assertEqual(response["Cache-Control"], "no-store")
+        self.assertNotIn("ETag", response)
+        seeded = self.client.get("/api/hotels/random/?count=1&seed=7")
+        self.assertEqual(self.client.get("/api/hotels/random/?count=1&seed=7", HTTP_IF_NONE_MATCH=seeded["ETag"]).status_code, 304)
+
+
+@override_settings(
+    REQUEST_TIMING_LOG=False, FACET_PRICE_BUCKETS=(1000, 5000), FACET_RATING_BUCKETS=(4.0,),
+)
+class FacetTests(TestCase):
+    def setUp(self):
+        upsert_hotels([
+            hotel("a", price_per_night=800, rating=3.5, amenities=["Free Wi-Fi", "Pool"]),
+            hotel("b", price_per_night=1000, rating=4.0, amenities=["Pool"]),
+            hotel("c", city="goa", price_per_night=5000, rating=4.8, amenities=["Free Wi-Fi"]),
+            hotel("d", city="goa"),
+        ])
+        sync_hotel_labels()
+
+    def test_counts(self):
+        facets = compute_facets(Hotel.objects.all())
+        self.assertEqual(facets["total"], 4)
+        self.assertEqual(facets["city"], [{"value": "goa", "count": 2}, {"value": "kochi", "count": 2}])
+        # half-open buckets: 1000 and 5000 start the next bucket
+        self.assertEqual(
+            facets["price"],
+            {"buckets": [
+                {"min": None, "max": 1000, "count": 1},
+                {"min": 1000, "max": 5000, "count": 1},
+                {"min": 5000, "max": None, "count": 1},
+            ], "unknown": 1},
+        )
+        self.assertEqual([b["count"] for b in facets["rating"]["buckets"]], [1, 2])
+        self.assertEqual(facets["rating"]["unknown"], 1)
+        self.assertEqual(
+            facets["amenity"],
+            [{"key": "freewifi", "name": "Free Wi-Fi", "count": 2}, {"key": "pool", "name": "Pool", "count": 2}],
+        )
+
+    def test_endpoint_applies_filters(self):
+        response = self.client.get("/api/hotels/facets/?location=goa&amenities=wifi&requireAmenities=1")
+        self.assertEqual(response.status_code, 200)
+        facets = response.json()
+        self.assertEqual(facets["total"], 1)
+        self.assertEqual(facets["city"], [{"value": "goa", "count": 1}])
+        self.assertEqual(response["Cache-Control"], "public, max-age=60")
+
+
+@override_settings(REQUEST_TIMING_LOG=False)
+class SearchTests(TestCase):
+    def setUp(self):
+        upsert_hotels([
+            hotel("a", name="Marine Drive Residency", address="Fort Kochi"),
+            hotel("b", name="Backwater Retreat", tags=["Houseboat"]),
+            hotel("c", name="Kovalam Beach House", city="kovalam"),
+            hotel("d", name="Baga Sands", city="goa"),
+        ])
+
+    def matching(self, text):
+        return set(filter_location(Hotel.objects.all(), text).values_list("id", flat=True))
+
+    def test_filter_location(self):
+        self.assertEqual(self.matching("ko"), {"a", "b", "c"})
+        self.assertEqual(self.matching("kova beach"), {"c"})
+        self.assertEqual(self.matching("fort"), {"a"})
+        self.assertEqual(self.matching("houseboat"), {"b"})
+        self.assertEqual(self.matching("--"), set())
+
+    def test_index_follows_writes(self):
+        upsert_hotels([{"id": "d", "city": "kochi"}])
+        self.assertIn("d", self.matching("kochi"))
+        self.assertNotIn("d", self.matching("goa"))
+        Hotel.objects.filter(id="a").delete()
+        self.assertNotIn("a", self.matching("fort"))
+
+    def test_suggest(self):
+        self.assertEqual(
+            suggest("ko")["cities"], [{"city": "kochi", "count": 2}, {"city": "kovalam", "count": 1}]
+        )
+        self.assertEqual(suggest("baga")["hotels"], [{"id": "d", "name": "Baga Sands", "city": "goa"}])
+        self.assertEqual(suggest("  "), {"cities": [], "hotels": []})
+
+        response = self.client.get("/api/hotels/suggest/?q=kov&limit=1")
+        self.assertEqual(response["Cache-Control"], "public, max-age=300")
+        self.assertEqual(response.json()["cities"], [{"city": "kovalam", "count": 1}])
+
+
+class LabelTests(TestCase):
+    def labels(self, pk):
+        return set(HotelLabel.objects.filter(hotel_id=pk).values_list("label__kind", "label__key"))
+
+    def test_sync_rebuilds_links(self):
+        upsert_hotels([
+            hotel("a", amenities=["Free Wi-Fi", "Pool", {"bad": 1}], sdg_tags=["SDG 13"], ideal_for=["Families"]),
+            hotel("b", amenities=["WiFi"]),
+        ])
+        self.assertEqual(sync_hotel_labels(), 5)
+        self.assertEqual(self.labels("a"), {
+            (Label.AMENITY, "freewifi"), (Label.AMENITY, "pool"),
+            (Label.SDG, "13"), (Label.IDEAL_FOR, "families"),
+        })
+
+        upsert_hotels([{"id": "a", "amenities": ["Pool"], "sdg_tags": []}])
+        self.assertEqual(sync_hotel_labels(["a", "a"]), 2)
+        self.assertEqual(self.labels("a"), {(Label.AMENITY, "pool"), (Label.IDEAL_FOR, "families")})
+        self.assertEqual(self.labels("b"), {(Label.AMENITY, "wifi")})
+
+    def test_hotels_with_label(self):
+        upsert_hotels([hotel("a", amenities=["Free Wi-Fi"]), hotel("b", amenities=["WiFi"]), hotel("c")])
+        sync_hotel_labels()
+
+        def ids(*args, **kwargs):
+            return set(Hotel.objects.filter(id__in=hotels_with_label(*args, **kwargs)).values_list("id", flat=True))
+
+        self.assertEqual(ids(Label.AMENITY, "wifi"), {"b"})
+        self.assertEqual(ids(Label.AMENITY, "wifi", substring=True), {"a", "b"})
+        self.assertEqual(ids(Label.TAG, "wifi", substring=True), set())
+
+
+@override_settings(SIMILAR_HOTELS_K=5, SIMILAR_HOTELS_REBUILD_FRACTION=0.2, REQUEST_TIMING_LOG=False)
+class SimilarHotelTests(CatalogueTestCase):
+    def setUp(self):
+        super().setUp()
+        overrides = override_settings(SIMILAR_HOTELS=True)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.rng = random.Random(11)
+        self.add_hotels([make_hotel(i, self.rng, description_words=20) for i in range(120)])
+
+    def lists(self):
+        rows = SimilarHotel.objects.values_list("hotel_id", "rank", "similar_id", "score")
+        return {(pk, rank): (other, round(score, 4)) for pk, rank, other, score in rows}
+
+    def test_publish_builds_lists(self):
+        lists = self.lists()
+        self.assertEqual(len(lists), 120 * 5)
+        for pk in ("syn-0000000", "syn-0000042"):
+            scores = [lists[(pk, rank)][1] for rank in range(5)]
+            self.assertEqual(scores, sorted(scores, reverse=True))
+            self.assertNotIn(pk, [lists[(pk, rank)][0] for rank in range(5)])
+
+    def test_incremental_update_matches_full_build(self):
+        changed = [make_hotel(i, self.rng, description_words=20) for i in (3, 50, 120)]
+        with mock.patch("api.similar.build_similar_hotels") as full_build:
+            self.add_hotels(changed)
+        full_build.assert_not_called()
+        incremental = self.lists()
+        build_similar_hotels()
+        self.assertEqual(incremental, self.lists())
+
+    def test_endpoint(self):
+        response = self.client.get("/api/hotels/syn-0000007/similar/?limit=3")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Cache-Control"], "public, max-age=300")
+        expected = [self.lists()[("syn-0000007", rank)] for rank in range(3)]
+        self.assertEqual([(r["hotel"]["id"], r["score"]) for r in response.json()], expected)
+        self.assertEqual(self.client.get("/api/hotels/missing/similar/").status_code, 404)
+
+
+class EmbeddingQueueTests(CatalogueTestCase):
+    def setUp(self):
+        super().setUp()
+        upsert_hotels([hotel("a"), hotel("b"), hotel("c")])
+
+    def test_enqueue_dedups(self):
+        enqueue_embeddings(["a", "b", "a"])
+        first = EmbeddingJob.objects.get(hotel_id="a")
+        enqueue_embeddings(["a"])
+        self.assertEqual(EmbeddingJob.objects.count(), 2)
+        again = EmbeddingJob.objects.get(hotel_id="a")
+        # keeps its place in the queue, but remembers the newer change
+        self.assertEqual(again.enqueued_at, first.enqueued_at)
+        self.assertGreater(again.requested_at, first.requested_at)
+
+    def test_leases(self):
+        enqueue_embeddings(["a", "b", "c"])
+        owner, claimed, _ = claim_jobs(2)
+        self.assertEqual(len(claimed), 2)
+        _, rest, _ = claim_jobs(10)
+        self.assertEqual(set(rest), {"a", "b", "c"} - set(claimed))
+        self.assertEqual(claim_jobs(10)[1], [])
+
+        release_jobs(owner)
+        self.assertEqual(set(claim_jobs(10)[1]), set(claimed))
+        # an expired lease (crashed worker) is claimed again
+        EmbeddingJob.objects.update(leased_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(len(claim_jobs(10)[1]), 3)
+
+    def test_run_batch(self):
+        enqueue_embeddings(["a", "b", "c"])
+
+        def encode_texts(texts):
+            # "a" changes again while its batch is being encoded
+            enqueue_embeddings(["a"])
+            return embeddings.encode(texts)
+
+        hotel_ids, encoded, done, _ = run_batch(10, encode_texts)
+        self.assertEqual((sorted(hotel_ids), encoded, done), (["a", "b", "c"], 3, 2))
+        self.assertEqual(HotelEmbedding.objects.count(), 3)
+        self.assertEqual(list(EmbeddingJob.objects.values_list("hotel_id", "lease_owner")), [("a", "")])
+        self.assertEqual(queue_status()["processed"], 2)
+
+        # nothing changed since: the job completes without encoding
+        self.assertEqual(run_batch(10)[1:3], (0, 1))
+        self.assertIsNone(run_batch(10))
+
+    def test_failed_batch_is_released(self):
+        enqueue_embeddings(["a"])
+        with self.assertRaises(RuntimeError):
+            run_batch(10, mock.Mock(side_effect=RuntimeError))
+        self.assertEqual(claim_jobs(10)[1], ["a"])
+
+
+@override_settings(REQUEST_TIMING_LOG=False, ASYNC_RETRY_AFTER=3)
+class AsyncRecommendBusyTests(TestCase):
+    def setUp(self):
+        upsert_hotels([hotel("a")])
+
+    def test_executor_rejects_when_full(self):
+        executor = BoundedExecutor(max_workers=1, max_pending=1)
+        self.addCleanup(executor._pool.shutdown)
+        release = threading.Event()
+        running = executor.submit(release.wait)
+        with self.assertRaises(InferenceBusy):
+            executor.submit(release.wait)
+        release.set()
+        running.result(timeout=5)
+        self.assertTrue(executor.submit(len, "ok").result(timeout=5))
+        self.assertEqual(executor.stats()["rejected"], 1)
+
+    async def test_busy_pool_answers_429(self):
+        busy = mock.Mock()
+        busy.run = mock.AsyncMock(side_effect=InferenceBusy)
+        with mock.patch("api.async_views.get_inference_executor", return_value=busy):
+            response = await self.async_client.post(
+                "/api/async/hotels/recommend/", {"tripType": "busy-test", "amenities": []},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "3")
+        busy.run.assert_awaited()
+
+
+class ImportHotelCsvTests(CatalogueTestCase):
+    ROWS = [
+        ["Sea View", "Kochi", "4.1", "3000", "Pool, WiFi"],
+        ["Sea View", "Kochi", "3.9", "2500", ""],
+        ["", "Goa", "4.0", "1800", ""],
+        ["Hill Top", "Munnar", "4.5", "", "Spa"],
+        ["Palm Court", "Goa", "", "5200", ""],
+    ]
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp(prefix="stayfinder-test-csv-")
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, "hotels.csv")
+        with open(self.path, "w", newline="", encoding="utf-8") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(["Hotel_Name", "City", "Hotel_Rating", "Hotel_Price", "Feature_1"])
+            writer.writerows(self.ROWS)
+
+    def run_import(self, *args):
+        out = io.StringIO()
+        with mock.patch("api.catalogue.export_vector_store", wraps=export_vector_store) as export:
+            call_command("import_hotel_csv", self.path, "--workers", "1", "--batch-size", "2", *args, stdout=out)
+        return out.getvalue(), export.call_count
+
+    def test_import(self):
+        output, exports = self.run_import()
+        self.assertIn("Created: 4, Updated: 0, Skipped: 1", output)
+        self.assertEqual(
+            sorted(Hotel.objects.values_list("id", flat=True)),
+            ["hill-top-munnar", "palm-court-goa", "sea-view-kochi", "sea-view-kochi-1"],
+        )
+        first = Hotel.objects.get(id="sea-view-kochi")
+        self.assertEqual((first.price_per_night, first.rating, first.amenities), (3000, 4.1, ["Pool", "WiFi"]))
+        self.assertIsNone(Hotel.objects.get(id="hill-top-munnar").price_per_night)
+        # every batch is labelled and encoded; the store is exported once, at the end
+        self.assertEqual(exports, 1)
+        self.assertEqual(sorted(store.snapshot()[0]), sorted(Hotel.objects.values_list("id", flat=True)))
+        self.assertTrue(HotelLabel.objects.filter(hotel_id="sea-view-kochi", label__key="wifi").exists())
+
+    def test_resume_from_start_row(self):
+        output, _ = self.run_import("--start-row", "3")
+        self.assertIn("Created: 2, Updated: 0, Skipped: 0", output)
+        self.assertEqual(sorted(Hotel.objects.values_list("id", flat=True)), ["hill-top-munnar", "palm-court-goa"])
+
+    def test_dry_run_writes_nothing(self):
+        output, exports = self.run_import("--dry-run")
+        self.assertIn("Would write: 4, Skipped: 1", output)
+        self.assertFalse(Hotel.objects.exists())
+        self.assertEqual(exports, 0)
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.db import transaction
+
+from .models import Hotel
+
+ID_CHUNK_SIZE = 500  # keep `id__in` lists under SQLite's variable limit
+
+# never written by an upsert: the key itself and the insert timestamp
+_NOT_UPDATED = {"id", "created_at"}
+
+
+def upsert_hotels(items, chunk_size=None):
+    """
+    Insert or update hotels from validated dicts (each with an "id").
+
+    Existing ids are looked up with one query per chunk, then every chunk is
+    written with a single `bulk_create(update_conflicts=True)`, all inside one
+    transaction. Only the fields present in an item are overwritten on
+    update, as with `update_or_create(defaults=...)`. When an id appears more
+    than once the last item wins.
+
+    Returns `[{"id": ..., "created": bool}, ...]` in first-seen order.
+    """
+    chunk_size = chunk_size or getattr(settings, "HOTEL_UPSERT_CHUNK_SIZE", 1000)
+    by_id = {}
+    for item in items:
+        by_id[item["id"]] = item  # dict keeps first-seen order, last value
+    ids = list(by_id)
+
+    results = []
+    with transaction.atomic():
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            existing = set()
+            for sub in range(0, len(chunk), ID_CHUNK_SIZE):
+                existing.update(
+                    Hotel.objects.filter(id__in=chunk[sub:sub + ID_CHUNK_SIZE])
+                    .values_list("id", flat=True)
+                )
+
+            # rows sharing the same provided fields are upserted together
+            groups = {}
+            for pk in chunk:
+                item = by_id[pk]
+                groups.setdefault(frozenset(item) - _NOT_UPDATED, []).append(Hotel(**item))
+            for fields, objs in groups.items():
+                if fields:
+                    Hotel.objects.bulk_create(
+                        objs,
+                        update_conflicts=True,
+                        unique_fields=["id"],
+                        update_fields=sorted(fields | {"updated_at"}),
+                    )
+                else:
+                    Hotel.objects.bulk_create(objs, ignore_conflicts=True)
+
+            results.extend({"id": pk, "created": pk not in existing} for pk in chunk)
+    return results
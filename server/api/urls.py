@@ -1,10 +1,17 @@
 from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import HotelViewSet
+from . import async_views
+from .views import HotelViewSet, embedding_queue, embedding_stats, metrics
 
 router = DefaultRouter()
 # Register a viewset-like route manually because we used ViewSet not ModelViewSet
 # But DefaultRouter expects a ViewSet with basename; this will route list/create/retrieve.
 router.register(r"hotels", HotelViewSet, basename="hotel")
 
-urlpatterns = router.urls
+urlpatterns = router.urls + [
+    path("embeddings/stats/", embedding_stats, name="embedding-stats"),
+    path("embeddings/queue/", embedding_queue, name="embedding-queue"),
+    path("metrics/", metrics, name="metrics"),
+    # async (ASGI) variant of POST hotels/recommend/
+    path("async/hotels/recommend/", async_views.recommend, name="hotel-recommend-async"),
+]
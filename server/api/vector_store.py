@@ -0,0 +1,398 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .ann import ExactIndex, IVFIndex, default_nlist, top_k, train_centroids
+from .lexical import TEXT_FIELDS, LexicalIndex, hotel_text
+from .models import Hotel, HotelEmbedding
+from .quantization import STORE_DTYPES, QuantizedMatrix, quantize, store_dtype
+from .shards import ShardSet, build_shard_map, save_shard_map, shards_enabled
+
+try:
+    import fcntl
+except ImportError:  # Windows: exports are serialized within a process only
+    fcntl = None
+
+MANIFEST = "manifest.json"
+CENTROIDS = "centroids.npy"
+EXPORT_LOCK = ".export.lock"
+GENERATION_FILE_RE = re.compile(r"^(?:vectors|ids|lexical|scales|shards|ivf)-([0-9a-f]+)\.(?:npy|json|npz)$")
+
+_export_lock = threading.Lock()
+
+
+def store_dir():
+    return Path(getattr(settings, "VECTOR_STORE_DIR", settings.BASE_DIR / "vector_store"))
+
+
+def new_generation():
+    """Generation names sort by creation time (nanosecond clock, then random)."""
+    return f"{time.time_ns():016x}{uuid.uuid4().hex[:6]}"
+
+
+def _generation_order(generation):
+    # the 12-character uuid generations of older exports sort first
+    return len(generation), generation
+
+
+@contextmanager
+def export_lock(directory):
+    """Serialize exports between threads and, through a lock file, processes."""
+    with _export_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(directory / EXPORT_LOCK, "w") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def remove_old_generations(directory):
+    """Delete the files of generations older than the one manifest.json references."""
+    try:
+        with open(directory / MANIFEST, encoding="utf-8") as fh:
+            current = GENERATION_FILE_RE.match(json.load(fh)["vectors"]).group(1)
+    except (FileNotFoundError, KeyError, AttributeError, ValueError):
+        return
+    for path in directory.iterdir():
+        match = GENERATION_FILE_RE.match(path.name)
+        if match and _generation_order(match.group(1)) < _generation_order(current):
+            try:
+                path.unlink()
+            except OSError:
+                pass  # still mapped by a reader on a platform that forbids unlinking
+
+
+def export_vector_store():
+    """
+    Write every stored embedding to a fresh `vectors-<gen>.npy` / `ids-<gen>.json`
+    pair, plus the BM25 index over the same rows (`lexical-<gen>.npz`) and the
+    per-city shard map (`shards-<gen>.npz`), and atomically switch
+    `manifest.json` to it. Vectors are stored as
+    VECTOR_STORE_DTYPE (int8 adds a `scales-<gen>.npy` per-vector scale). Readers pick up the new
+    generation on their next search; older generations' files are removed
+    afterwards. Exports run one at a time (see `export_lock`). Returns the
+    number of vectors written.
+    """
+    directory = store_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    with export_lock(directory):
+        count = _export(directory)
+        remove_old_generations(directory)
+    return count
+
+
+def _export(directory):
+    generation = new_generation()
+    vectors_name = f"vectors-{generation}.npy"
+    ids_name = f"ids-{generation}.json"
+    lexical_name = f"lexical-{generation}.npz"
+    scales_name = f"scales-{generation}.npy"
+    shards_name = f"shards-{generation}.npz"
+    dtype = store_dtype()
+
+    with transaction.atomic():
+        count = HotelEmbedding.objects.count()
+        first = HotelEmbedding.objects.values_list("vector", flat=True).first()
+        dim = len(first) // 4 if first is not None else 0
+        data = np.lib.format.open_memmap(
+            directory / vectors_name, mode="w+", dtype=STORE_DTYPES[dtype], shape=(count, dim)
+        )
+        scales = np.ones(count, dtype=np.float32) if dtype == "int8" else None
+        ids = []
+        rows = HotelEmbedding.objects.order_by("hotel_id").values_list("hotel_id", "vector")
+        for row, (hotel_id, vector) in enumerate(rows.iterator(chunk_size=2000)):
+            data[row], scale = quantize(np.frombuffer(vector, dtype=np.float32), dtype)
+            if scales is not None:
+                scales[row] = scale
+            ids.append(hotel_id)
+        data.flush()
+        if scales is not None:
+            np.save(directory / scales_name, scales)
+        matrix = data if dtype == "float32" else QuantizedMatrix(data, scales)
+
+        rows_by_id = {hotel_id: row for row, hotel_id in enumerate(ids)}
+        texts = Hotel.objects.values("id", *TEXT_FIELDS).iterator(chunk_size=2000)
+        LexicalIndex.build(
+            ((rows_by_id[t["id"]], hotel_text(t)) for t in texts if t["id"] in rows_by_id),
+            len(ids),
+        ).save(directory / lexical_name)
+        save_shard_map(directory / shards_name, *build_shard_map(ids))
+
+    with open(directory / ids_name, "w", encoding="utf-8") as fh:
+        json.dump(ids, fh)
+
+    manifest = {
+        "vectors": vectors_name, "ids": ids_name, "lexical": lexical_name, "shards": shards_name,
+        "count": len(ids), "dim": dim, "dtype": dtype,
+    }
+    if scales is not None:
+        manifest["scales"] = scales_name
+    centroids_path = directory / CENTROIDS
+    if centroids_path.exists() and len(ids):
+        centroids = np.load(centroids_path)
+        if centroids.shape[1] == dim:
+            manifest["ivf"] = f"ivf-{generation}.npz"
+            IVFIndex.build(matrix, centroids).save(directory / manifest["ivf"])
+    del matrix, data
+
+    tmp = directory / f"{MANIFEST}.{generation}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh)
+    os.replace(tmp, directory / MANIFEST)
+    return len(ids)
+
+
+def train_ann_index(nlist=None, iterations=20, sample_size=100_000):
+    """
+    Train IVF centroids on the currently exported vectors, then re-export so
+    the serving store gets an index. Returns the number of lists trained.
+    """
+    snap = store.snapshot()
+    if not snap or not snap[0]:
+        export_vector_store()
+        snap = store.snapshot()
+    matrix = snap[2]
+    if not len(matrix):
+        return 0
+    centroids = train_centroids(
+        matrix, nlist or default_nlist(len(matrix)),
+        iterations=iterations, sample_size=sample_size,
+    )
+    directory = store_dir()
+    tmp = directory / f"{CENTROIDS}.tmp"
+    with open(tmp, "wb") as fh:
+        np.save(fh, centroids)
+    os.replace(tmp, directory / CENTROIDS)
+    export_vector_store()
+    return len(centroids)
+
+
+def make_ann_index(matrix, ivf_path=None):
+    """
+    Pick the search engine for a store generation according to ANN_ENGINE:
+    "exact", "ivf", or "auto" (IVF once the store holds ANN_MIN_VECTORS).
+    Without a trained IVF index this always falls back to exact search.
+    """
+    engine = getattr(settings, "ANN_ENGINE", "auto")
+    min_vectors = getattr(settings, "ANN_MIN_VECTORS", 20000)
+    nprobe = getattr(settings, "ANN_NPROBE", 8)
+    if ivf_path is not None and (engine == "ivf" or (engine == "auto" and len(matrix) >= min_vectors)):
+        return IVFIndex.load(ivf_path, matrix, nprobe=nprobe)
+    return ExactIndex(matrix)
+
+
+class VectorStore:
+    """
+    Read-only view over the exported embedding matrix. The matrix is opened
+    with `mmap_mode="r"`, so every worker process shares the same page cache
+    instead of holding its own copy.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = Path(directory) if directory else None
+        self._lock = threading.Lock()
+        self._stamp = None
+        # (ids, index, matrix, ann, lexical, shards) swapped as one tuple so
+        # readers never mix generations
+        empty = np.zeros((0, 0), dtype=np.float32)
+        self._snapshot = ([], {}, empty, ExactIndex(empty), None, None)
+
+    def _manifest_path(self):
+        return (self.directory or store_dir()) / MANIFEST
+
+    def snapshot(self):
+        """
+        Current `(ids, index, matrix, ann, lexical, shards)`, or None if
+        nothing has been exported yet. `lexical` and `shards` are None for
+        stores exported without them; `shards` also while VECTOR_SHARDS is off.
+        """
+        path = self._manifest_path()
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if stamp != self._stamp:
+            with self._lock:
+                if stamp != self._stamp:
+                    with open(path, encoding="utf-8") as fh:
+                        manifest = json.load(fh)
+                    with open(path.parent / manifest["ids"], encoding="utf-8") as fh:
+                        ids = json.load(fh)
+                    matrix = np.load(path.parent / manifest["vectors"], mmap_mode="r")
+                    if manifest.get("dtype", "float32") != "float32":
+                        scales = manifest.get("scales")
+                        scales = np.load(path.parent / scales) if scales else None
+                        matrix = QuantizedMatrix(matrix, scales)
+                    index = {hotel_id: row for row, hotel_id in enumerate(ids)}
+                    ivf = manifest.get("ivf")
+                    ann = make_ann_index(matrix, path.parent / ivf if ivf else None)
+                    lexical = manifest.get("lexical")
+                    lexical = LexicalIndex.load(path.parent / lexical) if lexical else None
+                    shards = manifest.get("shards")
+                    if shards and shards_enabled():
+                        shards = ShardSet.load(path.parent / shards, matrix, lexical)
+                    else:
+                        shards = None
+                    self._snapshot = (ids, index, matrix, ann, lexical, shards)
+                    self._stamp = stamp
+        return self._snapshot
+
+    def __len__(self):
+        snap = self.snapshot()
+        return len(snap[0]) if snap else 0
+
+    def missing(self, hotel_ids):
+        """Ids from `hotel_ids` that have no vector in the store."""
+        snap = self.snapshot()
+        index = snap[1] if snap else {}
+        return [pk for pk in hotel_ids if pk not in index]
+
+    def shard_stats(self):
+        """Shard residency and lookup counters, or None when the store is not sharded."""
+        snap = self.snapshot()
+        return snap[5].stats() if snap and snap[5] is not None else None
+
+    def _pool(self, snap, candidate_ids):
+        """
+        `candidate_ids` as a `CandidatePool`: over the resident shards that
+        hold them when the store is sharded and they span few enough
+        shards, else over the whole store.
+        """
+        ids, index, matrix, _, lexical, shards = snap
+        rows = np.fromiter((index[pk] for pk in candidate_ids if pk in index), dtype=np.intp)
+        parts = shards.parts(rows) if shards is not None and len(rows) else None
+        if parts is None:
+            return CandidatePool(ids, [(matrix, lexical, rows, rows)])
+        return CandidatePool(ids, [
+            (shard.matrix, shard.lexical, shard.local(store_rows), store_rows) for shard, store_rows in parts
+        ])
+
+    def search(self, query, limit, offset=0, candidate_ids=None):
+        """
+        Return `[(hotel_id, cosine), ...]` for ranks `offset .. offset+limit`.
+        When `candidate_ids` is given only those hotels are scored (exactly,
+        the set is already narrowed); ids that are not in the store are
+        ignored. Otherwise the configured ANN engine is used.
+        """
+        snap = self.snapshot()
+        if not snap or not snap[0]:
+            return []
+        ids, ann = snap[0], snap[3]
+        if candidate_ids is None:
+            rows, scores = ann.search(query, offset + limit)
+            return [(ids[r], float(sc)) for r, sc in zip(rows[offset:], scores[offset:])]
+        pool = self._pool(snap, candidate_ids)
+        scores = pool.dense(np.arange(len(pool)), query)
+        order = top_k(scores, offset + limit)[offset:]
+        return [(pool.id(i), float(scores[i])) for i in order]
+
+    def hybrid_search(self, query, text, limit, offset=0, candidate_ids=None,
+                      lexical_weight=0.3, shortlist=1000):
+        """
+        Two-stage ranking. BM25 over `text` shortlists up to `shortlist`
+        hotels (among `candidate_ids` when given); only those are scored
+        against the dense `query`, ranked by
+        `(1 - lexical_weight) * cosine + lexical_weight * bm25 / max_bm25`.
+        If fewer than `offset + limit` hotels match lexically, the best dense
+        matches fill the shortlist. Returns `[(hotel_id, score), ...]`.
+        """
+        snap = self.snapshot()
+        if not snap or not snap[0]:
+            return []
+        ids, _, matrix, ann, lexical, _ = snap
+        if lexical is None or lexical_weight <= 0:
+            return self.search(query, limit, offset=offset, candidate_ids=candidate_ids)
+
+        depth = offset + limit
+        if candidate_ids is None:
+            pool = CandidatePool(ids, [(matrix, lexical, None, None)])
+            lex = lexical.scores(text)
+        else:
+            pool = self._pool(snap, candidate_ids)
+            lex = pool.lexical_scores(text)
+        hits = np.flatnonzero(lex)
+        positions = hits[top_k(lex[hits], max(shortlist, depth))]
+        if len(positions) < depth:
+            if candidate_ids is None:
+                dense_positions, _ = ann.search(query, depth)
+            else:
+                dense_positions = top_k(pool.dense(np.arange(len(pool)), query), depth)
+            positions = np.concatenate((positions, dense_positions))
+        positions = np.unique(positions)  # sorted: sequential reads from the memory-mapped matrix
+
+        dense = pool.dense(positions, query)
+        lexical_part = lex[positions]
+        best = lexical_part.max() if len(positions) else 0.0
+        if best > 0:
+            lexical_part = lexical_part / best
+        combined = (1.0 - lexical_weight) * dense + lexical_weight * lexical_part
+        order = top_k(combined, depth)[offset:]
+        return [(pool.id(positions[i]), float(combined[i])) for i in order]
+
+
+class CandidatePool:
+    """
+    Hotels to score, numbered 0..n-1 across one or more parts. A part is
+    `(matrix, lexical, rows, store_rows)`: the candidates' `rows` in that
+    matrix / lexical index and their rows in the store (for the ids). The
+    whole store is the single part `(matrix, lexical, None, None)`, meaning
+    every row.
+    """
+
+    def __init__(self, ids, parts):
+        self.ids = ids
+        self.parts = parts
+        sizes = [len(p[0]) if p[2] is None else len(p[2]) for p in parts]
+        self.bounds = np.concatenate(([0], np.cumsum(sizes))).astype(np.intp)
+
+    def __len__(self):
+        return int(self.bounds[-1])
+
+    def _split(self, positions):
+        """Per part: `(index into positions, rows in the part)` of the positions it holds."""
+        part_of = np.searchsorted(self.bounds, positions, side="right") - 1
+        for i, (_, _, rows, _) in enumerate(self.parts):
+            where = np.flatnonzero(part_of == i)
+            if len(where):
+                local = positions[where] - self.bounds[i]
+                yield i, where, local if rows is None else rows[local]
+
+    def id(self, position):
+        i = int(np.searchsorted(self.bounds, position, side="right") - 1)
+        store_rows = self.parts[i][3]
+        local = position - self.bounds[i]
+        return self.ids[local if store_rows is None else store_rows[local]]
+
+    def dense(self, positions, query):
+        """Cosine of `query` with the hotels at `positions`."""
+        if len(self.parts) == 1:
+            matrix, _, rows, _ = self.parts[0]
+            return matrix[positions if rows is None else rows[positions]] @ query
+        scores = np.empty(len(positions), dtype=np.float32)
+        for i, where, rows in self._split(positions):
+            scores[where] = self.parts[i][0][rows] @ query
+        return scores
+
+    def lexical_scores(self, text):
+        """BM25 score of every hotel in the pool."""
+        return np.concatenate([
+            lexical.scores(text) if rows is None else lexical.scores(text)[rows]
+            for _, lexical, rows, _ in self.parts
+        ])
+
+
+store = VectorStore()
@@ -1,45 +1,145 @@
-import math
-import numpy as np
+import queue
+
 from rest_framework import viewsets, status
 from rest_framework.response import Response
-from rest_framework.decorators import action
-from django.db.models import Q
-
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-
-from .models import Hotel
-from .serializer import HotelSerializer
-
-from sentence_transformers import SentenceTransformer, util
+from rest_framework.decorators import action, api_view, permission_classes
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
 
-print("Loading AI Model...") 
-model = SentenceTransformer('all-MiniLM-L6-v2') 
-print("AI Model Loaded.")
+from . import ranking
+from .models import Hotel, SimilarHotel
+from .serializer import CARD_FIELDS, HotelSerializer, HotelUpsertSerializer, hotel_plan
+from .batching import get_batcher
+from .caching import recommend_cache_key, result_cache
+from .catalogue import catalogue_state, catalogue_version, hotels_changed
+from .embedding_queue import queue_status
+from .facets import compute_facets
+from .geo import near_hotels, parse_geo
+from .filters import apply_hard_filters, parse_filters
+from .instrumentation import PROMETHEUS_CONTENT_TYPE, render_metrics, stage
+from .http_cache import conditional, set_validators, weak_etag
+from .pagination import InvalidCursor, keyset_page
+from .permissions import OperationsAccess, operations_allowed
+from .sampling import hotel_id_pool
+from .search import filter_location, suggest
+from .upsert import upsert_hotels
+from .vector_store import store
 
 def clamp(n, minn, maxn):
     return max(minn, min(maxn, n))
 
 class HotelViewSet(viewsets.ViewSet):
     """
-        - GET /api/hotels/        -> list all hotels
+        - GET /api/hotels/        -> list hotels (keyset-paginated, ?cursor=&limit=&fields=&view=card;
+                                     ?near=lat,lng&radius=&nearest= for closest first)
         - POST /api/hotels/       -> bulk insert/upsert an array of hotel objects
         - GET /api/hotels/{id}/   -> retrieve single hotel (optional implemented)
-        - POST /api/hotels/recommend/ -> get recommendations
+        - POST /api/hotels/recommend/ -> get recommendations (?limit=&offset=; `near` / `radius` / `nearest` in the body)
+        - GET /api/hotels/suggest/?q= -> city / hotel autocomplete
+        - GET /api/hotels/facets/ -> filter-sidebar counts (city, price, rating, amenity)
+        - GET /api/hotels/{id}/similar/ -> precomputed related stays
     """
 
     def list(self, request):
-        qs = Hotel.objects.all().order_by("-created_at")
-        serializer = HotelSerializer(qs, many=True)
-        return Response(serializer.data)
+        """
+        GET /api/hotels/?limit=50&cursor=<next>&fields=id,name&view=card
+        Newest first, keyset-paginated. With `near=lat,lng` (and `radius` km
+        and / or `nearest` k) only hotels around that point are listed,
+        closest first, paged with `offset`, each with its `distance_km`. The body stays a plain array; the
+        next page is advertised in `X-Next-Cursor` and a `Link` header.
+        `view=card` returns the compact listing representation, `fields=`
+        any subset of hotel fields (only those columns are loaded).
+        Pages are validated by the catalogue version (ETag / Last-Modified).
+        """
+        params = request.query_params
+        version, modified = catalogue_state()
+        etag = weak_etag("list", version, request.get_full_path(), request.accepted_renderer.format)
+        cached = conditional(request, "list", etag, modified)
+        if cached is not None:
+            return cached
 
-    def retrieve(self, request, pk=None):
+        default = getattr(settings, "HOTEL_LIST_PAGE_SIZE", 50)
+        try:
+            limit = clamp(int(params.get("limit", default)), 1, getattr(settings, "HOTEL_LIST_MAX_PAGE_SIZE", 500))
+        except (TypeError, ValueError):
+            limit = default
+
+        fields = None
+        if params.get("view") == "card":
+            fields = list(CARD_FIELDS)
+        if params.get("fields"):
+            fields = [f.strip() for f in params["fields"].split(",") if f.strip()]
+            unknown = set(fields) - set(HotelSerializer().fields)
+            if unknown:
+                return Response(
+                    {"detail": f"Unknown fields: {', '.join(sorted(unknown))}"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        try:
+            geo = parse_geo(params)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        plan = hotel_plan(fields)
+        if geo is not None:
+            response = self._near_page(request, plan, geo, limit)
+            return set_validators(response, "list", etag, modified)
+        qs = Hotel.objects.values(*dict.fromkeys(plan.columns + ("id", "created_at")))
+        try:
+            with stage("list.fetch"):
+                rows, next_cursor = keyset_page(qs, params.get("cursor"), limit)
+        except InvalidCursor:
+            return Response({"detail": "Invalid cursor."}, status=status.HTTP_400_BAD_REQUEST)
+
+        with stage("list.serialize"):
+            response = Response(plan.serialize_many(rows))
+        if next_cursor:
+            query = params.copy()
+            query["cursor"] = next_cursor
+            response["X-Next-Cursor"] = next_cursor
+            response["Link"] = f'<{request.build_absolute_uri(request.path)}?{query.urlencode()}>; rel="next"'
+        return set_validators(response, "list", etag, modified)
+
+    def _near_page(self, request, plan, geo, limit):
+        """One page of `list` around a point: closest first, `offset`-paged."""
         try:
-            obj = Hotel.objects.get(pk=pk)
-        except Hotel.DoesNotExist:
+            offset = max(0, int(request.query_params.get("offset", 0)))
+        except (TypeError, ValueError):
+            offset = 0
+        with stage("list.geo"):
+            hits = near_hotels(geo)
+        page = hits[offset:offset + limit]
+        with stage("list.fetch"):
+            qs = Hotel.objects.filter(id__in=[pk for pk, _ in page]).values(*dict.fromkeys(plan.columns + ("id",)))
+            rows = {row["id"]: row for row in qs}
+        with stage("list.serialize"):
+            page = [(pk, km) for pk, km in page if pk in rows]
+            hotels = plan.serialize_many([rows[pk] for pk, _ in page])
+            for hotel, (_, km) in zip(hotels, page):
+                hotel["distance_km"] = round(km, 3)
+            response = Response(hotels)
+        if offset + limit < len(hits):
+            query = request.query_params.copy()
+            query["offset"] = str(offset + limit)
+            response["Link"] = f'<{request.build_absolute_uri(request.path)}?{query.urlencode()}>; rel="next"'
+        return response
+
+    def retrieve(self, request, pk=None):
+        # validate against updated_at before loading the full row
+        modified = Hotel.objects.filter(pk=pk).values_list("updated_at", flat=True).first()
+        if modified is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        etag = weak_etag("hotel", pk, modified.isoformat(), request.accepted_renderer.format)
+        cached = conditional(request, "retrieve", etag, modified)
+        if cached is not None:
+            return cached
+        plan = hotel_plan()
+        row = Hotel.objects.filter(pk=pk).values(*plan.columns).first()
+        if row is None:
             return Response(status=status.HTTP_404_NOT_FOUND)
-        serializer = HotelSerializer(obj)
-        return Response(serializer.data)
+        return set_validators(Response(plan.serialize(row)), "retrieve", etag, row["updated_at"])
 
     def create(self, request):
         if not isinstance(request.data, list):
@@ -47,92 +147,134 @@ class HotelViewSet(viewsets.ViewSet):
                 {"detail": "Expected a list of hotel objects."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        serializer = HotelSerializer(data=request.data, many=True)
-        serializer.is_valid(raise_exception=True)
-        results = []
-        for item in serializer.validated_data:
-            pk = item.get("id")
-            defaults = {k: v for k, v in item.items() if k != "id"}
-            obj, created = Hotel.objects.update_or_create(id=pk, defaults=defaults)
-            results.append({"id": obj.id, "created": created})
+        serializer = HotelUpsertSerializer(data=request.data, many=True)
+        with stage("create.validate"):
+            serializer.is_valid(raise_exception=True)
+        with stage("create.upsert"):
+            results = upsert_hotels(serializer.validated_data)
+        hotels_changed([r["id"] for r in results])
         return Response(results, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['post'])
     def recommend(self, request):
-        data = request.data
-        
-        trip_type = data.get('tripType', '')
-        min_budget = int(data.get('minBudget', 0))
-        max_budget = int(data.get('maxBudget', 50000))
-        user_amenities = data.get('amenities', [])
-        location_pref = data.get('locationPref', '').strip().lower()
-        sdg_pref = data.get('sdg', '')
-
-        hotels = Hotel.objects.all()
-
-        if location_pref:
-            hotels = hotels.filter(
-                Q(city__icontains=location_pref) | 
-                Q(name__icontains=location_pref)
-            )
+        try:
+            req = ranking.parse_request(request.data)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        limit, offset = self._page_params(request)
+
+        with stage("recommend.cache"):
+            cache_key = ranking.cache_key(req, limit, offset, catalogue_version())
+            ranked = result_cache().get(cache_key)
+        if ranked is None:
+            try:
+                ranked = ranking.rank(req, limit, offset)
+            except queue.Full:
+                # EMBEDDING_MAX_QUEUE reached: refuse like the async view instead of a 500
+                response = Response(
+                    {"detail": "Recommendation service is busy, retry shortly."},
+                    status=status.HTTP_429_TOO_MANY_REQUESTS,
+                )
+                response["Retry-After"] = str(getattr(settings, "ASYNC_RETRY_AFTER", 1))
+                return response
+            result_cache().set(cache_key, ranked)
 
-        if not hotels.exists():
-            return Response([])
-
-        
-        hotels = list(hotels)
-        if not hotels:
-            return Response([])
-
-
-        user_prompt = f"I want a {trip_type} trip. "
-        user_prompt += f"Amenities: {' '.join(user_amenities)}. "
-        if sdg_pref:
-            user_prompt += f"I care about SDG {sdg_pref}. "
-        
-        hotel_descriptions = []
-        for h in hotels:
-            desc = f"{h.name} is a {h.city} hotel. {h.description}. "
-            desc += f"It has {' '.join(h.amenities)}. "
-            desc += f"Good for {' '.join(h.ideal_for)}."
-            hotel_descriptions.append(desc)
-
-        query_embedding = model.encode(user_prompt, convert_to_tensor=True)
-        hotel_embeddings = model.encode(hotel_descriptions, convert_to_tensor=True)
-
-        cosine_scores = util.cos_sim(query_embedding, hotel_embeddings)[0]
-
-        scored_results = []
-
-        for idx, hotel in enumerate(hotels):
-            ai_score_raw = float(cosine_scores[idx])
-            ai_score = ai_score_raw * 50
-            
-            reasons = []
-            rule_score = 0
-            
-            if ai_score_raw > 0.45:
-                reasons.append("AI Confidence: High semantic match with your preferences.")
-            elif ai_score_raw > 0.25:
-                reasons.append("AI Confidence: Moderate match.")
-
-            final_score = round(ai_score + rule_score)
-
-            scored_results.append({
-                "hotel": HotelSerializer(hotel).data,
-                "score": final_score,
-                "reasonParts": reasons,
-                "reasonText": " ".join(reasons)
-            })
-
-        scored_results.sort(key=lambda x: x['score'], reverse=True)
-        return Response(scored_results)
+        # fetch and serialize only the winners
+        plan = hotel_plan()
+        with stage("recommend.fetch"):
+            by_id = {row["id"]: row for row in ranking.winners_queryset(ranked, plan)}
+        return Response(ranking.build_results(ranked, by_id, plan))
+
+    def _page_params(self, request):
+        """
+        `limit` / `offset` from the query string or the POST body.
+        """
+        data = request.data if isinstance(request.data, dict) else {}
+        return ranking.page_params(request.query_params, data)
     
+    @action(detail=False, methods=["get"])
+    def suggest(self, request):
+        """
+        GET /api/hotels/suggest/?q=ko&limit=8
+        City and hotel-name autocomplete answered from the search index.
+        """
+        try:
+            limit = clamp(int(request.query_params.get("limit", 8)), 1, 50)
+        except (TypeError, ValueError):
+            limit = 8
+        response = Response(suggest(request.query_params.get("q", ""), limit=limit))
+        return set_validators(response, "suggest")
+
+    @action(detail=False, methods=["get"])
+    def facets(self, request):
+        """
+        GET /api/hotels/facets/?location=goa&maxBudget=5000&amenities=wifi,pool&requireAmenities=1
+        Counts per city, price bucket, rating bucket and amenity over the
+        hotels matching the same hard filters as `recommend`. The weak ETag
+        changes with the catalogue version, so revalidation costs one query.
+        """
+        params = request.query_params
+        data = {key: params.get(key) for key in params}
+        data["amenities"] = [a for value in params.getlist("amenities") for a in value.split(",")]
+        filters = parse_filters(data)
+        location = params.get("location", "").strip().lower()
+
+        version, modified = catalogue_state()
+        cache_key = "facets|" + recommend_cache_key({"location": location, **filters}, 0, 0, version)
+        etag = weak_etag(cache_key, request.accepted_renderer.format)
+        cached = conditional(request, "facets", etag, modified)
+        if cached is not None:
+            return cached
+
+        facets = result_cache().get(cache_key)
+        if facets is None:
+            hotels = Hotel.objects.all()
+            if location:
+                hotels = filter_location(hotels, location)
+            hotels, _ = apply_hard_filters(hotels, filters)
+            facets = compute_facets(hotels)
+            result_cache().set(cache_key, facets)
+        return set_validators(Response(facets), "facets", etag, modified)
+
+    @action(detail=True, methods=["get"])
+    def similar(self, request, pk=None):
+        """
+        GET /api/hotels/{id}/similar/?limit=6
+        The hotel's precomputed neighbours (api.similar), closest first, as
+        `[{"hotel": <card>, "score": s}]`. Empty until the lists are built.
+        """
+        k = getattr(settings, "SIMILAR_HOTELS_K", 10)
+        try:
+            limit = clamp(int(request.query_params.get("limit", k)), 1, k)
+        except (TypeError, ValueError):
+            limit = k
+        version, modified = catalogue_state()
+        etag = weak_etag("similar", version, pk, limit, request.accepted_renderer.format)
+        cached = conditional(request, "similar", etag, modified)
+        if cached is not None:
+            return cached
+
+        neighbours = list(
+            SimilarHotel.objects.filter(hotel_id=pk, rank__lt=limit)
+            .order_by("rank").values_list("similar_id", "score")
+        )
+        if not neighbours and not Hotel.objects.filter(pk=pk).exists():
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        plan = hotel_plan(CARD_FIELDS)
+        rows = {row["id"]: row for row in Hotel.objects.filter(id__in=[i for i, _ in neighbours]).values(*plan.columns)}
+        results = [
+            {"hotel": plan.serialize(rows[i]), "score": round(score, 4)}
+            for i, score in neighbours if i in rows
+        ]
+        return set_validators(Response(results), "similar", etag, modified)
+
     @action(detail=False, methods=["get"], url_path="random")
     def random(self, request):
         """
-        GET /api/hotels/random/?count=3
-        Returns `count` random hotels (default 3, max 50).
+        GET /api/hotels/random/?count=3&seed=42
+        Returns `count` random hotels (default 3, max 50). Passing `seed`
+        makes the pick reproducible while the catalogue is unchanged, and
+        only then is the response cacheable.
         """
         try:
             count = int(request.query_params.get("count", 3))
@@ -142,7 +284,54 @@ class HotelViewSet(viewsets.ViewSet):
             count = 1
         if count > 50:
             count = 50
+        seed = request.query_params.get("seed") or None
+
+        if seed is None:
+            hotels = hotel_id_pool().sample(count)
+            response = Response([hotel_plan().serialize_instance(h) for h in hotels])
+            response["Cache-Control"] = "no-store"
+            return response
+
+        version, modified = catalogue_state()
+        etag = weak_etag("random", version, count, seed, request.accepted_renderer.format)
+        cached = conditional(request, "random", etag, modified)
+        if cached is not None:
+            return cached
+        hotels = hotel_id_pool().sample(count, seed=seed)
+        response = Response([hotel_plan().serialize_instance(h) for h in hotels])
+        return set_validators(response, "random", etag, modified)
+
+
+@api_view(["GET"])
+@permission_classes([OperationsAccess])
+def embedding_stats(request):
+    """
+    GET /api/embeddings/stats/
+    Queue depth, batch-size histogram and inference timings of this
+    process's query batcher, and its vector-store shard cache (`shards`,
+    null when the store is not sharded).
+    """
+    return Response({**get_batcher().stats(), "shards": store.shard_stats()})
 
-        qs = Hotel.objects.order_by("?")[:count]
-        serializer = HotelSerializer(qs, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+
+@api_view(["GET"])
+@permission_classes([OperationsAccess])
+def embedding_queue(request):
+    """
+    GET /api/embeddings/queue/
+    Re-embedding backlog: pending and leased jobs, age of the oldest one
+    (lag) and the workers' recent throughput.
+    """
+    return Response(queue_status())
+
+
+@require_GET
+def metrics(request):
+    """
+    GET /api/metrics/
+    Request and per-stage latency histograms of this process, in the
+    Prometheus text format.
+    """
+    if not operations_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
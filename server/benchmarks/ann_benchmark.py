@@ -0,0 +1,82 @@
+"""
+Compare exact (brute-force) search with the IVF index: recall@k and latency.
+
+    python benchmarks/ann_benchmark.py --n 200000 --nprobe 4 8 16 32
+    python benchmarks/ann_benchmark.py --vectors vector_store/vectors-<gen>.npy
+
+Runs from the `server/` directory; only needs NumPy.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.ann import ExactIndex, IVFIndex, default_nlist, train_centroids  # noqa: E402
+
+
+def synthetic_vectors(n, dim, clusters, seed):
+    """Clustered, L2-normalised vectors (closer to real embeddings than uniform noise)."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def timed_search(index, queries, k, **kwargs):
+    latencies = []
+    results = []
+    for q in queries:
+        start = time.perf_counter()
+        rows, _ = index.search(q, k, **kwargs)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(rows)
+    return results, np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", help="Existing .npy matrix (e.g. an exported vector store)")
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.vectors:
+        matrix = np.load(args.vectors, mmap_mode="r")
+    else:
+        matrix = synthetic_vectors(args.n, args.dim, args.clusters, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    # queries: perturbed catalogue vectors, so true neighbours exist
+    queries = np.asarray(matrix[rng.integers(0, len(matrix), args.queries)], dtype=np.float32)
+    queries = queries + 0.3 * rng.standard_normal(queries.shape).astype(np.float32) / np.sqrt(queries.shape[1])
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    nlist = args.nlist or default_nlist(len(matrix))
+    start = time.perf_counter()
+    centroids = train_centroids(matrix, nlist, seed=args.seed)
+    ivf = IVFIndex.build(matrix, centroids)
+    build_s = time.perf_counter() - start
+    print(f"N={len(matrix)} dim={matrix.shape[1]} k={args.k} nlist={len(centroids)} build={build_s:.1f}s")
+
+    truth, exact_ms = timed_search(ExactIndex(matrix), queries, args.k)
+    print(f"{'engine':<14}{'recall@k':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    print(f"{'exact':<14}{1.0:>10.3f}{np.percentile(exact_ms, 50):>10.2f}{np.percentile(exact_ms, 99):>10.2f}")
+    for nprobe in args.nprobe:
+        found, ms = timed_search(ivf, queries, args.k, nprobe=nprobe)
+        recall = np.mean([len(np.intersect1d(t, f)) / len(t) for t, f in zip(truth, found)])
+        label = f"ivf/nprobe={nprobe}"
+        print(f"{label:<14}{recall:>10.3f}{np.percentile(ms, 50):>10.2f}{np.percentile(ms, 99):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
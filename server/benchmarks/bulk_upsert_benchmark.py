@@ -0,0 +1,72 @@
+"""
+Rows/second of hotel upserts: the bulk path behind POST /api/hotels/ vs the
+previous per-row update_or_create loop, on a fresh SQLite database.
+
+    python benchmarks/bulk_upsert_benchmark.py --sizes 1000 10000 100000
+    python benchmarks/bulk_upsert_benchmark.py --via-api --sizes 1000
+
+Each size is written twice: once as inserts, once as updates of the same ids.
+--via-api posts through the endpoint (validation + re-embedding included,
+so the embedding model must be available).
+"""
+import argparse
+import time
+
+from django_setup import setup
+from synthetic import make_hotels
+
+
+def per_row(items):
+    from api.models import Hotel
+
+    for item in items:
+        defaults = {k: v for k, v in item.items() if k != "id"}
+        Hotel.objects.update_or_create(id=item["id"], defaults=defaults)
+
+
+def bulk(items, chunk_size):
+    from api.upsert import upsert_hotels
+
+    upsert_hotels(items, chunk_size=chunk_size)
+
+
+def via_api(items):
+    from rest_framework.test import APIClient
+
+    response = APIClient().post("/api/hotels/", items, format="json")
+    assert response.status_code == 200, response.content[:500]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--skip-per-row", action="store_true", help="Skip the slow baseline")
+    parser.add_argument("--via-api", action="store_true")
+    args = parser.parse_args()
+
+    setup()
+    from api.models import Hotel
+
+    methods = []
+    if not args.skip_per_row:
+        methods.append(("update_or_create", per_row))
+    methods.append(("bulk_create", lambda items: bulk(items, args.chunk_size)))
+    if args.via_api:
+        methods.append(("POST /api/hotels/", via_api))
+
+    print(f"{'method':<20}{'rows':>9}{'insert rows/s':>16}{'update rows/s':>16}")
+    for n in args.sizes:
+        items = make_hotels(n, seed=n)
+        for label, method in methods:
+            Hotel.objects.all().delete()
+            rates = []
+            for _ in ("insert", "update"):
+                start = time.perf_counter()
+                method(items)
+                rates.append(n / (time.perf_counter() - start))
+            print(f"{label:<20}{n:>9}{rates[0]:>16.0f}{rates[1]:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+Bootstrap Django for benchmark scripts against a throwaway SQLite database.
+"""
+import os
+import sys
+import tempfile
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup(db_path=None):
+    """Configure settings to use `db_path` (a temp file by default), then migrate."""
+    sys.path.insert(0, SERVER_DIR)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    from django.conf import settings
+
+    workdir = tempfile.mkdtemp(prefix="stayfinder-bench-")
+    settings.DATABASES["default"]["NAME"] = db_path or os.path.join(workdir, "bench.sqlite3")
+    settings.VECTOR_STORE_DIR = os.path.join(workdir, "vector_store")
+    settings.ALLOWED_HOSTS = ["*"]
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", verbosity=0)
+    return workdir
@@ -0,0 +1,174 @@
+"""
+Embedding backends on the hotel catalogue: load time, encode latency,
+peak RSS and ranking agreement with the plain torch model.
+
+    python benchmarks/embedding_backend_benchmark.py --backends torch torch-int8 onnx
+
+Each backend runs in its own process (so RSS is its own). Documents are the
+hotels of hotel_data.csv, embedded as `hotel_document` does; queries look
+like recommend prompts. Agreement is the mean top-10 overlap of each query's
+ranking against the first backend's. The same is reported for storing the
+first backend's vectors as float16 / int8 (VECTOR_STORE_DTYPE).
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+TRIP_TYPES = ["family", "business", "couples", "solo", "adventure", "relaxation"]
+AMENITY_SETS = [["Pool"], ["Spa", "Pool"], ["Free Wi-Fi"], ["Bar", "Restaurant"], ["Gym"], ["Parking", "Breakfast"]]
+
+
+def catalogue_documents(path, limit):
+    import csv
+    from api.embeddings import hotel_document
+    from api.management.commands.import_hotel_csv import normalize_row
+
+    docs = []
+    with open(path, newline="", encoding="utf-8") as fh:
+        for row in csv.DictReader(fh):
+            normalized = normalize_row(row)
+            if normalized is None:
+                continue
+            docs.append(hotel_document(SimpleNamespace(**normalized[2])))
+            if limit and len(docs) >= limit:
+                break
+    return docs
+
+
+def queries():
+    return [
+        f"I want a {trip} trip. Amenities: {' '.join(amenities)}. "
+        for trip in TRIP_TYPES for amenities in AMENITY_SETS
+    ]
+
+
+def run_worker(args):
+    """Encode everything with one backend and report timings as JSON."""
+    from api.providers import SentenceTransformerProvider
+
+    provider = SentenceTransformerProvider(args.model, backend=args.worker, onnx_file=args.onnx_file)
+    start = time.perf_counter()
+    provider.warm_up()
+    load_s = time.perf_counter() - start
+
+    docs = catalogue_documents(args.csv, args.limit)
+    start = time.perf_counter()
+    doc_vectors = provider.encode(docs)
+    batch_s = time.perf_counter() - start
+
+    latencies = []
+    query_vectors = []
+    for _ in range(args.repeat):
+        for text in queries():
+            start = time.perf_counter()
+            query_vectors.append(provider.encode([text])[0])
+            latencies.append((time.perf_counter() - start) * 1000)
+    query_vectors = np.vstack(query_vectors[:len(queries())])
+
+    np.savez(args.out, docs=doc_vectors, queries=query_vectors)
+    print(json.dumps({
+        "backend": args.worker,
+        "load_s": load_s,
+        "docs": len(docs),
+        "docs_per_s": len(docs) / batch_s,
+        "query_p50_ms": statistics.median(latencies),
+        "query_p95_ms": float(np.percentile(latencies, 95)),
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def top10(docs, query_vectors):
+    return [set(np.argsort(-(docs @ q), kind="stable")[:10]) for q in query_vectors]
+
+
+def overlap(reference, found):
+    return float(np.mean([len(r & f) / 10 for r, f in zip(reference, found)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "torch-int8", "onnx"])
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--onnx-file", default=None, help="e.g. onnx/model_qint8_avx512.onnx")
+    parser.add_argument("--csv", default=os.path.join(SERVER_DIR, "hotel_data.csv"))
+    parser.add_argument("--limit", type=int, default=0, help="use only the first N hotels")
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the query set")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # settings only; nothing here touches the database
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django
+    django.setup()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    from api.quantization import QuantizedMatrix, quantize
+
+    workdir = tempfile.mkdtemp(prefix="stayfinder-backends-")
+    results, reference = [], None
+    for backend in args.backends:
+        out = os.path.join(workdir, f"{backend}.npz")
+        cmd = [sys.executable, __file__, "--worker", backend, "--out", out, "--model", args.model,
+               "--csv", args.csv, "--limit", str(args.limit), "--repeat", str(args.repeat)]
+        if args.onnx_file:
+            cmd += ["--onnx-file", args.onnx_file]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            error = (proc.stderr.strip().splitlines() or ["failed"])[-1]
+            results.append({"backend": backend, "error": error})
+            continue
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        vectors = np.load(out)
+        if reference is None:
+            reference = (vectors["docs"], vectors["queries"], top10(vectors["docs"], vectors["queries"]))
+        result["top10_overlap"] = overlap(reference[2], top10(vectors["docs"], vectors["queries"]))
+        results.append(result)
+
+    stored = []
+    if reference is not None:
+        docs, query_vectors, expected = reference
+        for dtype in ("float32", "float16", "int8"):
+            data, scales = quantize(docs, dtype)
+            matrix = QuantizedMatrix(data, scales)
+            size = data.nbytes + (scales.nbytes if scales is not None else 0)
+            stored.append({
+                "dtype": dtype,
+                "matrix_mb": size / 2**20,
+                "top10_overlap": overlap(expected, top10(matrix, query_vectors)),
+            })
+
+    if args.json:
+        print(json.dumps({"backends": results, "stored_vectors": stored}, indent=2))
+        return
+    print(f"{'backend':<12}{'load s':>8}{'docs/s':>9}{'q p50 ms':>10}{'q p95 ms':>10}{'RSS MB':>9}{'top10':>8}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['backend']:<12}  unavailable: {r['error']}")
+            continue
+        print(f"{r['backend']:<12}{r['load_s']:>8.1f}{r['docs_per_s']:>9.0f}{r['query_p50_ms']:>10.2f}"
+              f"{r['query_p95_ms']:>10.2f}{r['max_rss_mb']:>9.0f}{r['top10_overlap']:>8.3f}")
+    if stored:
+        print(f"\n{'stored as':<12}{'matrix MB':>10}{'top10':>8}")
+        for s in stored:
+            print(f"{s['dtype']:<12}{s['matrix_mb']:>10.2f}{s['top10_overlap']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Dense-only vs hybrid (BM25 shortlist + dense re-score) ranking: latency and
+how many vectors each query scores densely.
+
+    python benchmarks/hybrid_benchmark.py --n 200000 --shortlist 1000
+
+Hotel texts come from benchmarks/synthetic.py; vectors are clustered random
+vectors, so this measures cost, not relevance.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from ann_benchmark import synthetic_vectors
+from django_setup import setup
+from synthetic import AMENITIES, IDEAL_FOR, make_hotels
+
+
+def write_store(directory, hotels, matrix):
+    from api.lexical import LexicalIndex, hotel_text
+
+    ids = [h["id"] for h in hotels]
+    np.save(os.path.join(directory, "vectors-b.npy"), matrix)
+    with open(os.path.join(directory, "ids-b.json"), "w", encoding="utf-8") as fh:
+        json.dump(ids, fh)
+    rows = ({"tags": [], "ideal_for": [], "description": "", **h} for h in hotels)
+    LexicalIndex.build(((i, hotel_text(row)) for i, row in enumerate(rows)), len(ids)).save(
+        os.path.join(directory, "lexical-b.npz")
+    )
+    manifest = {"vectors": "vectors-b.npy", "ids": "ids-b.json", "lexical": "lexical-b.npz",
+                "count": len(ids), "dim": matrix.shape[1]}
+    with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--depth", type=int, default=200)
+    parser.add_argument("--shortlist", type=int, default=1000)
+    parser.add_argument("--lexical-weight", type=float, default=0.3)
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from api.vector_store import VectorStore
+
+    settings.ANN_ENGINE = "exact"
+    hotels = make_hotels(args.n, description_words=20)
+    matrix = synthetic_vectors(args.n, args.dim, 200, 0)
+    directory = tempfile.mkdtemp(prefix="stayfinder-hybrid-")
+    start = time.perf_counter()
+    write_store(directory, hotels, matrix)
+    print(f"N={args.n} index build+save {time.perf_counter() - start:.1f}s")
+
+    store = VectorStore(directory)
+    store.snapshot()
+    rng = np.random.default_rng(1)
+    queries = synthetic_vectors(args.queries, args.dim, 200, 2)
+    texts = [
+        f"{IDEAL_FOR[i % len(IDEAL_FOR)]} {AMENITIES[rng.integers(len(AMENITIES))]} "
+        f"{AMENITIES[rng.integers(len(AMENITIES))]}"
+        for i in range(args.queries)
+    ]
+    lexical = store.snapshot()[4]
+
+    dense_ms, hybrid_ms, shortlisted = [], [], []
+    for q, text in zip(queries, texts):
+        t0 = time.perf_counter()
+        store.search(q, args.depth)
+        t1 = time.perf_counter()
+        store.hybrid_search(q, text, args.depth, lexical_weight=args.lexical_weight, shortlist=args.shortlist)
+        t2 = time.perf_counter()
+        dense_ms.append((t1 - t0) * 1000)
+        hybrid_ms.append((t2 - t1) * 1000)
+        shortlisted.append(min(args.shortlist, int(np.count_nonzero(lexical.scores(text)))))
+
+    print(f"{'ranker':<10}{'p50 ms':>10}{'p95 ms':>10}{'dense rows/query':>18}")
+    print(f"{'dense':<10}{np.percentile(dense_ms, 50):>10.2f}{np.percentile(dense_ms, 95):>10.2f}{args.n:>18}")
+    print(f"{'hybrid':<10}{np.percentile(hybrid_ms, 50):>10.2f}{np.percentile(hybrid_ms, 95):>10.2f}"
+          f"{int(np.mean(shortlisted)):>18}")
+
+
+if __name__ == "__main__":
+    main()
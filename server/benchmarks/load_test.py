@@ -0,0 +1,190 @@
+"""
+Requests/sec of POST recommend under WSGI vs ASGI.
+
+    python benchmarks/load_test.py --concurrency 32 --duration 20
+
+Starts each server on a local port against the configured database (import
+some hotels first), drives it with `--concurrency` keep-alive clients for
+`--duration` seconds and prints throughput, latency percentiles and status
+counts. Targets:
+
+    wsgi        gunicorn config.wsgi, sync /api/hotels/recommend/
+    asgi-sync   uvicorn config.asgi, the same sync DRF view
+    asgi        uvicorn config.asgi, async /api/async/hotels/recommend/
+
+Every request uses a distinct prompt, so neither the result nor the query
+embedding cache can answer it. Use --url NAME=URL to load an already
+running server instead of starting one.
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SYNC_PATH = "/api/hotels/recommend/"
+ASYNC_PATH = "/api/async/hotels/recommend/"
+TRIP_TYPES = ["family", "business", "couples", "solo", "adventure", "relaxation"]
+AMENITIES = ["Pool", "Spa", "Free Wi-Fi", "Free breakfast", "Bar", "Parking"]
+
+
+def server_command(target, port, workers, threads):
+    if target == "wsgi":
+        return [
+            sys.executable, "-m", "gunicorn", "config.wsgi:application",
+            "--bind", f"127.0.0.1:{port}", "--workers", str(workers),
+            "--threads", str(threads), "--log-level", "warning",
+        ]
+    return [
+        sys.executable, "-m", "uvicorn", "config.asgi:application",
+        "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers),
+        "--log-level", "warning",
+    ]
+
+
+def wait_ready(base_url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/api/hotels/?limit=1", timeout=2):
+                return
+        except OSError:
+            time.sleep(0.3)
+    raise RuntimeError(f"server at {base_url} did not come up in {timeout}s")
+
+
+def request_body(n):
+    return json.dumps({
+        "tripType": f"{TRIP_TYPES[n % len(TRIP_TYPES)]} trip {n}",
+        "amenities": [AMENITIES[n % len(AMENITIES)], AMENITIES[(n // 7) % len(AMENITIES)]],
+    })
+
+
+def drive(url, concurrency, duration, warmup):
+    """Run the clients against `url`; returns latencies (ms) and status counts."""
+    parsed = urllib.parse.urlsplit(url)
+    path = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+    counter = iter(range(10**12))
+    lock = threading.Lock()
+    latencies = []
+    statuses = {}
+    start = time.monotonic()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+
+    def client():
+        conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=60)
+        local_latencies, local_statuses = [], {}
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                break
+            with lock:
+                n = next(counter)
+            sent = time.perf_counter()
+            try:
+                conn.request("POST", path, body=request_body(n), headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=60)
+                status = "error"
+            if now >= measure_from:
+                local_latencies.append((time.perf_counter() - sent) * 1000)
+                local_statuses[status] = local_statuses.get(status, 0) + 1
+        conn.close()
+        with lock:
+            latencies.extend(local_latencies)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, statuses
+
+
+def summarize(name, latencies, statuses, duration):
+    ok = statuses.get(200, 0)
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {
+        "target": name,
+        "requests": len(latencies),
+        "ok_per_second": ok / duration,
+        "requests_per_second": len(latencies) / duration,
+        "p50_ms": quantiles[49],
+        "p95_ms": quantiles[94],
+        "p99_ms": quantiles[98],
+        "statuses": {str(k): v for k, v in sorted(statuses.items(), key=str)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", default=["wsgi", "asgi-sync", "asgi"],
+                        choices=["wsgi", "asgi-sync", "asgi"])
+    parser.add_argument("--url", action="append", default=[], metavar="NAME=URL",
+                        help="load a running server instead, e.g. asgi=http://127.0.0.1:8000/api/async/hotels/recommend/")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--workers", type=int, default=1, help="server processes")
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn threads per worker")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    runs = [tuple(item.split("=", 1)) for item in args.url]
+    if not runs:
+        runs = [(target, None) for target in args.targets]
+
+    results = []
+    for name, url in runs:
+        server = None
+        if url is None:
+            port = args.port
+            env = dict(os.environ)
+            env.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+            server = subprocess.Popen(
+                server_command("wsgi" if name == "wsgi" else "asgi", port, args.workers, args.threads),
+                cwd=SERVER_DIR, env=env,
+            )
+            base = f"http://127.0.0.1:{port}"
+            url = base + (ASYNC_PATH if name == "asgi" else SYNC_PATH)
+        try:
+            if server is not None:
+                wait_ready(base, args.startup_timeout)
+            latencies, statuses = drive(url, args.concurrency, args.duration, args.warmup)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=30)
+        results.append(summarize(name, latencies, statuses, args.duration))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"concurrency {args.concurrency}, {args.duration:g}s per target")
+    print(f"{'target':<12}{'req/s':>9}{'ok/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  statuses")
+    for r in results:
+        print(
+            f"{r['target']:<12}{r['requests_per_second']:>9.1f}{r['ok_per_second']:>9.1f}"
+            f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}  {r['statuses']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+GET /api/hotels/random/ sampling: ORDER BY RANDOM() vs the in-process id pool.
+
+    python benchmarks/random_benchmark.py --sizes 10000 1000000
+
+Rows are minimal synthetic hotels inserted into a fresh SQLite database.
+"""
+import argparse
+import statistics
+import time
+
+from django_setup import setup
+
+
+def fill(n, batch=5000):
+    from api.models import Hotel
+
+    Hotel.objects.all().delete()
+    for start in range(0, n, batch):
+        Hotel.objects.bulk_create(
+            Hotel(id=f"r-{i:08d}", name=f"Hotel {i}", city="bench")
+            for i in range(start, min(n, start + batch))
+        )
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), max(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 1000000])
+    parser.add_argument("--count", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup()
+    from api.models import Hotel
+    from api.sampling import HotelIdPool
+
+    print(f"{'rows':>9}{'method':>18}{'median ms':>12}{'max ms':>10}")
+    for n in args.sizes:
+        fill(n)
+        pool = HotelIdPool()
+        start = time.perf_counter()
+        pool.ids()
+        load_ms = (time.perf_counter() - start) * 1000
+
+        order_by = timed(lambda: list(Hotel.objects.order_by("?")[:args.count]), args.repeat)
+        sampled = timed(lambda: pool.sample(args.count), args.repeat)
+        print(f"{n:>9}{'ORDER BY RANDOM()':>18}{order_by[0]:>12.2f}{order_by[1]:>10.2f}")
+        print(f"{n:>9}{'id pool':>18}{sampled[0]:>12.2f}{sampled[1]:>10.2f}")
+        print(f"{n:>9}{'(pool load)':>18}{load_ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
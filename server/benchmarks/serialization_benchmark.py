@@ -0,0 +1,87 @@
+"""
+Hotel serialization: DRF HotelSerializer vs the precompiled `.values()` plan,
+rendered with DRF's JSONRenderer and (when installed) ORJSONRenderer.
+
+    python benchmarks/serialization_benchmark.py --hotels 10000
+
+Every path is checked to produce byte-identical JSON before it is timed, and
+ORJSONRenderer is also checked on the datetime / int-key payloads of the
+other endpoints.
+"""
+import argparse
+import datetime
+import statistics
+import time
+
+from django_setup import setup
+from synthetic import make_hotels
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hotels", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup()
+    from rest_framework.renderers import JSONRenderer
+    from api.models import Hotel
+    from api.renderers import ORJSONRenderer, orjson
+    from api.serializer import HotelSerializer, hotel_plan
+    from api.upsert import upsert_hotels
+
+    upsert_hotels(make_hotels(args.hotels))
+    plan = hotel_plan()
+    stdlib = JSONRenderer()
+    fast = ORJSONRenderer()
+
+    def drf():
+        return HotelSerializer(Hotel.objects.all(), many=True).data
+
+    def planned():
+        return plan.serialize_many(Hotel.objects.values(*plan.columns))
+
+    def drf_serialize_only(hotels):
+        return HotelSerializer(hotels, many=True).data
+
+    expected = stdlib.render(drf())
+    assert stdlib.render(planned()) == expected, "plan output differs from HotelSerializer"
+    if orjson is not None:
+        assert fast.render(planned()) == expected, "orjson output differs from JSONRenderer"
+        now = datetime.datetime.now(datetime.timezone.utc)
+        other = {
+            "updated_at": now, "day": now.date(), "time": now.time(), "naive": now.replace(tzinfo=None),
+            "batch_sizes": {1: 3, 2: 0}, "last_batch_at": None, "rate": 12.5,
+        }
+        assert fast.render(other) == stdlib.render(other), "orjson output differs on dates / int keys"
+
+    hotels = list(Hotel.objects.all())
+    rows = list(Hotel.objects.values(*plan.columns))
+    cases = [
+        ("serialize only: HotelSerializer", lambda: drf_serialize_only(hotels)),
+        ("serialize only: plan", lambda: plan.serialize_many(rows)),
+        ("query+serialize+render: DRF", lambda: stdlib.render(drf())),
+        ("query+serialize+render: plan", lambda: stdlib.render(planned())),
+    ]
+    if orjson is not None:
+        cases.append(("query+serialize+render: plan+orjson", lambda: fast.render(planned())))
+    else:
+        print("orjson not installed; skipping ORJSONRenderer")
+
+    print(f"{args.hotels} hotels, {len(expected) / 1e6:.1f} MB of JSON, byte-identical output")
+    print(f"{'path':<40}{'median ms':>12}")
+    for name, fn in cases:
+        print(f"{name:<40}{timed(fn, args.repeat):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
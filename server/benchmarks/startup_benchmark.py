@@ -0,0 +1,52 @@
+"""
+Wall time and peak RSS of `manage.py` commands, to track start-up cost.
+
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --repeat 5 check "showmigrations api"
+
+Run it on two commits (e.g. before/after a change to what api/ imports at
+module level) and compare the tables.
+"""
+import argparse
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_COMMANDS = ["help", "check", "showmigrations api", "shell -c pass"]
+
+
+def run_once(command):
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "manage.py", *shlex.split(command)],
+        cwd=SERVER_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    _, status, usage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return elapsed, rss_mb, proc.returncode
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("commands", nargs="*", default=DEFAULT_COMMANDS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'command':<24}{'mean s':>9}{'min s':>9}{'peak RSS MB':>14}")
+    for command in args.commands:
+        runs = [run_once(command) for _ in range(args.repeat)]
+        failed = [code for _, _, code in runs if code]
+        times = [t for t, _, _ in runs]
+        label = command + (" (failed)" if failed else "")
+        print(f"{label:<24}{statistics.mean(times):>9.2f}{min(times):>9.2f}{max(r for _, r, _ in runs):>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Deterministic offline stand-in for the sentence-transformer, so benchmarks
+run without downloading a model and give the same vectors on every run.
+"""
+import re
+import time
+import zlib
+
+import numpy as np
+
+from api.providers import EmbeddingProvider
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class HashingProvider(EmbeddingProvider):
+    """
+    Hashed bag of words, L2-normalised. Texts sharing words get similar
+    vectors, which is enough to exercise ranking code paths. `cost_ms`
+    sleeps per call to imitate model latency (sleeping, like torch, releases
+    the GIL).
+    """
+
+    def __init__(self, dim=384, cost_ms=0.0):
+        self.dim = dim
+        self.cost_ms = cost_ms
+
+    def encode(self, texts):
+        texts = list(texts)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in TOKEN_RE.findall(str(text).lower()):
+                h = zlib.crc32(token.encode("utf-8"))
+                vectors[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        if self.cost_ms:
+            time.sleep(self.cost_ms / 1000)
+        return vectors / norms
+
+
+def install(cost_ms=0.0):
+    """Make the process-wide provider (and so the query batcher) use the stub."""
+    from api import batching, providers
+
+    providers._provider = HashingProvider(cost_ms=cost_ms)
+    batching._batcher = None
+    return providers._provider
@@ -0,0 +1,267 @@
+"""
+End-to-end benchmark suite: per-endpoint latency percentiles and throughput
+on a synthetic catalogue, with a stubbed deterministic embedding model so it
+runs offline and reproducibly.
+
+    python benchmarks/suite.py --hotels 5000 --output bench.json
+    python benchmarks/suite.py --hotels 5000 --compare bench.json   # diff against a saved run
+
+Requests go through Django's test client (URL routing, middleware, views,
+serialization and rendering; no network). Every recommend / facets request
+differs from the previous ones, so the result caches do not answer them;
+the `*_cached` scenarios measure the cached path on purpose. `create` runs
+last because it bumps the catalogue version.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django_setup import SERVER_DIR, setup
+from synthetic import AMENITIES, CITIES, IDEAL_FOR, make_hotels, place, write_csv
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def stats(latencies, wall):
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    result = {
+        "requests": len(latencies),
+        "mean_ms": statistics.fmean(latencies),
+        "max_ms": max(latencies),
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+    }
+    for p in PERCENTILES:
+        result[f"p{p}_ms"] = quantiles[p - 1]
+    return result
+
+
+def run_scenario(make_request, requests, warmup, concurrency):
+    """Call `make_request(i)` (returns a response) and time each call."""
+    from django.test import Client
+
+    for i in range(warmup):
+        make_request(Client(), -1 - i)
+
+    latencies = []
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker():
+        client = Client()
+        local = []
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            start = time.perf_counter()
+            response = make_request(client, i)
+            local.append((time.perf_counter() - start) * 1000)
+            if response.status_code not in (200, 304):
+                raise RuntimeError(f"HTTP {response.status_code}: {response.content[:300]!r}")
+        with lock:
+            latencies.extend(local)
+
+    start = time.perf_counter()
+    if concurrency == 1:
+        worker()
+    else:
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    return stats(latencies, time.perf_counter() - start)
+
+
+def recommend_body(i, **extra):
+    return json.dumps({
+        "tripType": f"{IDEAL_FOR[i % len(IDEAL_FOR)]} {i}",
+        "amenities": [AMENITIES[i % len(AMENITIES)], AMENITIES[(i * 7) % len(AMENITIES)]],
+        **extra,
+    })
+
+
+def scenarios(ids, cursor, create_batch, seed):
+    rng = random.Random(seed)
+    picks = [rng.choice(ids) for _ in range(100_000)]
+
+    def near(i):
+        # a point a few km from a city centre, different per request
+        lat, lng = place(CITIES[i % len(CITIES)], i % 7, i)
+        return f"{lat},{lng}"
+
+    def post(client, path, body):
+        return client.post(path, body, content_type="application/json")
+
+    return {
+        "list": lambda c, i: c.get("/api/hotels/?limit=50"),
+        "list_card_deep": lambda c, i: c.get(f"/api/hotels/?limit=50&view=card&cursor={cursor}"),
+        "list_near": lambda c, i: c.get(f"/api/hotels/?view=card&near={near(i)}&radius={1 + i % 10}"),
+        "retrieve": lambda c, i: c.get(f"/api/hotels/{picks[i % len(picks)]}/"),
+        "similar": lambda c, i: c.get(f"/api/hotels/{picks[i % len(picks)]}/similar/"),
+        "random": lambda c, i: c.get(f"/api/hotels/random/?count=3&seed={i}"),
+        "suggest": lambda c, i: c.get(f"/api/hotels/suggest/?q={CITIES[i % len(CITIES)][:2 + i % 3]}"),
+        "facets": lambda c, i: c.get(f"/api/hotels/facets/?maxBudget={2000 + i}"),
+        "facets_cached": lambda c, i: c.get("/api/hotels/facets/"),
+        "recommend": lambda c, i: post(c, "/api/hotels/recommend/", recommend_body(i)),
+        "recommend_filtered": lambda c, i: post(c, "/api/hotels/recommend/", recommend_body(
+            i, locationPref=CITIES[i % len(CITIES)], minRating=3.5, maxBudget=8000)),
+        "recommend_near": lambda c, i: post(c, "/api/hotels/recommend/", recommend_body(
+            i + 200_000, near=near(i), nearest=100)),
+        "recommend_dense_only": lambda c, i: post(c, "/api/hotels/recommend/", recommend_body(i, lexicalWeight=0)),
+        "recommend_cached": lambda c, i: post(c, "/api/hotels/recommend/", recommend_body(0)),
+        # offset: the async view shares the sync view's result cache
+        "recommend_async": lambda c, i: post(c, "/api/async/hotels/recommend/", recommend_body(i + 100_000)),
+        # last: each call updates hotels, re-embeds them and bumps the catalogue version
+        "create": lambda c, i: post(c, "/api/hotels/", json.dumps(create_batch(i))),
+    }
+
+
+def run_import(rows, workers, seed):
+    from django.core.management import call_command
+
+    path = os.path.join(tempfile.mkdtemp(prefix="stayfinder-suite-"), "hotels.csv")
+    write_csv(make_hotels(rows, seed=seed + 1, prefix="csv"), path)
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull:
+        call_command("import_hotel_csv", path, workers=workers, stdout=devnull)
+    elapsed = time.perf_counter() - start
+    return {"rows": rows, "seconds": elapsed, "rows_per_s": rows / elapsed}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SERVER_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    print(f"\nvs {baseline_path} (commit {baseline.get('commit')})")
+    print(f"{'scenario':<24}{'p50 ms':>10}{'change':>9}{'p95 ms':>10}{'change':>9}{'req/s':>10}{'change':>9}")
+    for name, result in current["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old:
+            continue
+        cells = []
+        for key in ("p50_ms", "p95_ms", "throughput_rps"):
+            change = (result[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            cells.append(f"{result[key]:>10.2f}{change:>+8.1f}%")
+        print(f"{name:<24}{''.join(cells)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hotels", type=int, default=5000)
+    parser.add_argument("--description-words", type=int, default=40)
+    parser.add_argument("--amenities-min", type=int, default=3)
+    parser.add_argument("--amenities-max", type=int, default=9)
+    parser.add_argument("--amenity-skew", type=float, default=1.0,
+                        help="Zipf exponent of amenity popularity; 0 = uniform")
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per scenario")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=1, help="client threads per scenario")
+    parser.add_argument("--create-batch", type=int, default=100, help="hotels per POST in `create`")
+    parser.add_argument("--import-rows", type=int, default=5000, help="0 skips the import benchmark")
+    parser.add_argument("--import-workers", type=int, default=1)
+    parser.add_argument("--model-cost-ms", type=float, default=0.0,
+                        help="simulated latency per stub model call")
+    parser.add_argument("--scenarios", nargs="+", help="run only these")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="previous --output file to diff against")
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    import stub_embeddings
+    from api.catalogue import hotels_changed, publish_changes
+    from api.embedding_queue import drain_queue
+    from api.models import Hotel
+    from api.pagination import encode_cursor
+    from api.upsert import upsert_hotels
+
+    settings.EMBEDDING_WARMUP = False
+    settings.REQUEST_TIMING_LOG = False
+    stub_embeddings.install(cost_ms=args.model_cost_ms)
+
+    generator = dict(
+        description_words=args.description_words,
+        amenity_count=(args.amenities_min, args.amenities_max),
+        amenity_skew=args.amenity_skew,
+    )
+    hotels = make_hotels(args.hotels, seed=args.seed, **generator)
+    start = time.perf_counter()
+    for offset in range(0, len(hotels), 5000):
+        upsert_hotels(hotels[offset:offset + 5000])
+    hotels_changed([h["id"] for h in hotels], publish=False)
+    if settings.EMBEDDING_QUEUE:
+        drain_queue()
+    publish_changes()
+    load_s = time.perf_counter() - start
+
+    ids = [h["id"] for h in hotels]
+    deep = Hotel.objects.order_by("-created_at", "-id")[min(500, len(ids) - 1)]
+    by_id = {h["id"]: h for h in hotels}
+
+    def create_batch(i):
+        rng = random.Random(i)
+        batch = []
+        for pk in rng.sample(ids, min(args.create_batch, len(ids))):
+            item = dict(by_id[pk])
+            item["price_per_night"] = rng.randint(800, 20000)
+            item["description"] += f" Updated {i}."
+            batch.append(item)
+        return batch
+
+    available = scenarios(ids, encode_cursor(deep), create_batch, args.seed)
+    selected = args.scenarios or list(available)
+    unknown = set(selected) - set(available)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "load_seconds": load_s,
+        "scenarios": {},
+    }
+    print(f"{args.hotels} hotels loaded and embedded in {load_s:.1f}s")
+    print(f"{'scenario':<24}" + "".join(f"{f'p{p} ms':>9}" for p in PERCENTILES) + f"{'req/s':>10}")
+    for name in available:
+        if name not in selected:
+            continue
+        requests = min(args.requests, 20) if name == "create" else args.requests
+        result = run_scenario(available[name], requests, args.warmup, args.concurrency)
+        results["scenarios"][name] = result
+        print(f"{name:<24}" + "".join(f"{result[f'p{p}_ms']:>9.2f}" for p in PERCENTILES)
+              + f"{result['throughput_rps']:>10.1f}")
+
+    if args.import_rows:
+        results["import_hotel_csv"] = run_import(args.import_rows, args.import_workers, args.seed)
+        print(f"import_hotel_csv: {results['import_hotel_csv']['rows_per_s']:.0f} rows/s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2, sort_keys=True)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
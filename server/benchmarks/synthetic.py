@@ -0,0 +1,106 @@
+"""
+Synthetic hotel payloads shaped like POST /api/hotels/ items.
+"""
+import csv
+import math
+import random
+
+CITIES = [
+    "delhi", "mumbai", "bengaluru", "kochi", "jaipur", "goa", "chennai", "kolkata",
+    "hyderabad", "pune", "udaipur", "amritsar", "shimla", "manali", "rishikesh", "agra",
+]
+AMENITIES = [
+    "Free Wi-Fi", "Pool", "Spa", "Free breakfast", "Free parking", "Fitness center",
+    "Restaurant", "Bar", "Air conditioning", "Airport shuttle", "Hot tub", "Kid-friendly",
+    "Pet-friendly", "Room service", "Beach access", "Business centre",
+]
+# (lat, lng) of each city centre; hotels are placed `distance_from_center_km` away
+CITY_CENTRES = {
+    "delhi": (28.6139, 77.2090), "mumbai": (19.0760, 72.8777), "bengaluru": (12.9716, 77.5946),
+    "kochi": (9.9312, 76.2673), "jaipur": (26.9124, 75.7873), "goa": (15.4909, 73.8278),
+    "chennai": (13.0827, 80.2707), "kolkata": (22.5726, 88.3639), "hyderabad": (17.3850, 78.4867),
+    "pune": (18.5204, 73.8567), "udaipur": (24.5854, 73.7125), "amritsar": (31.6340, 74.8723),
+    "shimla": (31.1048, 77.1734), "manali": (32.2432, 77.1892), "rishikesh": (30.0869, 78.2676),
+    "agra": (27.1767, 78.0081),
+}
+IDEAL_FOR = ["family", "business", "couples", "solo", "friends", "adventure", "relaxation"]
+SDG_TAGS = ["6", "7", "11", "12", "13", "14", "15"]
+WORDS = (
+    "quiet central heritage modern boutique rooftop garden lake view river sunset "
+    "spacious cosy walkable market temple beach hills courtyard vegetarian local art"
+).split()
+
+
+def pick_amenities(rng, count, skew=0.0):
+    """
+    `count` distinct amenities. With `skew` > 0 they follow a Zipf-like
+    distribution (the first AMENITIES are the most common), like real feeds
+    where Wi-Fi is everywhere and a spa is rare.
+    """
+    if skew <= 0:
+        return rng.sample(AMENITIES, count)
+    weights = [1 / (rank + 1) ** skew for rank in range(len(AMENITIES))]
+    picked = []
+    while len(picked) < count:
+        choice = rng.choices(AMENITIES, weights)[0]
+        if choice not in picked:
+            picked.append(choice)
+    return picked
+
+
+def place(city, distance_km, bearing):
+    """(lat, lng) `distance_km` from the city centre along `bearing` (radians)."""
+    lat, lng = CITY_CENTRES[city]
+    dlat = distance_km * math.cos(bearing) / 111.2
+    dlng = distance_km * math.sin(bearing) / (111.2 * math.cos(math.radians(lat)))
+    return round(lat + dlat, 6), round(lng + dlng, 6)
+
+
+def make_hotel(i, rng, description_words=40, amenity_count=(3, 9), prefix="syn", amenity_skew=0.0):
+    city = rng.choice(CITIES)
+    price = int(rng.lognormvariate(8.3, 0.6))
+    hotel = {
+        "id": f"{prefix}-{i:07d}",
+        "name": f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} Hotel {i}",
+        "city": city,
+        "address": f"{rng.randint(1, 999)} Main Road, {city.title()}",
+        "price_per_night": price,
+        "rating": round(rng.uniform(2.5, 5.0), 1),
+        "images": [f"https://picsum.photos/seed/{prefix}-{i}-{n}/1200/800" for n in range(1, 4)],
+        "images_alt": [f"Hotel {i} — image {n}" for n in range(1, 4)],
+        "rooms": [{"type": "Standard", "occupancy": 2, "size_sqm": 25, "price": price}],
+        "policies": {"check_in": "14:00", "check_out": "12:00", "cancellation": "Free upto 48h"},
+        "amenities": pick_amenities(rng, rng.randint(*amenity_count), amenity_skew),
+        "ideal_for": rng.sample(IDEAL_FOR, rng.randint(1, 3)),
+        "distance_from_center_km": round(rng.uniform(0.2, 25), 1),
+        "tags": rng.sample(WORDS, 3),
+        "description": " ".join(rng.choice(WORDS) for _ in range(description_words)),
+        "sdg_tags": rng.sample(SDG_TAGS, rng.randint(0, 3)),
+        "nearby": [{"name": f"{rng.choice(WORDS).title()} Market", "distance_km": round(rng.uniform(0.1, 5), 1)}],
+        "sustainability": {"certifications": [], "energy_source": "grid", "water_conservation": False},
+    }
+    # drawn last so the other fields stay what earlier runs generated
+    hotel["latitude"], hotel["longitude"] = place(city, hotel["distance_from_center_km"], rng.uniform(0, 2 * math.pi))
+    return hotel
+
+
+def make_hotels(n, seed=0, start=0, **kwargs):
+    rng = random.Random(seed)
+    return [make_hotel(i, rng, **kwargs) for i in range(start, start + n)]
+
+
+def write_csv(hotels, path):
+    """Write hotels in the column layout `manage.py import_hotel_csv` reads."""
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(
+            ["Hotel_Name", "City", "Hotel_Rating", "Hotel_Price", "Distance_km", "Latitude", "Longitude",
+             "Description"]
+            + [f"Feature_{n}" for n in range(1, 10)]
+        )
+        for h in hotels:
+            features = (h["amenities"] + [""] * 9)[:9]
+            writer.writerow(
+                [h["name"], h["city"], h["rating"], h["price_per_night"],
+                 h["distance_from_center_km"], h["latitude"], h["longitude"], h["description"]] + features
+            )
@@ -44,11 +44,205 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_RENDERER_CLASSES": (
-        "rest_framework.renderers.JSONRenderer",
+        # rest_framework.renderers.JSONRenderer's output, rendered with orjson
+        # when it is installed (pip install orjson); floats may be written
+        # differently at extreme magnitudes (see the renderer's docstring)
+        "api.renderers.ORJSONRenderer",
     ),
 }
 
+# GET /api/hotels/ page size (?limit= up to the max)
+HOTEL_LIST_PAGE_SIZE = 50
+HOTEL_LIST_MAX_PAGE_SIZE = 500
+
+# Seconds before GET /api/hotels/random/ reloads its in-process id pool
+# (it also reloads whenever the catalogue version changes)
+RANDOM_POOL_TTL = 300
+
+# Rows per bulk_create in POST /api/hotels/ (all chunks share one transaction)
+HOTEL_UPSERT_CHUNK_SIZE = 1000
+# Feed uploads post tens of thousands of hotels in one body
+DATA_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024 * 1024
+
+# Semantic search
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# CPU inference path: "torch", "torch-int8" (dynamic int8 quantization) or
+# "onnx" (ONNX Runtime, pip install "sentence-transformers[onnx]");
+# EMBEDDING_ONNX_FILE picks a specific export, e.g. a quantized one. Run
+# `manage.py build_embeddings --force` after switching.
+EMBEDDING_BACKEND = "torch"
+EMBEDDING_ONNX_FILE = None
+# "host:port" of a `manage.py serve_embeddings` process to share one model
+# across all workers; None loads the model inside each process on first use.
+EMBEDDING_SERVER = None
+# Load the model in wsgi/asgi start-up instead of on the first request
+EMBEDDING_WARMUP = True
+# Coalesce concurrent query encodes into micro-batches of up to
+# EMBEDDING_MAX_BATCH_SIZE, waiting at most EMBEDDING_MAX_WAIT_MS for more.
+EMBEDDING_BATCHING = True
+EMBEDDING_MAX_BATCH_SIZE = 32
+EMBEDDING_MAX_WAIT_MS = 5
+# 0 = unbounded; when full, recommend answers 429 with Retry-After: ASYNC_RETRY_AFTER
+EMBEDDING_MAX_QUEUE = 0
+# Upserts queue changed hotels for `manage.py embedding_worker` instead of
+# encoding them inside the request / import; the worker claims
+# EMBEDDING_QUEUE_BATCH_SIZE jobs at a time and leases them for
+# EMBEDDING_QUEUE_LEASE seconds. Only turn it on where the worker runs:
+# queued hotels stay out of recommendations until it has processed them
+# (recommend logs a warning once jobs wait longer than
+# EMBEDDING_QUEUE_STALL_WARNING seconds with no worker holding one).
+# False = encode synchronously.
+EMBEDDING_QUEUE = False
+EMBEDDING_QUEUE_BATCH_SIZE = 5000
+EMBEDDING_QUEUE_LEASE = 600
+EMBEDDING_QUEUE_STALL_WARNING = 300
+# Without the queue, writes encode their hotels at once but the vector store
+# (a full export) is republished by a background thread at most this many
+# seconds after the first write of a burst.
+VECTOR_STORE_EXPORT_DELAY = 5
+# Exported embedding matrix, memory-mapped read-only by every worker
+VECTOR_STORE_DIR = BASE_DIR / "vector_store"
+# On-disk precision of the exported matrix: "float32", "float16" (half the
+# memory) or "int8" (a quarter); applied on the next export
+VECTOR_STORE_DTYPE = "float32"
+RECOMMEND_DEFAULT_LIMIT = 20
+RECOMMEND_MAX_LIMIT = 100
+# How many semantic matches are re-ranked with the rule score, and the weights
+# of its components (see api.filters.DEFAULT_RULE_WEIGHTS)
+RECOMMEND_RERANK_DEPTH = 200
+RECOMMEND_RULE_WEIGHTS = {
+    "ai": 50,
+    "amenities": 20,
+    "sdg": 10,
+    "rating": 5,
+    "budget": 5,
+}
+# Approximate search: "exact", "ivf", or "auto" (IVF once the store holds
+# ANN_MIN_VECTORS and `manage.py build_ann_index` has trained centroids).
+# Higher ANN_NPROBE = better recall, slower queries.
+ANN_ENGINE = "auto"
+ANN_MIN_VECTORS = 20000
+ANN_NPROBE = 8
+# Filtered recommends (budget, rating, locationPref, ...) score their
+# candidates exactly while at most RECOMMEND_EXACT_MAX_CANDIDATES hotels pass
+# the filters. Larger sets search the whole store through the ANN index,
+# fetching RECOMMEND_POST_FILTER_FACTOR times the depth, and drop the matches
+# that fail the filters.
+RECOMMEND_EXACT_MAX_CANDIDATES = 20000
+RECOMMEND_POST_FILTER_FACTOR = 4
+
+# Hybrid ranking: a BM25 index over hotel text (exported with the vector
+# store) shortlists up to HYBRID_SHORTLIST hotels, which are then scored
+# densely. The score is (1 - w) * cosine + w * normalised BM25, where w is
+# HYBRID_LEXICAL_WEIGHT or the request's `lexicalWeight`; 0 is pure dense.
+HYBRID_LEXICAL_WEIGHT = 0.3
+HYBRID_SHORTLIST = 1000
+
+# Per-city shards of the vector store (and of its BM25 index). A search
+# over candidates from at most VECTOR_SHARD_MAX_FANOUT shards (e.g. a
+# locationPref query) scores only those shards, loaded on first use and
+# evicted least-recently-used beyond VECTOR_SHARD_MAX_RESIDENT shards or
+# VECTOR_SHARD_MEMORY_BUDGET bytes per process. VECTOR_SHARD_PRICE_BANDS,
+# e.g. (3000, 8000), splits every city further by price_per_night.
+# Changing the bands takes effect at the next export.
+VECTOR_SHARDS = True
+VECTOR_SHARD_PRICE_BANDS = ()
+VECTOR_SHARD_MAX_RESIDENT = 64
+VECTOR_SHARD_MEMORY_BUDGET = 256 * 2 ** 20
+VECTOR_SHARD_MAX_FANOUT = 4
+
+# Async recommend (/api/async/hotels/recommend/, served under ASGI): threads
+# that run encoding and scoring, how many requests may be queued or running
+# there before new ones get 429, and the Retry-After (seconds) sent with it
+# (also by the sync recommend when EMBEDDING_MAX_QUEUE is full)
+ASYNC_INFERENCE_WORKERS = 4
+ASYNC_INFERENCE_MAX_PENDING = 32
+ASYNC_RETRY_AFTER = 1
+
+# /api/hotels/{id}/similar/: top SIMILAR_HOTELS_K neighbours per hotel, scored
+# by embedding cosine, price proximity and same city (weights below), built
+# by `manage.py build_similar_hotels`. With SIMILAR_HOTELS on, the lists are
+# kept up to date off the request path: after each export by
+# `embedding_worker` or, without the queue, the background export, and by
+# `import_hotel_csv` once at the end of an import. Scoring works
+# in blocks of about SIMILAR_HOTELS_BLOCK_ELEMENTS floats; an update touching
+# more than SIMILAR_HOTELS_REBUILD_FRACTION of the catalogue rebuilds everything.
+SIMILAR_HOTELS = False
+SIMILAR_HOTELS_K = 10
+SIMILAR_HOTELS_WEIGHTS = {"embedding": 0.7, "price": 0.15, "city": 0.15}
+SIMILAR_HOTELS_BLOCK_ELEMENTS = 2 ** 25
+SIMILAR_HOTELS_REBUILD_FRACTION = 0.2
+
+# `near=lat,lng` with `radius` (km) and / or `nearest` (k) on the hotel list
+# and recommend. Hotels with coordinates are bucketed in a grid of
+# GEO_CELL_DEGREES cells held in memory, reloaded when the catalogue version
+# moves or after GEO_INDEX_TTL seconds. Without radius or nearest the search
+# covers GEO_DEFAULT_RADIUS_KM; `nearest` is capped at GEO_MAX_NEAREST.
+GEO_CELL_DEGREES = 0.05
+GEO_INDEX_TTL = 300
+GEO_DEFAULT_RADIUS_KM = 5.0
+GEO_MAX_NEAREST = 1000
+
+# /api/hotels/facets/: bucket boundaries (half-open [low, high)) and how many
+# cities / amenities to return
+FACET_PRICE_BUCKETS = [1000, 2500, 5000, 10000]
+FACET_RATING_BUCKETS = [3.0, 3.5, 4.0, 4.5]
+FACET_CITY_LIMIT = 50
+FACET_AMENITY_LIMIT = 50
+
+# Cache-Control per hotel endpoint; responses also carry ETag / Last-Modified
+# so expired copies revalidate with a 304. Unseeded /random/ is never cached.
+HOTEL_CACHE_CONTROL = {
+    "list": "public, max-age=30",
+    "retrieve": "public, max-age=300",
+    "random": "public, max-age=30",
+    "facets": "public, max-age=60",
+    "suggest": "public, max-age=300",
+    "similar": "public, max-age=300",
+}
+
+# Instrumentation (api.instrumentation): per-stage Server-Timing headers, one
+# JSON timing line per request on the `api` logger, and latency histograms
+# (upper bounds in seconds) at /api/metrics/. A request sending
+# `PROFILE_HEADER: <PROFILE_TOKEN>` runs under cProfile; its dump goes to
+# PROFILE_DIR (default: <tmp>/stayfinder-profiles). Unset token = disabled.
+# Server-Timing reveals internal stage names, so it is only sent (and exposed
+# to CORS origins) while SERVER_TIMING is on.
+SERVER_TIMING = DEBUG
+REQUEST_TIMING_LOG = True
+METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# /api/metrics/, /api/embeddings/stats/ and /api/embeddings/queue/ expose
+# internals: only staff users and clients from these addresses (e.g. the
+# Prometheus scraper) may read them
+OPERATIONS_ALLOWED_IPS = []
+PROFILE_HEADER = "X-Profile"
+PROFILE_TOKEN = None
+PROFILE_DIR = None
+PROFILE_TOP = 30
+
+# Recommendation caches: an LRU of query embeddings and a TTL cache of ranked
+# hotel ids per normalized request. BACKEND "memory" keeps them per process;
+# "django" stores them in CACHES[ALIAS] (shared with redis/memcached/file).
+# Result entries are keyed by the catalogue version, bumped on every upsert.
+RECOMMEND_CACHE = {
+    "BACKEND": "memory",
+    "ALIAS": "default",
+    "EMBEDDINGS_MAXSIZE": 4096,
+    "RESULTS_MAXSIZE": 2048,
+    "RESULTS_TTL": 300,
+}
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
 MIDDLEWARE = [
+    # first, so it compresses the final response body
+    'django.middleware.gzip.GZipMiddleware',
+    # times the rest of the stack: Server-Timing, /api/metrics/, timing log
+    'api.instrumentation.TimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,6 +257,11 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
 ]
 
+# let the client read the listing's next-page cursor
+CORS_EXPOSE_HEADERS = ["X-Next-Cursor", "Link", "ETag", "Last-Modified"]
+if SERVER_TIMING:
+    CORS_EXPOSE_HEADERS.append("Server-Timing")
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -131,6 +330,18 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Logging
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "api": {"handlers": ["console"], "level": "INFO"},
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -14,3 +14,12 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# Serving processes load the embedding model up front so the first
+# recommendation doesn't pay for it. Only runserver and real servers import
+# this module, so other manage.py commands stay fast.
+from django.conf import settings  # noqa: E402
+
+if getattr(settings, "EMBEDDING_WARMUP", True):
+    from api.providers import warm_up
+    warm_up()